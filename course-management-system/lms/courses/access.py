@@ -0,0 +1,152 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.shortcuts import get_object_or_404
+
+from .models import Course, Enrollment, Lessons
+
+
+class EnrollmentSetCache:
+    """
+    Process-local LRU of user id -> frozenset of enrolled course ids, each
+    entry living at most `ttl` seconds. Only ever used to *grant* access:
+    a course missing from the set is re-checked against the database, so a
+    new enrollment (even one made in another worker) is never denied.
+    """
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            expires_at, course_ids = entry
+            if expires_at < time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return course_ids
+
+    def set(self, user_id, course_ids):
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl, frozenset(course_ids))
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+enrollment_cache = EnrollmentSetCache(
+    maxsize=settings.ENROLLMENT_CACHE_SIZE,
+    ttl=settings.ENROLLMENT_CACHE_TTL,
+)
+
+
+class AccessContext:
+    """
+    Per-request memo of the course, lesson and enrollment lookups that
+    permissions, serializers and views all need. Each one hits the database
+    at most once per request; `hits` counts the queries that were saved.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self._courses = {}
+        self._lessons = {}
+        self._enrollments = {}
+        self.hits = 0
+        self.misses = 0
+
+    def course(self, course_id):
+        course_id = int(course_id)
+        if course_id in self._courses:
+            self.hits += 1
+            return self._courses[course_id]
+
+        self.misses += 1
+        course = get_object_or_404(Course, pk=course_id)
+        self._courses[course_id] = course
+        return course
+
+    def lesson(self, lesson_id):
+        lesson_id = int(lesson_id)
+        if lesson_id in self._lessons:
+            self.hits += 1
+            return self._lessons[lesson_id]
+
+        self.misses += 1
+        lesson = get_object_or_404(Lessons.objects.select_related("course"), pk=lesson_id)
+        self._lessons[lesson_id] = lesson
+        self._courses.setdefault(lesson.course_id, lesson.course)
+        return lesson
+
+    def is_enrolled(self, course_id):
+        course_id = int(course_id)
+        if not self.user or not self.user.is_authenticated:
+            return False
+
+        if course_id in self._enrollments:
+            self.hits += 1
+            return self._enrollments[course_id]
+
+        self.misses += 1
+        enrolled = Enrollment.objects.filter(student=self.user, course_id=course_id).exists()
+        self._enrollments[course_id] = enrolled
+        return enrolled
+
+    def has_lesson_access(self, course_id):
+        # Read-side enrollment check for lesson pages, answered from the
+        # per-user enrolled-course set when possible.
+        course_id = int(course_id)
+        if not self.user or not self.user.is_authenticated:
+            return False
+
+        course_ids = enrollment_cache.get(self.user.pk)
+        if course_ids is not None and course_id in course_ids:
+            self.hits += 1
+            return True
+
+        if course_ids is None:
+            self.misses += 1
+            course_ids = frozenset(
+                Enrollment.objects.filter(student=self.user).values_list("course_id", flat=True)
+            )
+            enrollment_cache.set(self.user.pk, course_ids)
+            self._enrollments.update(dict.fromkeys(course_ids, True))
+            self._enrollments.setdefault(course_id, False)
+            return course_id in course_ids
+
+        # Not in the cached set, which may predate a new enrollment:
+        # the database has the final word.
+        enrolled = self.is_enrolled(course_id)
+        if enrolled:
+            enrollment_cache.set(self.user.pk, course_ids | {course_id})
+        return enrolled
+
+    def record_enrollment(self, course_id):
+        self._enrollments[int(course_id)] = True
+
+
+def get_access_context(request):
+    # Kept on the underlying HttpRequest so DRF's Request, permissions,
+    # serializers (via context["request"]) and middleware all share it.
+    http_request = getattr(request, "_request", request)
+    access = getattr(http_request, "access_context", None)
+    if access is None:
+        access = AccessContext(request.user)
+        http_request.access_context = access
+    return access
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Course, Lessons, Enrollment, LessonProgress
+from .models import Course, Lessons, Enrollment, LessonProgress, CourseProgressSummary
 
 
 # Register your models here.
@@ -7,4 +7,5 @@ from .models import Course, Lessons, Enrollment, LessonProgress
 admin.site.register(Course)
 admin.site.register(Lessons)
 admin.site.register(Enrollment)
-admin.site.register(LessonProgress)
\ No newline at end of file
+admin.site.register(LessonProgress)
+admin.site.register(CourseProgressSummary)
\ No newline at end of file
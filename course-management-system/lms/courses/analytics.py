@@ -0,0 +1,91 @@
+from datetime import datetime, time, timedelta
+
+from django.db.models import Count, F, Q
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Enrollment, Lessons
+
+# Instructor analytics for one course, one GROUP BY query per section, so a
+# dashboard costs three queries however many students the course has.
+
+DEFAULT_DAYS = 30
+MAX_DAYS = 365
+
+
+def _rate(part, whole):
+    return round(part / whole * 100, 2) if whole else 0
+
+
+def enrollment_totals(course_id):
+    # Enrolled / started / finished, read from the materialized progress summaries
+    summary = "progress_summary__"
+    totals = Enrollment.objects.filter(course_id=course_id).aggregate(
+        total=Count("pk"),
+        started=Count("pk", filter=Q(**{f"{summary}completed_count__gt": 0})),
+        completed=Count("pk", filter=Q(
+            **{f"{summary}total_lessons__gt": 0},
+            **{f"{summary}completed_count__gte": F(f"{summary}total_lessons")},
+        )),
+    )
+    totals["not_started"] = totals["total"] - totals["started"]
+    totals["completion_rate"] = _rate(totals["completed"], totals["total"])
+    return totals
+
+
+def lesson_completions(course_id):
+    return (
+        Lessons.objects.filter(course_id=course_id)
+        .annotate(completed=Count("lessonprogress", filter=Q(lessonprogress__completed=True)))
+        .order_by("order")
+        .values("id", "title", "order", "completed")
+    )
+
+
+def enrollments_per_day(course_id, since):
+    return (
+        Enrollment.objects.filter(course_id=course_id, enrolled_at__gte=since)
+        .annotate(day=TruncDate("enrolled_at"))
+        .order_by()
+        .values("day")
+        .annotate(count=Count("pk"))
+        .values_list("day", "count")
+    )
+
+
+def lesson_funnel(course_id, enrolled):
+    """
+    Completions per lesson in course order. `drop_off` is how many fewer
+    students got this lesson done than the step before it (the enrollment
+    count for the first lesson).
+    """
+    funnel = []
+    previous = enrolled
+    for row in lesson_completions(course_id):
+        row["completion_rate"] = _rate(row["completed"], enrolled)
+        row["drop_off"] = max(previous - row["completed"], 0)
+        previous = row["completed"]
+        funnel.append(row)
+    return funnel
+
+
+def daily_enrollments(course_id, days, today=None):
+    # New enrollments per day over the last `days` days (TIME_ZONE days), zero-filled
+    today = today or timezone.localdate()
+    start = today - timedelta(days=days - 1)
+    since = timezone.make_aware(datetime.combine(start, time.min))
+    counts = dict(enrollments_per_day(course_id, since))
+    return [
+        {"date": day.isoformat(), "count": counts.get(day, 0)}
+        for day in (start + timedelta(days=n) for n in range(days))
+    ]
+
+
+def course_analytics(course_id, days=DEFAULT_DAYS):
+    enrollments = enrollment_totals(course_id)
+    return {
+        "course_id": course_id,
+        "enrollments": enrollments,
+        "lessons": lesson_funnel(course_id, enrollments["total"]),
+        "daily_enrollments": daily_enrollments(course_id, days),
+    }
@@ -0,0 +1,245 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpResponse
+from django.shortcuts import aget_object_or_404
+from django.views import View
+
+from rest_framework import exceptions, permissions
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework.views import exception_handler
+
+from .cache import AsyncCatalogCacheMixin
+from .models import Course, CourseProgressSummary, Enrollment, LessonProgress, Lessons
+from .pagination import AsyncPageNumberPagination, CourseListPagination
+from .permissions import IsStudent
+from .renderers import FastJSONRenderer
+from .replicas import aread_alias_for, reading_from
+from .rows import RowSerializer
+from .serializers import CourseDetailSerializer, CourseSerializer, LessonSerializers
+from .views import (
+    CourseDetailView,
+    CourseListView,
+    LessonListByCourseView,
+    detail_queryset,
+    public_detail_uri,
+    sparse,
+    with_progress,
+    wants_progress,
+)
+
+
+class AsyncAPIView(View):
+    """
+    Async counterpart of DRF's APIView for the read-only JSON endpoints,
+    so under ASGI a request waiting on the database doesn't hold a thread.
+
+    Authentication runs on the event loop when the authenticator has an
+    `aauthenticate()` (ClaimsJWTAuthentication does; a claims token needs no
+    query), otherwise in a worker thread. Permissions must be plain checks
+    on request.user. Handlers use the async ORM and return `self.render(data)`.
+    With `replica_reads`, their queries go to a read replica (courses/replicas.py).
+    """
+    http_method_names = ["get", "head", "options"]
+    replica_reads = False
+    authentication_classes = api_settings.DEFAULT_AUTHENTICATION_CLASSES
+    permission_classes = api_settings.DEFAULT_PERMISSION_CLASSES
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = Request(request, authenticators=self.get_authenticators())
+        self.request = request
+
+        try:
+            await self.authenticate(request)
+            self.check_permissions(request)
+
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+            alias = await aread_alias_for(request) if self.replica_reads else None
+            with reading_from(alias):
+                return await handler(request, *args, **kwargs)
+        except Exception as exc:
+            return self.handle_exception(exc)
+
+    def get_authenticators(self):
+        return [auth() for auth in self.authentication_classes]
+
+    def get_permissions(self):
+        return [permission() for permission in self.permission_classes]
+
+    def get_serializer_context(self):
+        return {"request": self.request, "view": self, "format": None}
+
+    async def authenticate(self, request):
+        # Request._authenticate(), awaiting each authenticator
+        for authenticator in request.authenticators:
+            try:
+                if hasattr(authenticator, "aauthenticate"):
+                    user_auth_tuple = await authenticator.aauthenticate(request)
+                else:
+                    user_auth_tuple = await sync_to_async(authenticator.authenticate)(request)
+            except exceptions.APIException:
+                request._not_authenticated()
+                raise
+
+            if user_auth_tuple is not None:
+                request._authenticator = authenticator
+                request.user, request.auth = user_auth_tuple
+                return
+
+        request._not_authenticated()
+
+    def check_permissions(self, request):
+        for permission in self.get_permissions():
+            if not permission.has_permission(request, self):
+                if request.authenticators and not request.successful_authenticator:
+                    raise exceptions.NotAuthenticated()
+                raise exceptions.PermissionDenied(detail=getattr(permission, "message", None))
+
+    def handle_exception(self, exc):
+        if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+            # WWW-Authenticate header for 401 responses, else coerce to 403
+            auth_header = self.get_authenticators()[0].authenticate_header(self.request)
+            if auth_header:
+                exc.auth_header = auth_header
+            else:
+                exc.status_code = 403
+
+        context = {"view": self, "args": self.args, "kwargs": self.kwargs, "request": self.request}
+        response = exception_handler(exc, context)
+        if response is None:
+            raise exc
+
+        headers = {name: response[name] for name in ("WWW-Authenticate", "Retry-After") if response.has_header(name)}
+        return self.render(response.data, status=response.status_code, headers=headers)
+
+    def render(self, data, status=200, headers=None):
+        # Same bytes as the sync views
+        return HttpResponse(
+            FastJSONRenderer().render(data),
+            content_type=FastJSONRenderer.media_type,
+            status=status,
+            headers=headers,
+        )
+
+    async def paginate(self, paginator, queryset, serializer_class, keep=()):
+        # One page of serialized rows, from .values() rows when FAST_READ_SERIALIZERS is on
+        context = self.get_serializer_context()
+        if settings.FAST_READ_SERIALIZERS:
+            rows = RowSerializer(serializer_class, context)
+            page = await paginator.apaginate_queryset(rows.values(queryset, keep=keep), self.request, self)
+            return rows.to_representation(page)
+        page = await paginator.apaginate_queryset(queryset, self.request, self)
+        return serializer_class(page, many=True, context=context).data
+
+
+class AsyncCourseListView(AsyncCatalogCacheMixin, AsyncAPIView):
+    permission_classes = [permissions.AllowAny]
+    catalog_name = CourseListView.__name__
+    replica_reads = True  # same payloads and ETags as the sync view
+
+    async def get_data(self, request):
+        paginator = CourseListPagination()
+        queryset = sparse(CourseListView.queryset.all(), request, CourseSerializer, keep=["created_at"])
+        data = await self.paginate(paginator, queryset, CourseSerializer, keep=CourseListView.row_keep)
+        return paginator.get_paginated_response(data).data
+
+
+class AsyncCourseDetailView(AsyncCatalogCacheMixin, AsyncAPIView):
+    permission_classes = [permissions.AllowAny]
+    catalog_scope = "course"
+    catalog_name = CourseDetailView.__name__
+    replica_reads = True
+
+    async def get(self, request, pk):
+        if not wants_progress(request):
+            return await super().get(request, pk=pk)
+
+        # As CourseDetailView: shared cached course payload, per-caller progress, no ETag
+        fingerprint = await self.aget_catalog_fingerprint(request, uri=public_detail_uri(request))
+        data = await self.get_catalog_data(fingerprint, request, pk=pk)
+
+        completed = await self.get_completed_lessons(request, pk)
+        response = self.render(with_progress(data, completed))
+        response["Cache-Control"] = "private, no-cache"
+        return response
+
+    async def get_data(self, request, pk):
+        # Lessons prefetched (when requested): the serializer can't lazy-load them on the event loop
+        course = await aget_object_or_404(detail_queryset(CourseDetailView.queryset, request), pk=pk)
+        return CourseDetailSerializer(course, context=self.get_serializer_context()).data
+
+    async def get_completed_lessons(self, request, course_id):
+        if getattr(request.user, "role", None) != "student":
+            return None
+        if not await Enrollment.objects.filter(student=request.user, course_id=course_id).aexists():
+            return None
+        return {
+            lesson_id
+            async for lesson_id in LessonProgress.objects.filter(
+                student=request.user, lesson__course_id=course_id, completed=True
+            ).values_list("lesson_id", flat=True)
+        }
+
+
+class AsyncLessonListByCourseView(AsyncCatalogCacheMixin, AsyncAPIView):
+    permission_classes = [permissions.AllowAny]
+    catalog_scope = "course"
+    catalog_course_kwarg = "course_id"
+    catalog_name = LessonListByCourseView.__name__
+    replica_reads = True
+
+    async def get_data(self, request, course_id):
+        paginator = AsyncPageNumberPagination()
+        queryset = sparse(Lessons.objects.filter(course_id=course_id).order_by("order"), request, LessonSerializers)
+        data = await self.paginate(paginator, queryset, LessonSerializers)
+        return paginator.get_paginated_response(data).data
+
+
+class AsyncCourseProgressApiView(AsyncAPIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    async def get(self, request, course_id):
+        if request.user.role != 'student':
+            return self.render({"detail": "Only students can view their progress."})
+
+        summary = await CourseProgressSummary.objects.filter(student=request.user, course_id=course_id).afirst()
+
+        if summary is None:
+            # Bulk-inserted enrollment or none at all (see CourseProgressApiView)
+            course = await aget_object_or_404(Course, pk=course_id)
+            enrollment = await Enrollment.objects.filter(student=request.user, course=course).afirst()
+            if enrollment is None:
+                return self.render({"detail": "You're not enrolled to this course. Enroll First to see Progress!"})
+            summary = await sync_to_async(CourseProgressSummary.objects.sync)(enrollment)
+
+        return self.render({
+            "course_id": summary.course_id,
+            "total_lessons": summary.total_lessons,
+            "completed_lessons": summary.completed_count,
+            "progress_percent": summary.progress_percent,
+        })
+
+
+class AsyncListLessonProgressPerCourseApiView(AsyncAPIView):
+    permission_classes = [permissions.IsAuthenticated, IsStudent]
+
+    async def get(self, request, course_id):
+        course = await aget_object_or_404(Course, pk=course_id)
+
+        if not await Enrollment.objects.filter(student=request.user, course=course).aexists():
+            raise exceptions.PermissionDenied("You are not enrolled in this course!")
+
+        completed_lessons_ids = [
+            lesson_id
+            async for lesson_id in LessonProgress.objects.filter(
+                student=request.user,
+                lesson__course=course,
+                completed=True,
+            ).values_list("lesson_id", flat=True)
+        ]
+        return self.render({"completed_lessons": completed_lessons_ids})
@@ -0,0 +1,224 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponseNotModified
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .replicas import awritten_recently, mark_written, reading_from, written_recently
+
+# Public catalog payloads are cached under keys that embed version counters.
+# Writes never delete entries, they bump a counter so every old key just stops
+# being read (and expires on its own). The course list depends on the global
+# version; a course's detail and lesson list depend on that course's version.
+
+GLOBAL_VERSION_KEY = "catalog:v:global"
+
+
+def _cache():
+    return caches[settings.COURSE_CACHE_ALIAS]
+
+
+def _course_version_key(course_id):
+    return f"catalog:v:course:{course_id}"
+
+
+def _analytics_version_key(course_id):
+    return f"analytics:v:course:{course_id}"
+
+
+def _fresh_version():
+    # A missing counter (first use, eviction, restart) must never resume at a
+    # value an older cached payload was stored under, so seed it from the clock.
+    return time.time_ns()
+
+
+def get_versions(keys):
+    cache = _cache()
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _fresh_version(), timeout=None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+async def aget_versions(keys):
+    # get_versions() for async views
+    cache = _cache()
+    versions = await cache.aget_many(keys)
+    for key in keys:
+        if key not in versions:
+            await cache.aadd(key, _fresh_version(), timeout=None)
+            versions[key] = await cache.aget(key)
+    return [versions[key] for key in keys]
+
+
+def catalog_fingerprint(name, renderer_format, uri, versions):
+    return hashlib.md5(
+        "|".join([name, renderer_format, uri, *map(str, versions)]).encode("utf-8"),
+        usedforsecurity=False,
+    ).hexdigest()
+
+
+def catalog_payload_key(fingerprint):
+    return f"catalog:payload:{fingerprint}"
+
+
+def _bump(keys):
+    cache = _cache()
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _fresh_version(), timeout=None)
+    mark_written(keys)
+
+
+def bump_catalog(*course_ids):
+    """
+    Invalidate the course list and, for each course id given, that course's
+    detail and lesson list. Runs after commit so no reader can cache the
+    pre-write state under the new version.
+    """
+    keys = [GLOBAL_VERSION_KEY] + [_course_version_key(pk) for pk in course_ids if pk is not None]
+    transaction.on_commit(lambda: _bump(keys))
+
+
+def bump_analytics(*course_ids):
+    """
+    Invalidate the instructor analytics of these courses (new enrollments and
+    completions). Lesson and course edits already move the catalog version,
+    which analytics keys include too.
+    """
+    keys = [_analytics_version_key(pk) for pk in course_ids if pk is not None]
+    transaction.on_commit(lambda: _bump(keys))
+
+
+class CatalogCacheMixin:
+    """
+    Serve GET from the versioned catalog cache, with ETag / If-None-Match.
+    Only for views whose payload does not depend on who is asking.
+    `catalog_scope` is "global" (course lists) or "course" (per-course pages,
+    course id taken from `catalog_course_kwarg`).
+    """
+    catalog_scope = "global"
+    catalog_course_kwarg = "pk"
+    catalog_name = None  # defaults to the class name; views sharing a payload share a name
+
+    def get_catalog_version_keys(self):
+        if self.catalog_scope == "course":
+            return [_course_version_key(self.kwargs[self.catalog_course_kwarg])]
+        return [GLOBAL_VERSION_KEY]
+
+    def get_catalog_name(self):
+        return self.catalog_name or type(self).__name__
+
+    def get_catalog_fingerprint(self, request, uri=None):
+        versions = get_versions(self.get_catalog_version_keys())
+        return catalog_fingerprint(
+            self.get_catalog_name(),
+            request.accepted_renderer.format,
+            uri or request.build_absolute_uri(),
+            versions,
+        )
+
+    def get(self, request, *args, **kwargs):
+        fingerprint = self.get_catalog_fingerprint(request)
+        etag = f'"{fingerprint}"'
+
+        if etag in request.headers.get("If-None-Match", ""):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+        response = self.get_catalog_response(fingerprint, request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            response["ETag"] = etag
+            response["Cache-Control"] = "no-cache"  # always revalidate, 304 keeps it cheap
+        return response
+
+    def get_catalog_response(self, fingerprint, request, *args, **kwargs):
+        # The cached payload, else the view's own response (cached if it is a 200)
+        cache = _cache()
+        cache_key = catalog_payload_key(fingerprint)
+        data = cache.get(cache_key)
+        if data is not None:
+            return Response(data)
+
+        response = self.get_uncached_response(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(cache_key, response.data, timeout=settings.COURSE_CACHE_TIMEOUT)
+        return response
+
+
+    def get_uncached_response(self, request, *args, **kwargs):
+        # Right after a write a replica may not have it yet, and whatever is
+        # built now is cached under the new version: read from the primary
+        if written_recently(self.get_catalog_version_keys()):
+            with reading_from(None):
+                return super().get(request, *args, **kwargs)
+        return super().get(request, *args, **kwargs)
+
+
+class AnalyticsCacheMixin(CatalogCacheMixin):
+    """
+    CatalogCacheMixin for a course's instructor analytics: keyed on both the
+    course's catalog version and its analytics version, and on today's date
+    so day-bucketed series and their ETags roll over at midnight.
+    Permissions have run before get(), so only the owner ever gets a hit.
+    """
+    catalog_scope = "course"
+    catalog_course_kwarg = "course_id"
+
+    def get_catalog_version_keys(self):
+        return super().get_catalog_version_keys() + [
+            _analytics_version_key(self.kwargs[self.catalog_course_kwarg])
+        ]
+
+    def get_catalog_name(self):
+        return f"{super().get_catalog_name()}:{timezone.localdate().isoformat()}"
+
+
+class AsyncCatalogCacheMixin(CatalogCacheMixin):
+    """
+    CatalogCacheMixin for AsyncAPIView subclasses (courses/async_views.py):
+    the same ETags and cached payloads, read with the async cache API.
+    The view supplies `get_data()` instead of a sync `get()`.
+    """
+
+    async def aget_catalog_fingerprint(self, request, uri=None):
+        versions = await aget_versions(self.get_catalog_version_keys())
+        return catalog_fingerprint(
+            self.get_catalog_name(),
+            "json",
+            uri or request.build_absolute_uri(),
+            versions,
+        )
+
+    async def get(self, request, *args, **kwargs):
+        fingerprint = await self.aget_catalog_fingerprint(request)
+        etag = f'"{fingerprint}"'
+
+        if etag in request.headers.get("If-None-Match", ""):
+            return HttpResponseNotModified(headers={"ETag": etag})
+
+        response = self.render(await self.get_catalog_data(fingerprint, request, *args, **kwargs))
+        response["ETag"] = etag
+        response["Cache-Control"] = "no-cache"
+        return response
+
+    async def get_catalog_data(self, fingerprint, request, *args, **kwargs):
+        cache = _cache()
+        cache_key = catalog_payload_key(fingerprint)
+        data = await cache.aget(cache_key)
+        if data is None:
+            if await awritten_recently(self.get_catalog_version_keys()):
+                with reading_from(None):
+                    data = await self.get_data(request, *args, **kwargs)
+            else:
+                data = await self.get_data(request, *args, **kwargs)
+            await cache.aset(cache_key, data, timeout=settings.COURSE_CACHE_TIMEOUT)
+        return data
@@ -0,0 +1,416 @@
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .cache import bump_analytics
+from .models import CourseProgressSummary, Enrollment, LessonProgress, Lessons
+
+try:
+    import fcntl
+except ImportError:  # Windows: no write-behind
+    fcntl = None
+
+logger = logging.getLogger("courses.completions")
+
+# Write-behind for single lesson completions (COMPLETION_WRITE_BEHIND). The
+# request validates as usual, appends the completion to this process's
+# journal file and returns; a flusher thread writes everything that came in
+# over COMPLETION_FLUSH_MS (or COMPLETION_FLUSH_ROWS rows) in one transaction,
+# so a burst of completions takes the database write lock a few times instead
+# of once per request. A journal file is deleted once its rows are committed.
+# Each live process holds a lock on its own journal files; files nobody holds
+# are left over from a crash and are replayed by the flush thread when a
+# process starts its buffer (or by `manage.py replay_completions`). Replays
+# are idempotent. A batch that still fails after COMPLETION_FLUSH_RETRIES
+# retries (backing off from RETRY_SECONDS) has its journal files moved to
+# DEAD_LETTER_DIR, which only `replay_completions --dead-letter` reads, so
+# one bad row can't hold back every completion after it.
+#
+# Until it is written, a completion is "pending": the predecessor checks in
+# serializers.py count it as done. Other processes see it through a marker
+# in the catalog cache, so with several workers that cache must be shared
+# (DJANGO_CACHE_BACKEND); with the default local-memory cache a student's
+# next lesson can be refused by another worker until the flush.
+
+JOURNAL_SUFFIX = ".jsonl"
+DEAD_LETTER_DIR = "dead-letter"  # inside COMPLETION_JOURNAL_DIR
+RETRY_SECONDS = 1  # before the first retry of a failed flush, doubling up to MAX_RETRY_SECONDS
+MAX_RETRY_SECONDS = 30
+PENDING_MARKER_SECONDS = 300  # bounds a marker whose flush never deleted it
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def _cache():
+    return caches[settings.COURSE_CACHE_ALIAS]
+
+
+def _pending_key(student_id, lesson_id):
+    return f"completion:pending:{student_id}:{lesson_id}"
+
+
+def record_completions(user, course_id, count):
+    # Keep the student's CourseProgressSummary in step with new LessonProgress rows.
+    # Call inside the transaction that wrote them.
+    updated = CourseProgressSummary.objects.filter(
+        student=user, course_id=course_id
+    ).bump(completed=count, last_completed_at=timezone.now())
+    bump_analytics(course_id)
+    if not updated:
+        # Summary row missing (migration 0004 builds them for older enrollments): build it now
+        enrollment = Enrollment.objects.get(student=user, course_id=course_id)
+        CourseProgressSummary.objects.sync(enrollment)
+
+
+def store_completions(rows):
+    """
+    Write (student_id, lesson_id, course_id) completions in one transaction.
+    Rows already stored, for deleted lessons or for courses the student has
+    since left are skipped, so a journal can be replayed any number of times.
+    Returns the number of completions written.
+    """
+    rows = list(dict.fromkeys(rows))
+    if not rows:
+        return 0
+
+    students = {student_id for student_id, _, _ in rows}
+    with transaction.atomic():
+        done = set(
+            LessonProgress.objects.filter(
+                student_id__in=students, lesson_id__in={lesson_id for _, lesson_id, _ in rows}, completed=True
+            ).values_list("student_id", "lesson_id")
+        )
+        lessons = dict(
+            Lessons.objects.filter(pk__in={lesson_id for _, lesson_id, _ in rows}).values_list("pk", "course_id")
+        )
+        enrolled = set(
+            Enrollment.objects.filter(
+                student_id__in=students, course_id__in={course_id for _, _, course_id in rows}
+            ).values_list("student_id", "course_id")
+        )
+        new = [
+            (student_id, lesson_id, course_id)
+            for student_id, lesson_id, course_id in rows
+            if (student_id, lesson_id) not in done
+            and lessons.get(lesson_id) == course_id
+            and (student_id, course_id) in enrolled
+        ]
+
+        # Upsert, as the bulk endpoint: a stale completed=False row gets flipped
+        LessonProgress.objects.bulk_create(
+            [LessonProgress(student_id=student_id, lesson_id=lesson_id, completed=True) for student_id, lesson_id, _ in new],
+            update_conflicts=True,
+            unique_fields=["student", "lesson"],
+            update_fields=["completed"],
+        )
+        for (student_id, course_id), count in Counter((s, c) for s, _, c in new).items():
+            record_completions(student_id, course_id, count)
+    return len(new)
+
+
+class _Segment:
+    # One journal file, locked by this process until its rows are committed
+
+    def __init__(self, journal_dir):
+        name = f"{os.getpid()}-{uuid.uuid4().hex}"
+        opening = journal_dir / f"{name}.open"
+        self.file = open(opening, "ab")
+        fcntl.flock(self.file, fcntl.LOCK_EX)
+        # Only visible to replays once locked
+        self.path = journal_dir / f"{name}{JOURNAL_SUFFIX}"
+        os.replace(opening, self.path)
+        self.written = 0
+        self.synced = 0
+        self.sync_lock = threading.Lock()
+
+    def append(self, line):
+        self.file.write(line)
+        self.file.flush()
+        self.written += 1
+        return self.written
+
+    def sync(self, upto):
+        # Group fsync: one call covers every line written before it started
+        with self.sync_lock:
+            if self.synced < upto and not self.file.closed:
+                written = self.written
+                os.fsync(self.file.fileno())
+                self.synced = written
+
+    def discard(self):
+        with self.sync_lock:
+            self.path.unlink(missing_ok=True)
+            self.file.close()
+
+    def move_to(self, directory):
+        with self.sync_lock:
+            target = directory / self.path.name
+            os.replace(self.path, target)
+            self.path = target
+            self.file.close()
+
+
+class CompletionBuffer:
+    def __init__(self, journal_dir, flush_ms, flush_rows, fsync, stats_seconds=0, max_retries=5):
+        self.journal_dir = Path(journal_dir)
+        self.flush_seconds = flush_ms / 1000
+        self.flush_rows = flush_rows
+        self.max_retries = max_retries
+        self.fsync = fsync
+        self.stats_seconds = stats_seconds
+        self.stats_logged = time.monotonic()
+
+        self.lock = threading.Lock()
+        self.ready = threading.Condition(self.lock)
+        self.rows = []  # waiting for the next flush
+        self.segments = []  # journal files holding those rows
+        self.segment = None  # the one new rows go to
+        self.pending = set()  # (student_id, lesson_id) not committed yet, flushing included
+        self.retrying = None  # (rows, segments) of a failed flush, retried on its own before new rows
+        self.attempts = 0  # failed flushes of that batch so far
+        self.stats = {
+            "flushes": 0, "flushed": 0, "failures": 0, "dead_lettered": 0, "max_depth": 0,
+            "flush_ms": deque(maxlen=1000),
+        }
+
+        self.journal_dir.mkdir(parents=True, exist_ok=True)
+        self.thread = threading.Thread(target=self.run, name="completions-flush", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        atexit.register(self.drain)
+
+    def add(self, student_id, lesson_id, course_id):
+        # False if this completion is already waiting
+        line = (json.dumps([student_id, lesson_id, course_id]) + "\n").encode()
+        _cache().set(_pending_key(student_id, lesson_id), True, timeout=PENDING_MARKER_SECONDS)
+        with self.lock:
+            if (student_id, lesson_id) in self.pending:
+                return False
+            if self.segment is None:
+                self.segment = _Segment(self.journal_dir)
+                self.segments.append(self.segment)
+            segment = self.segment
+            written = segment.append(line)
+            self.rows.append((student_id, lesson_id, course_id))
+            self.pending.add((student_id, lesson_id))
+            self.stats["max_depth"] = max(self.stats["max_depth"], len(self.rows))
+            if len(self.rows) == 1 or len(self.rows) >= self.flush_rows:
+                self.ready.notify()
+
+        if self.fsync:
+            segment.sync(written)
+        return True
+
+    def is_pending(self, student_id, lesson_id):
+        return (student_id, lesson_id) in self.pending
+
+    def take(self, wait=True):
+        # The rows (and journal files) for the next flush, once there are any and
+        # COMPLETION_FLUSH_MS has passed or COMPLETION_FLUSH_ROWS are waiting
+        with self.lock:
+            if self.retrying is not None:
+                batch, self.retrying = self.retrying, None
+                return batch
+            while wait and not self.rows:
+                self.ready.wait()
+            deadline = time.monotonic() + self.flush_seconds
+            while wait and len(self.rows) < self.flush_rows:
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    break
+                self.ready.wait(left)
+            rows, segments = self.rows, self.segments
+            self.rows, self.segments, self.segment = [], [], None
+            return rows, segments
+
+    def run(self):
+        # Journals left by a crashed process first, off the request path
+        try:
+            replay_journals(self.journal_dir, self.flush_rows)
+        except Exception:
+            logger.exception("Replaying lesson completion journals failed; run manage.py replay_completions")
+
+        while True:
+            rows, segments = self.take()
+            close_old_connections()
+            if not self.flush(rows, segments):
+                time.sleep(self.retry_delay())  # database down: don't spin
+            self.log_stats()
+
+    def flush(self, rows, segments):
+        if not rows:
+            return True
+
+        started = time.perf_counter()
+        try:
+            written = store_completions(rows)
+        except Exception:
+            with self.lock:
+                self.stats["failures"] += 1
+                self.attempts += 1
+                give_up = self.attempts > self.max_retries
+                if not give_up:
+                    self.retrying = (rows, segments)
+            if not give_up:
+                logger.exception("Writing %d lesson completions failed, will retry", len(rows))
+                return False
+            logger.exception(
+                "Writing %d lesson completions failed %d times, moving their journal to %s",
+                len(rows), self.attempts, DEAD_LETTER_DIR,
+            )
+            self.dead_letter(rows, segments)
+            return False
+
+        elapsed = (time.perf_counter() - started) * 1000
+        with self.lock:
+            self.attempts = 0
+            self.stats["flushes"] += 1
+            self.stats["flushed"] += written
+            self.stats["flush_ms"].append(elapsed)
+            depth = len(self.rows)
+        for segment in segments:
+            segment.discard()
+        self.forget(rows)
+
+        logger.debug("Wrote %d lesson completions (%d new) in %.1f ms, %d waiting", len(rows), written, elapsed, depth)
+        return True
+
+    def dead_letter(self, rows, segments):
+        # Out of the flusher's way, still on disk for `replay_completions --dead-letter`
+        dead_letter_dir = self.journal_dir / DEAD_LETTER_DIR
+        dead_letter_dir.mkdir(exist_ok=True)
+        for segment in segments:
+            segment.move_to(dead_letter_dir)
+            logger.error("Moved lesson completion journal %s to %s", segment.path.name, DEAD_LETTER_DIR)
+        with self.lock:
+            self.attempts = 0
+            self.stats["dead_lettered"] += len(rows)
+        # Not written: the next lesson stays locked until the journal is replayed
+        self.forget(rows)
+
+    def forget(self, rows):
+        # No longer pending, written or given up on
+        with self.lock:
+            self.pending.difference_update((student_id, lesson_id) for student_id, lesson_id, _ in rows)
+        try:
+            _cache().delete_many([_pending_key(student_id, lesson_id) for student_id, lesson_id, _ in rows])
+        except Exception:
+            logger.exception("Clearing pending completion markers failed, they expire on their own")
+
+    def retry_delay(self):
+        return min(RETRY_SECONDS * 2 ** max(self.attempts - 1, 0), MAX_RETRY_SECONDS)
+
+    def drain(self):
+        # Write whatever is waiting now, e.g. at shutdown; a batch being retried goes first
+        with self.lock:
+            retrying = self.retrying is not None
+        if retrying and not self.flush(*self.take(wait=False)):
+            return False  # the rest stay in their journals for the next replay
+        return self.flush(*self.take(wait=False))
+
+    def log_stats(self):
+        # Buffer health on "courses.completions" every COMPLETION_STATS_SECONDS of activity
+        if not self.stats_seconds or time.monotonic() - self.stats_logged < self.stats_seconds:
+            return
+        self.stats_logged = time.monotonic()
+        logger.info(
+            "Completion buffer: depth=%(depth)d unflushed=%(unflushed)d max_depth=%(max_depth)d "
+            "flushes=%(flushes)d flushed=%(flushed)d failures=%(failures)d dead_lettered=%(dead_lettered)d "
+            "last_flush_ms=%(last_flush_ms).1f max_flush_ms=%(max_flush_ms).1f",
+            self.snapshot(),
+        )
+
+    def snapshot(self):
+        with self.lock:
+            flush_ms = self.stats["flush_ms"]
+            return {
+                "depth": len(self.rows),
+                "unflushed": len(self.pending),
+                "max_depth": self.stats["max_depth"],
+                "flushes": self.stats["flushes"],
+                "flushed": self.stats["flushed"],
+                "failures": self.stats["failures"],
+                "dead_lettered": self.stats["dead_lettered"],
+                "last_flush_ms": flush_ms[-1] if flush_ms else 0,
+                "max_flush_ms": max(flush_ms, default=0),
+            }
+
+
+def replay_journals(journal_dir, batch_size):
+    """
+    Write the completions in journal files no live process holds (left by a
+    crash) and delete the files. Returns (files, completions written).
+    """
+    files = written = 0
+    for path in sorted(Path(journal_dir).glob(f"*{JOURNAL_SUFFIX}")):
+        with open(path, "rb") as f:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                continue  # a running process's current journal
+
+            rows = []
+            for line in f:
+                try:
+                    rows.append(tuple(json.loads(line)))
+                except ValueError:
+                    break  # the line being written when the process died
+            for start in range(0, len(rows), batch_size):
+                written += store_completions(rows[start:start + batch_size])
+            path.unlink(missing_ok=True)
+            files += 1
+            logger.warning("Replayed %d lesson completions from %s", len(rows), path.name)
+    return files, written
+
+
+def get_buffer():
+    global _buffer
+    with _buffer_lock:
+        if _buffer is None:
+            if fcntl is None:
+                raise ImproperlyConfigured("COMPLETION_WRITE_BEHIND needs fcntl (Linux, macOS).")
+            _buffer = CompletionBuffer(
+                settings.COMPLETION_JOURNAL_DIR,
+                flush_ms=settings.COMPLETION_FLUSH_MS,
+                flush_rows=settings.COMPLETION_FLUSH_ROWS,
+                fsync=settings.COMPLETION_JOURNAL_FSYNC,
+                stats_seconds=settings.COMPLETION_STATS_SECONDS,
+                max_retries=settings.COMPLETION_FLUSH_RETRIES,
+            )
+            _buffer.start()
+        return _buffer
+
+
+def is_pending(student_id, lesson_id):
+    # Completed but not written yet, in this process or another (write-behind only)
+    return bool(pending_lessons(student_id, [lesson_id]))
+
+
+def pending_lessons(student_id, lesson_ids):
+    # The subset of lesson_ids the student completed that isn't written yet
+    if not settings.COMPLETION_WRITE_BEHIND or not lesson_ids:
+        return set()
+    pending = {lesson_id for lesson_id in lesson_ids if _buffer is not None and _buffer.is_pending(student_id, lesson_id)}
+    rest = {_pending_key(student_id, lesson_id): lesson_id for lesson_id in lesson_ids if lesson_id not in pending}
+    if rest:
+        pending.update(rest[key] for key in _cache().get_many(list(rest)))
+    return pending
+
+
+def buffer_stats():
+    # Depth and flush latency of this process's buffer, None if it never started
+    return _buffer.snapshot() if _buffer is not None else None
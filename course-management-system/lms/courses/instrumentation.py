@@ -0,0 +1,135 @@
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+# Per-request timings for RequestTimingMiddleware (REQUEST_TIMING). Every
+# database connection gets an execute wrapper that adds each query's time
+# to the timings of the request running it, looked up through a context
+# variable, so queries an async view runs in sync_to_async() threads count
+# too. Serializer time is what the read serializers and RowSerializer spend
+# in to_representation(), queries they trigger included.
+
+_current = ContextVar("request_timings", default=None)
+
+STRING_RE = re.compile(r"'(?:[^']|'')*'")
+NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+PARAM_RE = re.compile(r"%s|\?")
+IN_LIST_RE = re.compile(r"\(\?(?:\s*,\s*\?)+\)")
+SPACE_RE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=2048)
+def normalize_sql(sql):
+    # The query's shape: literals and parameters as ?, IN lists of any length as (...)
+    sql = STRING_RE.sub("?", sql)
+    sql = NUMBER_RE.sub("?", sql)
+    sql = PARAM_RE.sub("?", sql)
+    sql = IN_LIST_RE.sub("(...)", sql)
+    return SPACE_RE.sub(" ", sql).strip()
+
+
+class RequestTimings:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.view = None  # dotted path of the view, once resolved
+        self.view_started = None
+        self.view_ms = 0.0
+        self.queries = 0
+        self.db_ms = 0.0
+        self.serializer_ms = 0.0
+        self.serializing = False
+        self.shapes = Counter()  # normalized SQL -> times run
+        self.slow_queries = []  # (ms, alias, normalized SQL)
+
+    def add_query(self, alias, sql, elapsed_ms):
+        shape = normalize_sql(sql)
+        self.queries += 1
+        self.db_ms += elapsed_ms
+        self.shapes[shape] += 1
+        if settings.SLOW_QUERY_MS and elapsed_ms >= settings.SLOW_QUERY_MS:
+            self.slow_queries.append((elapsed_ms, alias, shape))
+
+    def repeated(self):
+        # Shapes run at least NPLUSONE_THRESHOLD times: one query per row of something
+        threshold = settings.NPLUSONE_THRESHOLD
+        if not threshold:
+            return []
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= threshold]
+
+    def total_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    def server_timing(self, total_ms):
+        return ", ".join([
+            f'db;dur={self.db_ms:.1f};desc="{self.queries} queries"',
+            f"serializer;dur={self.serializer_ms:.1f}",
+            f"view;dur={self.view_ms:.1f}",
+            f"total;dur={total_ms:.1f}",
+        ])
+
+
+def start_request():
+    timings = RequestTimings()
+    _current.set(timings)
+    return timings
+
+
+def end_request():
+    _current.set(None)
+
+
+def record_query(execute, sql, params, many, context):
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.add_query(context["connection"].alias, sql, (time.perf_counter() - started) * 1000)
+
+
+def _wrap_connection(sender, connection, **kwargs):
+    # On every (re)connect, as a connection object outlives its database connections
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def install():
+    # Wrap this thread's open connections now and every connection made from here on
+    connection_created.connect(_wrap_connection, dispatch_uid="courses.instrumentation")
+    for connection in connections.all(initialized_only=True):
+        _wrap_connection(None, connection)
+
+
+@contextmanager
+def serializing():
+    # Count the block as serializer time; nested serializers aren't counted twice
+    timings = _current.get()
+    if timings is None or timings.serializing:
+        yield
+        return
+
+    timings.serializing = True
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.serializing = False
+        timings.serializer_ms += (time.perf_counter() - started) * 1000
+
+
+class TimedSerializerMixin:
+    # Serializer time for RequestTimingMiddleware; list first in the bases
+
+    def to_representation(self, instance):
+        with serializing():
+            return super().to_representation(instance)
@@ -0,0 +1,446 @@
+import io
+import json
+import math
+import platform
+import statistics
+import time
+from datetime import datetime, timezone
+
+import django
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from rest_framework.test import APIClient
+
+from courses.access import enrollment_cache
+from courses.models import Course, Enrollment, LessonProgress, Lessons
+from courses.search import rebuild_index
+
+User = get_user_model()
+
+PASSWORD = "bench-Passw0rd!"
+
+# Max queries per request, cold caches or warm. These don't depend on the
+# dataset size, so any growth means an N+1 crept in.
+QUERY_BUDGETS = {
+    "auth.register": 3,
+    "auth.token": 2,
+    "auth.token_refresh": 6,
+    "auth.logout": 4,
+    "auth.me": 0,
+    "courses.list": 2,
+    "courses.list_cursor": 1,
+    "courses.search": 2,
+    "courses.detail": 2,
+    "courses.detail_progress": 4,
+    "courses.create": 2,
+    "courses.manage": 3,
+    "courses.instructor_list": 2,
+    "courses.analytics": 4,
+    "lessons.list": 2,
+    "lessons.create": 8,
+    "lessons.manage": 7,
+    "lessons.bulk": 13,
+    "lessons.detail": 4,
+    "lessons.course_detail": 4,
+    "enrollments.enroll": 13,
+    "enrollments.mine": 2,
+    "progress.complete": 8,
+    "progress.bulk": 8,
+    "progress.summary": 1,
+    "progress.list": 3,
+}
+
+# Every request of an endpoint must answer with this status (200 if not listed):
+# a 404 or 400 is cheap and would pass any budget.
+EXPECTED_STATUS = {
+    "auth.register": 201,
+    "auth.logout": 205,
+    "courses.create": 201,
+    "lessons.create": 201,
+    "enrollments.enroll": 201,
+    "progress.complete": 201,
+    "progress.bulk": 201,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a synthetic dataset into a throwaway test database, hit every route in "
+        "courses/urls.py and users/urls.py, and report query counts, p50/p95 latency and "
+        "payload size per endpoint as JSON. Fails if an endpoint exceeds its query budget "
+        "or answers with an unexpected status."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--courses", type=int, default=200)
+        parser.add_argument("--lessons-per-course", type=int, default=20)
+        parser.add_argument("--instructors", type=int, default=20)
+        parser.add_argument("--students", type=int, default=200)
+        parser.add_argument("--enrollments-per-student", type=int, default=5)
+        parser.add_argument(
+            "--completed-per-enrollment",
+            type=int,
+            default=5,
+            help="Lessons completed per enrollment; progress rows = students x enrollments x this.",
+        )
+        parser.add_argument("--iterations", type=int, default=30, help="Timed requests per endpoint.")
+        parser.add_argument("--output", help="Write the JSON report here (default: stdout).")
+        parser.add_argument("--compare", help="Earlier report to diff against.")
+        parser.add_argument("--keepdb", action="store_true", help="Reuse the test database between runs.")
+
+    def handle(self, *args, **options):
+        if options["iterations"] * 2 >= options["courses"]:
+            # Write endpoints use a fresh course per iteration from each end of the catalog
+            raise CommandError("--courses must be more than twice --iterations.")
+        if options["lessons_per_course"] < 3:
+            raise CommandError("--lessons-per-course must be at least 3.")
+
+        previous = None
+        if options["compare"]:
+            # Read it up front: --output may point at the same file
+            with open(options["compare"], encoding="utf-8") as f:
+                previous = json.load(f)["endpoints"]
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options["keepdb"])
+        try:
+            seed_started = time.perf_counter()
+            self.seed(options)
+            seed_seconds = time.perf_counter() - seed_started
+
+            results = self.run_endpoints(options["iterations"])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options["keepdb"])
+            teardown_test_environment()
+
+        report = {
+            "meta": {
+                "generated_at": datetime.now(timezone.utc).isoformat(),
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "database": settings.DATABASES["default"]["ENGINE"],
+                "seed_seconds": round(seed_seconds, 2),
+                "scale": {
+                    key: options[key]
+                    for key in (
+                        "courses", "lessons_per_course", "instructors", "students",
+                        "enrollments_per_student", "completed_per_enrollment", "iterations",
+                    )
+                },
+            },
+            "endpoints": results,
+        }
+
+        payload = json.dumps(report, indent=2, sort_keys=True)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as f:
+                f.write(payload + "\n")
+        else:
+            self.stdout.write(payload)
+
+        self.print_summary(results)
+        if previous is not None:
+            self.print_comparison(options["compare"], previous, results)
+
+        failures = []
+        over_budget = [name for name, row in results.items() if not row["within_budget"]]
+        if over_budget:
+            failures.append(f"Query budget exceeded: {', '.join(over_budget)}")
+        wrong_status = [
+            f"{name} ({','.join(map(str, row['statuses']))}, expected {row['expected_status']})"
+            for name, row in results.items()
+            if row["statuses"] != [row["expected_status"]]
+        ]
+        if wrong_status:
+            failures.append(f"Unexpected status: {', '.join(wrong_status)}")
+        if failures:
+            raise CommandError("; ".join(failures))
+
+    # Dataset
+
+    def seed(self, options):
+        password = make_password(PASSWORD)  # hash once, reuse for every synthetic user
+        batch = 5000
+
+        instructors = User.objects.bulk_create(
+            [
+                User(username=f"bench_instructor_{i}", role=User.Role.INSTRUCTOR, password=password)
+                for i in range(options["instructors"])
+            ],
+            batch_size=batch,
+        )
+        students = User.objects.bulk_create(
+            [
+                User(username=f"bench_student_{i}", role=User.Role.STUDENT, password=password)
+                for i in range(options["students"])
+            ],
+            batch_size=batch,
+        )
+        self.instructor = instructors[0]
+        self.student = students[0]
+
+        courses = Course.objects.bulk_create(
+            [
+                Course(
+                    title=f"Course {i}",
+                    description=f"Synthetic course {i}. " * 20,
+                    instructor=instructors[i % len(instructors)],
+                )
+                for i in range(options["courses"])
+            ],
+            batch_size=batch,
+        )
+        self.courses = courses
+
+        per_course = options["lessons_per_course"]
+        lessons = []
+        for course in courses:
+            for order in range(1, per_course + 1):
+                lessons.append(Lessons(
+                    course=course,
+                    title=f"Lesson {order}",
+                    video_url=f"https://videos.example.com/{course.pk}/{order}",
+                    duration=10,
+                    order=order,
+                ))
+                if len(lessons) >= batch:
+                    Lessons.objects.bulk_create(lessons)
+                    lessons = []
+        Lessons.objects.bulk_create(lessons)
+
+        lesson_ids = {}
+        for lesson_id, course_id in Lessons.objects.order_by("course_id", "order").values_list("id", "course_id"):
+            lesson_ids.setdefault(course_id, []).append(lesson_id)
+        self.lesson_ids = lesson_ids
+
+        # Student 0 is enrolled (without progress) in courses 1..iterations, one per
+        # timed request of the student endpoints; everyone else gets history.
+        enrollments = [
+            Enrollment(student=self.student, course=course)
+            for course in courses[1:options["iterations"] + 1]
+        ]
+        progress = []
+        per_student = min(options["enrollments_per_student"], len(courses))
+        completed = min(options["completed_per_enrollment"], per_course)
+        for n, student in enumerate(students[1:], start=1):
+            for k in range(per_student):
+                course = courses[(n + k) % len(courses)]
+                enrollments.append(Enrollment(student=student, course=course))
+                for lesson_id in lesson_ids[course.pk][:completed]:
+                    progress.append(LessonProgress(student=student, lesson_id=lesson_id, completed=True))
+            if len(progress) >= batch:
+                Enrollment.objects.bulk_create(enrollments)
+                LessonProgress.objects.bulk_create(progress)
+                enrollments, progress = [], []
+        Enrollment.objects.bulk_create(enrollments)
+        LessonProgress.objects.bulk_create(progress)
+
+        Course.objects.refresh_lesson_stats()
+        call_command("reconcile_progress", stdout=io.StringIO())
+        rebuild_index()  # bulk_create sends no signals
+
+    # Endpoints
+
+    def client_for(self, user=None):
+        client = APIClient()
+        if user is not None:
+            client.force_authenticate(user)
+        return client
+
+    def login(self, user):
+        client = APIClient()
+        response = client.post("/api/auth/token/", {"username": user.username, "password": PASSWORD}, format="json")
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+        return client
+
+    def endpoints(self):
+        # name -> (method, route, prepare(i) -> (client, url, data))
+        instructor, student = self.instructor, self.student
+        own_course = Course.objects.filter(instructor=instructor).order_by("pk").first()
+        own_lessons = self.lesson_ids[own_course.pk]
+        # Student 0 works through courses 1..iterations, one per iteration
+        student_courses = self.courses[1:]
+
+        # Catalog pages the seeded courses fill, so every ?page= exists
+        pages = math.ceil(len(self.courses) / settings.REST_FRAMEWORK["PAGE_SIZE"])
+
+        anon = self.client_for()
+        instructor_client = self.login(instructor)
+        student_client = self.login(student)
+
+        def enrolled_client(i):
+            return student_courses[i]
+
+        def refresh_client(i):
+            client = APIClient()
+            client.post("/api/auth/token/", {"username": student.username, "password": PASSWORD}, format="json")
+            return client
+
+        return {
+            "auth.register": ("POST", "auth/register/", lambda i: (
+                anon, "/api/auth/register/",
+                {"username": f"bench_reg_{i}", "email": f"r{i}@example.com", "password": PASSWORD, "role": "student"},
+            )),
+            "auth.token": ("POST", "auth/token/", lambda i: (
+                APIClient(), "/api/auth/token/", {"username": student.username, "password": PASSWORD},
+            )),
+            "auth.token_refresh": ("POST", "auth/token/refresh/", lambda i: (
+                refresh_client(i), "/api/auth/token/refresh/", {},
+            )),
+            "auth.logout": ("POST", "auth/logout/", lambda i: (
+                refresh_client(i), "/api/auth/logout/", {},
+            )),
+            "auth.me": ("GET", "me/", lambda i: (student_client, "/api/me/", None)),
+
+            "courses.list": ("GET", "courses/", lambda i: (
+                anon, f"/api/courses/?page={i % min(pages, 5) + 1}", None,
+            )),
+            "courses.list_cursor": ("GET", "courses/?pagination=cursor", lambda i: (
+                anon, "/api/courses/?pagination=cursor", None,
+            )),
+            "courses.search": ("GET", "courses/search/?q=", lambda i: (
+                anon, f"/api/courses/search/?q=course%20{i}", None,
+            )),
+            "courses.detail": ("GET", "courses/<pk>/", lambda i: (anon, f"/api/courses/{self.courses[i].pk}/", None)),
+            "courses.detail_progress": ("GET", "courses/<pk>/?include=progress", lambda i: (
+                student_client, f"/api/courses/{enrolled_client(i).pk}/?include=progress", None,
+            )),
+            "courses.create": ("POST", "courses/create/", lambda i: (
+                instructor_client, "/api/courses/create/", {"title": f"New {i}", "description": "Bench"},
+            )),
+            "courses.manage": ("PATCH", "courses/<pk>/manage/", lambda i: (
+                instructor_client, f"/api/courses/{own_course.pk}/manage/", {"title": f"Renamed {i}"},
+            )),
+            "courses.instructor_list": ("GET", "instructor/courses/", lambda i: (
+                instructor_client, "/api/instructor/courses/", None,
+            )),
+
+            "courses.analytics": ("GET", "instructor/courses/<course_id>/analytics/", lambda i: (
+                instructor_client, f"/api/instructor/courses/{own_course.pk}/analytics/?days={i % 30 + 1}", None,
+            )),
+
+            "lessons.list": ("GET", "courses/<course_id>/lessons/", lambda i: (
+                anon, f"/api/courses/{self.courses[i].pk}/lessons/", None,
+            )),
+            "lessons.create": ("POST", "courses/<course_id>/lessons/create", lambda i: (
+                instructor_client, f"/api/courses/{own_course.pk}/lessons/create",
+                {"title": f"Extra {i}", "video_url": "https://videos.example.com/x", "duration": 5, "order": 10000 + i},
+            )),
+            "lessons.manage": ("PATCH", "courses/<course_id>/lessons/<lesson_id>/manage/", lambda i: (
+                instructor_client, f"/api/courses/{own_course.pk}/lessons/{own_lessons[0]}/manage/",
+                {"duration": 10 + i % 2},
+            )),
+            "lessons.bulk": ("PUT", "courses/<course_id>/lessons/bulk/", lambda i: (
+                instructor_client, f"/api/courses/{own_course.pk}/lessons/bulk/",
+                {"lessons": [{"id": pk} for pk in (own_lessons if i % 2 else own_lessons[::-1])]},
+            )),
+            "lessons.detail": ("GET", "lessons/<lesson_id>", lambda i: (
+                student_client, f"/api/lessons/{self.lesson_ids[enrolled_client(i).pk][0]}", None,
+            )),
+            "lessons.course_detail": ("GET", "courses/<course_id>/lessons/<lesson_id>/", lambda i: (
+                student_client,
+                f"/api/courses/{enrolled_client(i).pk}/lessons/{self.lesson_ids[student_courses[i].pk][0]}/",
+                None,
+            )),
+
+            "enrollments.enroll": ("POST", "courses/<pk>/enrollment/", lambda i: (
+                student_client, f"/api/courses/{student_courses[-1 - i].pk}/enrollment/", {},
+            )),
+            "enrollments.mine": ("GET", "myenrollments/", lambda i: (student_client, "/api/myenrollments/", None)),
+
+            "progress.complete": ("POST", "courses/<course_id>/lessons/<lesson_id>/completed/", lambda i: (
+                student_client,
+                f"/api/courses/{enrolled_client(i).pk}/lessons/{self.lesson_ids[student_courses[i].pk][0]}/completed/",
+                {},
+            )),
+            "progress.bulk": ("POST", "courses/<course_id>/progress/bulk/", lambda i: (
+                student_client, f"/api/courses/{enrolled_client(i).pk}/progress/bulk/",
+                {"lessons": self.lesson_ids[student_courses[i].pk][1:3]},
+            )),
+            "progress.summary": ("GET", "courses/<course_id>/progress/", lambda i: (
+                student_client, f"/api/courses/{enrolled_client(i).pk}/progress/", None,
+            )),
+            "progress.list": ("GET", "courses/<course_id>/progress/list/", lambda i: (
+                student_client, f"/api/courses/{enrolled_client(i).pk}/progress/list/", None,
+            )),
+        }
+
+    def run_endpoints(self, iterations):
+        results = {}
+        for name, (method, route, prepare) in self.endpoints().items():
+            timings, sizes, query_counts, statuses = [], [], [], set()
+
+            for i in range(iterations):
+                client, url, data = prepare(i)
+                if i == 0:
+                    # First request runs with empty caches, the rest warm: all are budgeted
+                    caches[settings.COURSE_CACHE_ALIAS].clear()
+                    enrollment_cache.clear()
+
+                with CaptureQueriesContext(connection) as queries:
+                    started = time.perf_counter()
+                    response = client.generic(
+                        method, url, json.dumps(data) if data is not None else "",
+                        content_type="application/json",
+                    )
+                    timings.append((time.perf_counter() - started) * 1000)
+
+                query_counts.append(len(queries))
+                statuses.add(response.status_code)
+                sizes.append(len(response.content))
+
+            budget = QUERY_BUDGETS.get(name)
+            results[name] = {
+                "method": method,
+                "route": route,
+                "statuses": sorted(statuses),
+                "expected_status": EXPECTED_STATUS.get(name, 200),
+                "queries": query_counts[0],
+                "max_queries": max(query_counts),
+                "query_budget": budget,
+                "within_budget": budget is None or max(query_counts) <= budget,
+                "p50_ms": round(statistics.median(timings), 3),
+                "p95_ms": round(_percentile(timings, 95), 3),
+                "bytes": max(sizes),
+            }
+        return results
+
+    # Output
+
+    def print_summary(self, results):
+        self.stderr.write(f"{'endpoint':28} {'status':>10} {'queries':>9} {'p50 ms':>9} {'p95 ms':>9} {'bytes':>8}")
+        for name, row in results.items():
+            queries = f"{row['max_queries']}/{row['query_budget']}"
+            line = (
+                f"{name:28} {','.join(map(str, row['statuses'])):>10} {queries:>9} "
+                f"{row['p50_ms']:>9.2f} {row['p95_ms']:>9.2f} {row['bytes']:>8}"
+            )
+            ok = row["within_budget"] and row["statuses"] == [row["expected_status"]]
+            self.stderr.write(line if ok else self.style.ERROR(line))
+
+    def print_comparison(self, path, previous, results):
+        self.stderr.write(f"\nCompared with {path}:")
+        for name, row in results.items():
+            old = previous.get(name)
+            if old is None:
+                self.stderr.write(f"{name:28} new endpoint")
+                continue
+            delta_queries = row["queries"] - old["queries"]
+            delta_p50 = row["p50_ms"] - old["p50_ms"]
+            ratio = (row["p50_ms"] / old["p50_ms"]) if old["p50_ms"] else 0
+            self.stderr.write(
+                f"{name:28} queries {old['queries']:>3} -> {row['queries']:<3} ({delta_queries:+d})  "
+                f"p50 {old['p50_ms']:.2f} -> {row['p50_ms']:.2f} ms ({delta_p50:+.2f}, x{ratio:.2f})"
+            )
+
+
+def _percentile(values, percent):
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(percent / 100 * len(ordered)) - 1))
+    return ordered[index]
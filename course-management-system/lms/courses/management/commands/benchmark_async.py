@@ -0,0 +1,248 @@
+import asyncio
+import importlib
+import os
+import statistics
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from wsgiref.util import setup_testing_defaults
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from django.urls import clear_url_caches
+
+from courses.access import enrollment_cache
+from users.serializers import ClaimsTokenObtainPairSerializer
+
+from .benchmark_api import Command as BenchmarkCommand, _percentile
+
+HOST = "testserver"
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the read-heavy course and progress endpoints served three ways: sync views "
+        "on a threaded WSGI worker, sync views under ASGI, and the async views under ASGI. "
+        "Requests are fired concurrently at Django's own WSGI/ASGI handlers in-process, the "
+        "way gunicorn threads or a uvicorn event loop would, against a seeded test database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=2000, help="Requests per mode.")
+        parser.add_argument("--concurrency", type=int, default=32, help="Requests in flight at once.")
+        parser.add_argument(
+            "--threads",
+            type=int,
+            default=8,
+            help="WSGI worker threads (a gunicorn --threads setting); ASGI gets --concurrency in flight.",
+        )
+        parser.add_argument("--courses", type=int, default=200)
+        parser.add_argument("--students", type=int, default=200)
+
+    def handle(self, *args, **options):
+        tmpdir = None
+        if connection.vendor == "sqlite":
+            # Worker threads each open their own connection, so it must be a file
+            tmpdir = tempfile.TemporaryDirectory()
+            connection.settings_dict["TEST"]["NAME"] = os.path.join(tmpdir.name, "benchmark.sqlite3")
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            requests = self.seed(options)
+            connections.close_all()
+
+            results = {}
+            with self.read_views(asynchronous=False):
+                results["wsgi, sync views"] = self.run_wsgi(requests, options["threads"])
+                results["asgi, sync views"] = self.run_asgi(requests, options["concurrency"])
+            with self.read_views(asynchronous=True):
+                results["asgi, async views"] = self.run_asgi(requests, options["concurrency"])
+        finally:
+            connections.close_all()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+            if tmpdir is not None:
+                tmpdir.cleanup()
+
+        self.print_results(results, options)
+
+    def seed(self, options):
+        bench = BenchmarkCommand()
+        bench.seed({
+            "instructors": 20,
+            "students": options["students"],
+            "courses": options["courses"],
+            "lessons_per_course": 10,
+            "iterations": 10,
+            "enrollments_per_student": 5,
+            "completed_per_enrollment": 5,
+        })
+        token = str(ClaimsTokenObtainPairSerializer.get_token(bench.student).access_token)
+        auth = f"Bearer {token}"
+        enrolled = bench.courses[1:11]  # student 0's enrollments
+
+        requests = []
+        for i in range(options["requests"]):
+            course = bench.courses[i % len(bench.courses)]
+            mine = enrolled[i % len(enrolled)]
+            requests.append([
+                ("/api/courses/", f"page={i % 5 + 1}", None),
+                (f"/api/courses/{course.pk}/", "", None),
+                (f"/api/courses/{course.pk}/lessons/", "", None),
+                (f"/api/courses/{mine.pk}/progress/", "", auth),
+                (f"/api/courses/{mine.pk}/progress/list/", "", auth),
+            ][i % 5])
+        return requests
+
+    def read_views(self, asynchronous):
+        command = self
+
+        class Switch(override_settings):
+            # courses/urls.py picks the views at import time
+            def enable(self):
+                super().enable()
+                command.reload_urls()
+
+            def disable(self):
+                super().disable()
+                command.reload_urls()
+
+        return Switch(ASYNC_READ_VIEWS=asynchronous)
+
+    def reload_urls(self):
+        import courses.urls
+
+        importlib.reload(courses.urls)
+        clear_url_caches()
+        caches[settings.COURSE_CACHE_ALIAS].clear()
+        enrollment_cache.clear()
+
+    # Runners
+
+    def run_wsgi(self, requests, threads):
+        handler = WSGIHandler()
+
+        def call(request):
+            path, query, auth = request
+            environ = {"PATH_INFO": path, "QUERY_STRING": query, "HTTP_HOST": HOST}
+            if auth:
+                environ["HTTP_AUTHORIZATION"] = auth
+            setup_testing_defaults(environ)
+
+            status = []
+            started = time.perf_counter()
+            response = handler(environ, lambda s, headers, exc_info=None: status.append(s))
+            try:
+                b"".join(response)
+            finally:
+                response.close()
+            return int(status[0].split()[0]), (time.perf_counter() - started) * 1000
+
+        with ThreadCounter() as counter, ThreadPoolExecutor(max_workers=threads) as pool:
+            started = time.perf_counter()
+            outcomes = list(pool.map(call, requests))
+            elapsed = time.perf_counter() - started
+        return self.summarize(outcomes, elapsed, counter.peak)
+
+    def run_asgi(self, requests, concurrency):
+        handler = ASGIHandler()
+
+        async def call(request, limit):
+            path, query, auth = request
+            headers = [(b"host", HOST.encode())]
+            if auth:
+                headers.append((b"authorization", auth.encode()))
+            scope = {
+                "type": "http",
+                "asgi": {"version": "3.0"},
+                "http_version": "1.1",
+                "method": "GET",
+                "scheme": "http",
+                "path": path,
+                "raw_path": path.encode(),
+                "query_string": query.encode(),
+                "root_path": "",
+                "headers": headers,
+                "client": ("127.0.0.1", 50000),
+                "server": (HOST, 80),
+            }
+            body = [{"type": "http.request", "body": b"", "more_body": False}]
+            disconnected = asyncio.Event()  # never set: the client stays connected
+            status = []
+
+            async def receive():
+                if body:
+                    return body.pop()
+                await disconnected.wait()
+
+            async def send(message):
+                if message["type"] == "http.response.start":
+                    status.append(message["status"])
+
+            async with limit:
+                started = time.perf_counter()
+                await handler(scope, receive, send)
+                return status[0], (time.perf_counter() - started) * 1000
+
+        async def run():
+            limit = asyncio.Semaphore(concurrency)
+            started = time.perf_counter()
+            outcomes = await asyncio.gather(*(call(request, limit) for request in requests))
+            return outcomes, time.perf_counter() - started
+
+        with ThreadCounter() as counter:
+            outcomes, elapsed = asyncio.run(run())
+        return self.summarize(outcomes, elapsed, counter.peak)
+
+    def summarize(self, outcomes, elapsed, peak_threads):
+        timings = [ms for _, ms in outcomes]
+        return {
+            "requests": len(outcomes),
+            "rps": len(outcomes) / elapsed,
+            "p50": statistics.median(timings),
+            "p95": _percentile(timings, 95),
+            "statuses": Counter(status for status, _ in outcomes),
+            "peak_threads": peak_threads,
+        }
+
+    def print_results(self, results, options):
+        self.stdout.write(
+            f"{options['requests']} requests per mode, {options['concurrency']} in flight under ASGI, "
+            f"{options['threads']} WSGI threads"
+        )
+        self.stdout.write(
+            f"{'mode':20} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'threads':>8}  statuses"
+        )
+        for mode, row in results.items():
+            statuses = ", ".join(f"{code} x{n}" for code, n in sorted(row["statuses"].items()))
+            self.stdout.write(
+                f"{mode:20} {row['rps']:>8.1f} {row['p50']:>8.2f} {row['p95']:>8.2f} "
+                f"{row['peak_threads']:>8}  {statuses}"
+            )
+        self.stdout.write("threads = peak live threads in the process while serving.")
+
+
+class ThreadCounter:
+    # Samples threading.active_count() in the background to record the peak
+    def __enter__(self):
+        self.peak = threading.active_count()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def _sample(self):
+        while not self._stop.wait(0.002):
+            self.peak = max(self.peak, threading.active_count() - 1)
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
@@ -0,0 +1,103 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from rest_framework.test import APIClient
+
+from courses.models import Course
+from courses.search import rebuild_index
+
+from .benchmark_api import Command as BenchmarkCommand, _percentile
+
+WORDS = [
+    "python", "django", "data", "machine", "learning", "web", "design", "cloud", "security",
+    "music", "history", "finance", "photography", "statistics", "writing", "marketing",
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a large catalog into a throwaway test database and time the course search "
+        "endpoint (index lookup, ranking and the page of courses) for common and rare "
+        "terms, prefixes and multi-word queries, first and later pages."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--courses", type=int, default=100000)
+        parser.add_argument("--iterations", type=int, default=50, help="Timed requests per query.")
+        parser.add_argument("--budget-ms", type=float, default=50.0, help="Fail if any p95 is above this.")
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            started = time.perf_counter()
+            self.seed(options["courses"])
+            self.stderr.write(f"Seeded and indexed {options['courses']} courses in {time.perf_counter() - started:.1f}s")
+            results = self.run_queries(options["iterations"])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        self.stdout.write(f"{'query':32} {'hits/page':>9} {'p50 ms':>8} {'p95 ms':>8}")
+        slow = []
+        for name, row in results.items():
+            line = f"{name:32} {row['hits']:>9} {row['p50']:>8.2f} {row['p95']:>8.2f}"
+            if row["p95"] > options["budget_ms"]:
+                slow.append(name)
+                line = self.style.ERROR(line)
+            self.stdout.write(line)
+        if slow:
+            raise CommandError(f"Over {options['budget_ms']:g} ms at p95: {', '.join(slow)}")
+
+    def seed(self, count):
+        BenchmarkCommand().seed({
+            "instructors": 20,
+            "students": 2,
+            "courses": count,
+            "lessons_per_course": 3,
+            "iterations": 1,
+            "enrollments_per_student": 1,
+            "completed_per_enrollment": 0,
+        })
+        # Give titles a realistic vocabulary: two topic words each, so terms range
+        # from common to rare (the pair) across the catalog
+        courses = list(Course.objects.only("id").order_by("pk"))
+        for n, course in enumerate(courses):
+            first, second = WORDS[n % len(WORDS)], WORDS[(n // len(WORDS)) % len(WORDS)]
+            course.title = f"{first.title()} {second} {n}"
+        Course.objects.bulk_update(courses, ["title"], batch_size=5000)
+        rebuild_index()
+
+    def run_queries(self, iterations):
+        client = APIClient()
+        first = client.get("/api/courses/search/?q=python").json()
+        queries = {
+            "common term": "/api/courses/search/?q=python",
+            "prefix": "/api/courses/search/?q=pyth",
+            "short prefix": "/api/courses/search/?q=da",
+            "two terms": "/api/courses/search/?q=python%20django",
+            "lesson title": "/api/courses/search/?q=lesson%202",
+            "single course": "/api/courses/search/?q=python%2042",
+            "no match": "/api/courses/search/?q=zzzz",
+            "common term, page 2": first["next"],
+        }
+
+        results = {}
+        for name, url in queries.items():
+            timings = []
+            for _ in range(iterations):
+                started = time.perf_counter()
+                # Fresh &_= each time so the catalog cache never answers
+                response = client.get(f"{url}&_={time.perf_counter_ns()}")
+                timings.append((time.perf_counter() - started) * 1000)
+                if response.status_code != 200:
+                    raise CommandError(f"{name}: {url} returned {response.status_code}")
+            results[name] = {
+                "hits": len(response.json()["results"]),
+                "p50": statistics.median(timings),
+                "p95": _percentile(timings, 95),
+            }
+        return results
@@ -0,0 +1,98 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+from courses.access import enrollment_cache
+from courses.models import Course, Lessons
+
+from .benchmark_api import Command as BenchmarkCommand
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the list endpoints served by the fast .values() serializer path (courses/rows.py) "
+        "against the DRF serializers, with cold caches. courses/tests.py checks that both "
+        "give the same bytes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--courses", type=int, default=200)
+        parser.add_argument("--iterations", type=int, default=30)
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            bench = self.seed(options)
+            rows = [(name, *self.time(client, url, options["iterations"])) for name, (client, url) in self.cases(bench).items()]
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        self.stdout.write(f"{'case':32} {'drf ms':>8} {'fast ms':>8} {'speedup':>8}")
+        for name, drf_ms, fast_ms in rows:
+            self.stdout.write(f"{name:32} {drf_ms:>8.2f} {fast_ms:>8.2f} {drf_ms / fast_ms:>7.2f}x")
+
+    def seed(self, options):
+        bench = BenchmarkCommand()
+        bench.seed({
+            "instructors": 5,
+            "students": 20,
+            "courses": options["courses"],
+            "lessons_per_course": 20,
+            "iterations": 10,
+            "enrollments_per_student": 5,
+            "completed_per_enrollment": 3,
+        })
+        # Awkward values: non-ASCII, JS line separators, a thumbnail with built variants
+        odd = bench.courses[-1]
+        Course.objects.filter(pk=odd.pk).update(
+            title="Ünïcode ✓ \u2028 \"quoted\" 🎓",
+            description="Line one\nLine two\u2029",
+            thumbnail="thumbnails/odd name.png",
+            thumbnail_hash="ab" * 32,
+        )
+        Lessons.objects.filter(course=odd).update(title="Leçon \u2028 <b>", video_url="https://videos.example.com/ü?a=1&b=2")
+        bench.odd = odd
+        return bench
+
+    def cases(self, bench):
+        anon = bench.client_for()
+        student = bench.client_for(bench.student)
+        odd, plain = bench.odd.pk, bench.courses[0].pk
+        cursor = anon.get("/api/courses/?pagination=cursor").data["next"]
+        return {
+            "courses": (anon, "/api/courses/"),
+            "courses page 3": (anon, "/api/courses/?page=3"),
+            "courses cursor": (anon, "/api/courses/?pagination=cursor&page_size=50"),
+            "courses cursor next": (anon, cursor),
+            "courses fields": (anon, "/api/courses/?fields=title,thumbnail_variants"),
+            "courses omit": (anon, "/api/courses/?omit=description,instructor_name"),
+            "lessons": (anon, f"/api/courses/{plain}/lessons/?page=2"),
+            "lessons odd": (anon, f"/api/courses/{odd}/lessons/"),
+            "lessons fields": (anon, f"/api/courses/{odd}/lessons/?fields=id,title,course"),
+            "myenrollments": (student, "/api/myenrollments/"),
+            "myenrollments fields": (student, "/api/myenrollments/?fields=id,title,created_at"),
+        }
+
+    def get(self, client, url, fast):
+        caches[settings.COURSE_CACHE_ALIAS].clear()
+        enrollment_cache.clear()
+        with override_settings(FAST_READ_SERIALIZERS=fast):
+            return client.get(url)
+
+    def time(self, client, url, iterations):
+        timings = {}
+        for fast in (False, True):
+            samples = []
+            for _ in range(iterations):
+                started = time.perf_counter()
+                self.get(client, url, fast)
+                samples.append((time.perf_counter() - started) * 1000)
+            timings[fast] = statistics.median(samples)
+        return timings[False], timings[True]
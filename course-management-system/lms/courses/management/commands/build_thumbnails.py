@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from courses.models import Course
+from courses.thumbnails import build_variants
+
+
+class Command(BaseCommand):
+    help = "Build resized thumbnail variants for courses that don't have them yet."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Rebuild for every course with a thumbnail, not just missing ones.",
+        )
+
+    def handle(self, *args, **options):
+        courses = Course.objects.exclude(thumbnail="").exclude(thumbnail__isnull=True)
+        if not options["all"]:
+            courses = courses.filter(thumbnail_hash="")
+
+        built = failed = 0
+        for pk, name in courses.values_list("pk", "thumbnail").iterator():
+            try:
+                build_variants(pk, name)
+            except Exception as e:
+                failed += 1
+                self.stderr.write(f"course {pk} ({name}): {e}")
+            else:
+                built += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Built variants for {built} course(s), {failed} failed."))
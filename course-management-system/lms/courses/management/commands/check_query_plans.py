@@ -0,0 +1,133 @@
+import re
+from types import SimpleNamespace
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.http import QueryDict
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from courses.analytics import enrollments_per_day, lesson_completions
+from courses.models import Course, CourseProgressSummary, Enrollment, LessonProgress, Lessons
+from courses.pagination import keyset_filter
+from courses.views import (
+    CourseListView,
+    InstructorCourseListApiView,
+    LessonListByCourseView,
+    MyEnrolledCoursesApiView,
+)
+
+from .benchmark_api import Command as BenchmarkCommand
+
+PAGE = 20
+
+# A full pass over a table, per backend. SQLite's "SCAN t USING [COVERING] INDEX"
+# walks an index in order (fine for a LIMITed page), a bare "SCAN t" reads the table.
+TABLE_SCAN = {
+    "sqlite": re.compile(r"\bSCAN (\w+)(?!\w| USING)"),
+    "postgresql": re.compile(r"Seq Scan on (\w+)"),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a throwaway test database, EXPLAIN the hot queries behind courses/views.py "
+        "and fail if any of them reads a whole table instead of using an index."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--courses", type=int, default=500)
+        parser.add_argument("--students", type=int, default=500)
+        parser.add_argument("--verbose-plans", action="store_true", help="Print every plan, not just failures.")
+
+    def handle(self, *args, **options):
+        pattern = TABLE_SCAN.get(connection.vendor)
+        if pattern is None:
+            raise CommandError(f"Don't know how to read {connection.vendor} query plans.")
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            self.seed(options)
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")
+                if connection.vendor == "postgresql":
+                    # Small tables make a seq scan the cheapest plan; what we
+                    # want to know is whether an index *can* be used.
+                    cursor.execute("SET enable_seqscan = off")
+            plans = {name: queryset.explain() for name, queryset in self.hot_queries().items()}
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        failures = []
+        for name, plan in plans.items():
+            scans = sorted(set(pattern.findall(plan)))
+            if scans:
+                failures.append(name)
+                self.stdout.write(self.style.ERROR(f"{name}: table scan on {', '.join(scans)}"))
+            else:
+                self.stdout.write(self.style.SUCCESS(f"{name}: ok"))
+            if scans or options["verbose_plans"]:
+                self.stdout.write("    " + plan.replace("\n", "\n    "))
+
+        if failures:
+            raise CommandError(f"{len(failures)} hot query(s) fall back to a table scan: {', '.join(failures)}")
+
+    def seed(self, options):
+        bench = BenchmarkCommand()
+        bench.seed({
+            "instructors": 20,
+            "students": options["students"],
+            "courses": options["courses"],
+            "lessons_per_course": 10,
+            "iterations": 10,
+            "enrollments_per_student": 5,
+            "completed_per_enrollment": 5,
+        })
+        self.instructor = bench.instructor
+        self.student = bench.student
+        self.course = bench.courses[1]  # student 0 is enrolled here
+        self.lesson_id = bench.lesson_ids[self.course.pk][0]
+
+    def view_queryset(self, view_class, user=None, **kwargs):
+        view = view_class()
+        view.request = SimpleNamespace(user=user, query_params=QueryDict())  # no ?fields= narrowing
+        view.kwargs = kwargs
+        return view.get_queryset()
+
+    def hot_queries(self):
+        student, course = self.student, self.course
+        catalog = CourseListView.queryset.all()
+        boundary = catalog[PAGE]
+
+        return {
+            # Catalog, offset and keyset pages
+            "courses.list": catalog[:PAGE],
+            "courses.list_cursor": keyset_filter(catalog, boundary.created_at, boundary.id)[:PAGE + 1],
+            "courses.instructor_list": self.view_queryset(InstructorCourseListApiView, self.instructor)[:PAGE],
+            "courses.mine": self.view_queryset(MyEnrolledCoursesApiView, student),
+
+            "lessons.list": self.view_queryset(LessonListByCourseView, course_id=course.pk),
+            "lessons.detail": Lessons.objects.select_related("course").filter(pk=self.lesson_id),
+
+            # Enrollment checks (AccessContext)
+            "enrollments.is_enrolled": Enrollment.objects.filter(student=student, course_id=course.pk),
+            "enrollments.course_ids": Enrollment.objects.filter(student=student).values_list("course_id", flat=True),
+
+            # Progress
+            "progress.completed_list": LessonProgress.objects.filter(
+                student=student, lesson__course=course, completed=True
+            ).values_list("lesson_id", flat=True),
+            "progress.completed_count": LessonProgress.objects.filter(
+                student_id=student.pk, lesson__course_id=course.pk, completed=True
+            ),
+            "progress.completed_by_lesson": LessonProgress.objects.filter(
+                lesson_id=self.lesson_id, completed=True
+            ).values("student"),
+            "progress.summary": CourseProgressSummary.objects.filter(student=student, course_id=course.pk),
+            "progress.summaries_by_course": CourseProgressSummary.objects.filter(course_id=course.pk),
+
+            # Instructor analytics
+            "analytics.lesson_completions": lesson_completions(course.pk),
+            "analytics.enrollments_per_day": enrollments_per_day(course.pk, boundary.created_at),
+        }
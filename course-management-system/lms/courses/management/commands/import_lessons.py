@@ -0,0 +1,153 @@
+import csv
+import json
+import sys
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, transaction
+from django.db.models import Max
+
+from courses.cache import bump_catalog
+from courses.models import Course, CourseProgressSummary, Lessons
+from courses.search import schedule_reindex
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream lessons from a CSV or JSON Lines file into the database in batches. "
+        "Columns/keys: course, title, video_url, duration and optionally order "
+        "(appended after the course's last lesson when missing)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="File to import, or - for stdin.")
+        parser.add_argument(
+            "--format",
+            choices=["csv", "jsonl"],
+            help="Input format (default: from the file extension, csv for stdin).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Rows per bulk insert (default: 1000).",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Validate and insert everything, then roll back.",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        fmt = options["format"] or ("jsonl" if path.endswith((".jsonl", ".ndjson")) else "csv")
+        batch_size = options["batch_size"]
+
+        self.next_order = {}  # course_id -> next free order, loaded once per course
+        touched = set()
+        imported = 0
+
+        stream = sys.stdin if path == "-" else open(path, newline="", encoding="utf-8")
+        try:
+            with transaction.atomic():
+                batch = []
+                for line_no, row in self.read_rows(stream, fmt):
+                    batch.append((line_no, row))
+                    if len(batch) >= batch_size:
+                        imported += self.import_batch(batch, touched)
+                        batch = []
+                if batch:
+                    imported += self.import_batch(batch, touched)
+
+                # Stored stats for every course we touched, set-based
+                Course.objects.filter(pk__in=touched).refresh_lesson_stats()
+                CourseProgressSummary.objects.filter(course_id__in=touched).refresh_counts()
+                schedule_reindex(*touched)
+                bump_catalog(*touched)
+
+                if options["dry_run"]:
+                    transaction.set_rollback(True)
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        verb = "Validated" if options["dry_run"] else "Imported"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {imported} lesson(s) into {len(touched)} course(s)."
+        ))
+
+    def read_rows(self, stream, fmt):
+        if fmt == "csv":
+            reader = csv.DictReader(stream)
+            for row in reader:
+                yield reader.line_num, row
+            return
+
+        for line_no, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield line_no, json.loads(line)
+            except json.JSONDecodeError as e:
+                raise CommandError(f"line {line_no}: invalid JSON ({e.msg})")
+
+    def import_batch(self, batch, touched):
+        self.load_next_orders({row.get("course") for _, row in batch})
+
+        lessons = []
+        for line_no, row in batch:
+            try:
+                course_id = int(row.get("course"))
+            except (TypeError, ValueError):
+                raise CommandError(f"line {line_no}: invalid course {row.get('course')!r}")
+            if course_id not in self.next_order:
+                raise CommandError(f"line {line_no}: course {course_id} does not exist")
+
+            order = row.get("order")
+            if order in (None, ""):
+                order = self.next_order[course_id]
+
+            lesson = Lessons(
+                course_id=course_id,
+                title=row.get("title"),
+                video_url=row.get("video_url"),
+                duration=row.get("duration"),
+                order=order,
+            )
+            try:
+                # Field validation only; order collisions are left to the unique constraint
+                lesson.clean_fields(exclude=["course"])
+            except ValidationError as e:
+                raise CommandError(f"line {line_no}: {e.message_dict}")
+
+            self.next_order[course_id] = max(self.next_order[course_id], lesson.order + 1)
+            touched.add(course_id)
+            lessons.append(lesson)
+
+        try:
+            Lessons.objects.bulk_create(lessons)
+        except IntegrityError:
+            raise CommandError(
+                f"lines {batch[0][0]}-{batch[-1][0]}: an order is already used in its course"
+            )
+        return len(lessons)
+
+    def load_next_orders(self, raw_ids):
+        course_ids = set()
+        for raw in raw_ids:
+            try:
+                course_ids.add(int(raw))
+            except (TypeError, ValueError):
+                continue
+
+        missing = course_ids.difference(self.next_order)
+        if not missing:
+            return
+
+        rows = (
+            Course.objects.filter(pk__in=missing)
+            .annotate(max_order=Max("lessons__order"))
+            .values_list("pk", "max_order")
+        )
+        for pk, max_order in rows:
+            self.next_order[pk] = (max_order or 0) + 1
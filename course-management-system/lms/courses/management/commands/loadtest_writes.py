@@ -0,0 +1,260 @@
+import logging
+import os
+import statistics
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from rest_framework.test import APIClient
+
+from courses import completions
+from courses.models import Course, LessonProgress, Lessons
+
+from .benchmark_api import _percentile
+
+User = get_user_model()
+
+# What a stock SQLite connection looks like: rollback journal, default 5s busy
+# timeout, deferred transactions. journal_mode is stored in the file, so it is
+# switched back explicitly rather than just left out.
+STOCK_SQLITE_OPTIONS = {"init_command": "PRAGMA journal_mode=DELETE"}
+
+
+class Command(BaseCommand):
+    help = (
+        "Concurrent write load test: writer threads enroll students and mark lessons "
+        "completed through the API while reader threads poll course progress, against a "
+        "throwaway file-backed test database. Reports writes/sec, p50/p95 latency and errors "
+        "for the configured database profile, and with --compare-stock for untuned SQLite too."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--writers", type=int, default=8, help="Concurrent writer threads.")
+        parser.add_argument("--readers", type=int, default=4, help="Concurrent reader threads.")
+        parser.add_argument("--courses", type=int, default=20)
+        parser.add_argument("--courses-per-writer", type=int, default=5, help="Enrollments per writer.")
+        parser.add_argument("--lessons", type=int, default=5, help="Lessons completed per enrollment.")
+        parser.add_argument(
+            "--compare-stock",
+            action="store_true",
+            help="SQLite only: run once with stock connection settings first, then with the configured profile.",
+        )
+        parser.add_argument(
+            "--write-behind",
+            action="store_true",
+            help="Then run the configured profile again with COMPLETION_WRITE_BEHIND on.",
+        )
+
+    def handle(self, *args, **options):
+        if options["courses_per_writer"] > options["courses"]:
+            raise CommandError("--courses-per-writer can't exceed --courses.")
+
+        is_sqlite = connection.vendor == "sqlite"
+        if options["compare_stock"] and not is_sqlite:
+            raise CommandError("--compare-stock only applies to SQLite.")
+
+        tmpdir = None
+        if is_sqlite:
+            # Threads need a real file: the default in-memory test database
+            # can't show lock contention.
+            tmpdir = tempfile.TemporaryDirectory()
+            connection.settings_dict["TEST"]["NAME"] = os.path.join(tmpdir.name, "loadtest.sqlite3")
+
+        configured_options = dict(connection.settings_dict["OPTIONS"])
+        phases = [("configured", configured_options, False)]
+        if options["compare_stock"]:
+            phases.insert(0, ("stock", STOCK_SQLITE_OPTIONS, False))
+        if options["write_behind"]:
+            phases.append(("write-behind", configured_options, True))
+
+        # Failed requests are counted below; don't dump a traceback for each one
+        logging.getLogger("django.request").setLevel(logging.CRITICAL)
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            self.seed(options)
+            results = {}
+            for phase, db_options, write_behind in phases:
+                self.use_options(db_options)
+                if write_behind:
+                    results[phase] = self.run_write_behind_phase(phase, options)
+                else:
+                    results[phase] = self.run_phase(phase, options)
+        finally:
+            self.use_options(configured_options)
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+            if tmpdir is not None:
+                tmpdir.cleanup()
+
+        self.print_results(results)
+
+    def use_options(self, db_options):
+        # Applied to connections opened from now on, including each thread's own
+        connections.close_all()
+        connection.settings_dict["OPTIONS"] = dict(db_options)
+
+    def seed(self, options):
+        self.password = make_password("loadtest-Passw0rd!")
+        instructor = User.objects.create(
+            username="loadtest_instructor", role=User.Role.INSTRUCTOR, password=self.password,
+        )
+        courses = Course.objects.bulk_create([
+            Course(title=f"Load course {i}", description="Load test", instructor=instructor)
+            for i in range(options["courses"])
+        ])
+        Lessons.objects.bulk_create([
+            Lessons(
+                course=course,
+                title=f"Lesson {order}",
+                video_url=f"https://videos.example.com/{course.pk}/{order}",
+                duration=10,
+                order=order,
+            )
+            for course in courses
+            for order in range(1, options["lessons"] + 1)
+        ])
+        Course.objects.refresh_lesson_stats()
+
+        self.course_ids = [course.pk for course in courses]
+        self.lesson_ids = {}
+        for lesson_id, course_id in Lessons.objects.order_by("course_id", "order").values_list("id", "course_id"):
+            self.lesson_ids.setdefault(course_id, []).append(lesson_id)
+
+    def run_write_behind_phase(self, phase, options):
+        with tempfile.TemporaryDirectory() as journal_dir, override_settings(
+            COMPLETION_WRITE_BEHIND=True, COMPLETION_JOURNAL_DIR=journal_dir
+        ):
+            buffer = completions.get_buffer()
+            # Timed until the last completion is in the database, not just accepted
+            result = self.run_phase(phase, options, settle=lambda: self.wait_for_flush(buffer))
+            result["buffer"] = buffer.snapshot()
+            result["stored"] = LessonProgress.objects.filter(student__username__startswith=f"loadtest_{phase}_").count()
+            return result
+
+    def wait_for_flush(self, buffer):
+        while buffer.snapshot()["unflushed"]:
+            time.sleep(0.005)
+
+    def run_phase(self, phase, options, settle=None):
+        writers = User.objects.bulk_create([
+            User(username=f"loadtest_{phase}_writer_{i}", role=User.Role.STUDENT, password=self.password)
+            for i in range(options["writers"])
+        ])
+        reader = User.objects.create(
+            username=f"loadtest_{phase}_reader", role=User.Role.STUDENT, password=self.password,
+        )
+        self.client_for(reader).post(f"/api/courses/{self.course_ids[0]}/enrollment/")
+        connections.close_all()
+
+        write_timings, read_timings = [], []
+        errors = Counter()
+        lock = threading.Lock()
+        writers_done = threading.Event()
+        start = threading.Barrier(len(writers) + options["readers"])
+
+        def record(timings, started, response=None, error=None):
+            elapsed = (time.perf_counter() - started) * 1000
+            with lock:
+                if error is not None:
+                    errors[f"{type(error).__name__}: {error}"] += 1
+                elif response.status_code >= 400:
+                    errors[f"HTTP {response.status_code}"] += 1
+                else:
+                    timings.append(elapsed)
+
+        def request(timings, send):
+            started = time.perf_counter()
+            try:
+                response = send()
+            except Exception as e:
+                record(timings, started, error=e)
+            else:
+                record(timings, started, response=response)
+
+        def write(n, student):
+            client = self.client_for(student)
+            try:
+                start.wait()
+                for k in range(options["courses_per_writer"]):
+                    course_id = self.course_ids[(n + k) % len(self.course_ids)]
+                    request(write_timings, lambda: client.post(f"/api/courses/{course_id}/enrollment/"))
+                    for lesson_id in self.lesson_ids[course_id]:
+                        request(write_timings, lambda: client.post(
+                            f"/api/courses/{course_id}/lessons/{lesson_id}/completed/"
+                        ))
+            finally:
+                connections.close_all()
+
+        def read():
+            client = self.client_for(reader)
+            try:
+                start.wait()
+                while not writers_done.is_set():
+                    request(read_timings, lambda: client.get(f"/api/courses/{self.course_ids[0]}/progress/"))
+            finally:
+                connections.close_all()
+
+        writer_threads = [threading.Thread(target=write, args=(n, s)) for n, s in enumerate(writers)]
+        reader_threads = [threading.Thread(target=read) for _ in range(options["readers"])]
+
+        started = time.perf_counter()
+        for thread in writer_threads + reader_threads:
+            thread.start()
+        for thread in writer_threads:
+            thread.join()
+        if settle is not None:
+            settle()
+        elapsed = time.perf_counter() - started
+        writers_done.set()
+        for thread in reader_threads:
+            thread.join()
+
+        return {
+            "seconds": elapsed,
+            "writes": len(write_timings),
+            "reads": len(read_timings),
+            "write_timings": write_timings,
+            "read_timings": read_timings,
+            "errors": errors,
+        }
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def print_results(self, results):
+        header = (
+            f"{'profile':12} {'writes':>7} {'writes/s':>9} {'w p50':>8} {'w p95':>8} "
+            f"{'reads':>7} {'r p95':>8} {'errors':>7}"
+        )
+        self.stdout.write(header)
+        for phase, row in results.items():
+            writes, reads = row["write_timings"], row["read_timings"]
+            self.stdout.write(
+                f"{phase:12} {row['writes']:>7} {row['writes'] / row['seconds']:>9.1f} "
+                f"{statistics.median(writes) if writes else 0:>8.2f} "
+                f"{_percentile(writes, 95) if writes else 0:>8.2f} "
+                f"{row['reads']:>7} {_percentile(reads, 95) if reads else 0:>8.2f} "
+                f"{sum(row['errors'].values()):>7}"
+            )
+        for phase, row in results.items():
+            if "buffer" in row:
+                buffer = row["buffer"]
+                self.stdout.write(
+                    f"{phase}: {row['stored']} completions stored in {buffer['flushes']} flushes, "
+                    f"max buffer depth {buffer['max_depth']}, flush max {buffer['max_flush_ms']:.1f} ms, "
+                    f"{buffer['failures']} failed flushes, {buffer['dead_lettered']} dead-lettered"
+                )
+        for phase, row in results.items():
+            for message, count in row["errors"].most_common(5):
+                self.stderr.write(self.style.WARNING(f"{phase}: {count} x {message}"))
+        self.stdout.write("Latencies in ms.")
@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from courses.cache import bump_catalog
+from courses.search import SearchUnavailable, rebuild_index, reindex_courses
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the course search index (FTS5 on SQLite, tsvector on PostgreSQL) from the "
+        "courses and lessons tables. Migration 0007 fills it; run this after writes that skip "
+        "the model signals and schedule_reindex(), such as raw SQL or QuerySet.update() on "
+        "course or lesson titles."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--course",
+            type=int,
+            action="append",
+            dest="course_ids",
+            help="Only reindex this course id (repeatable).",
+        )
+        parser.add_argument("--batch-size", type=int, default=5000, help="Courses per INSERT (default: 5000).")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        course_ids = options["course_ids"] or []
+        try:
+            with transaction.atomic():
+                if course_ids:
+                    reindex_courses(course_ids)
+                else:
+                    rebuild_index(batch_size=options["batch_size"])
+                # Cached search results predate the rebuild
+                bump_catalog(*course_ids)
+        except SearchUnavailable as exc:
+            raise CommandError(exc.detail)
+
+        scope = f"{len(course_ids)} course(s)" if course_ids else "all courses"
+        self.stdout.write(self.style.SUCCESS(
+            f"Reindexed {scope} in {time.perf_counter() - started:.2f}s."
+        ))
@@ -0,0 +1,80 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from courses.models import CourseProgressSummary, Enrollment, LessonProgress, Lessons
+
+
+class Command(BaseCommand):
+    help = "Rebuild CourseProgressSummary rows for every enrollment from Lessons and LessonProgress."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--course",
+            type=int,
+            action="append",
+            dest="course_ids",
+            help="Limit to this course id (repeatable).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Rows per bulk upsert (default: 1000).",
+        )
+
+    def handle(self, *args, **options):
+        course_ids = options["course_ids"]
+        batch_size = options["batch_size"]
+
+        enrollments = Enrollment.objects.all()
+        lessons = Lessons.objects.all()
+        progress = LessonProgress.objects.filter(completed=True)
+        if course_ids:
+            enrollments = enrollments.filter(course_id__in=course_ids)
+            lessons = lessons.filter(course_id__in=course_ids)
+            progress = progress.filter(lesson__course_id__in=course_ids)
+
+        # Two GROUP BY queries give every count we need
+        totals = dict(
+            lessons.order_by().values("course_id").annotate(n=Count("id")).values_list("course_id", "n")
+        )
+        completed = {
+            (student_id, course_id): n
+            for student_id, course_id, n in (
+                progress.order_by()
+                .values("student_id", "lesson__course_id")
+                .annotate(n=Count("id"))
+                .values_list("student_id", "lesson__course_id", "n")
+            )
+        }
+
+        written = 0
+        with transaction.atomic():
+            batch = []
+            rows = enrollments.values_list("id", "student_id", "course_id").iterator(chunk_size=batch_size)
+            for enrollment_id, student_id, course_id in rows:
+                batch.append(CourseProgressSummary(
+                    enrollment_id=enrollment_id,
+                    student_id=student_id,
+                    course_id=course_id,
+                    completed_count=completed.get((student_id, course_id), 0),
+                    total_lessons=totals.get(course_id, 0),
+                ))
+                if len(batch) >= batch_size:
+                    written += self._upsert(batch)
+                    batch = []
+            if batch:
+                written += self._upsert(batch)
+
+        self.stdout.write(self.style.SUCCESS(f"Reconciled {written} progress summary row(s)."))
+
+    def _upsert(self, batch):
+        # last_completed_at is not derivable from LessonProgress, so existing values are kept
+        CourseProgressSummary.objects.bulk_create(
+            batch,
+            update_conflicts=True,
+            unique_fields=["enrollment"],
+            update_fields=["completed_count", "total_lessons"],
+        )
+        return len(batch)
@@ -0,0 +1,30 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from courses import completions
+
+
+class Command(BaseCommand):
+    help = (
+        "Write the lesson completions left in COMPLETION_JOURNAL_DIR by a crashed process "
+        "and delete their journal files. Journals of running processes are skipped. "
+        "Safe to run any time; the web processes do the same when their buffer starts."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dead-letter",
+            action="store_true",
+            help="Replay the journals a flusher gave up on (COMPLETION_JOURNAL_DIR/dead-letter) instead.",
+        )
+
+    def handle(self, *args, **options):
+        if completions.fcntl is None:
+            raise CommandError("Completion journals need fcntl (Linux, macOS).")
+        journal_dir = Path(settings.COMPLETION_JOURNAL_DIR)
+        if options["dead_letter"]:
+            journal_dir /= completions.DEAD_LETTER_DIR
+        files, written = completions.replay_journals(journal_dir, settings.COMPLETION_FLUSH_ROWS)
+        self.stdout.write(f"Replayed {files} journal file(s), {written} new completion(s).")
@@ -0,0 +1,66 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import F, Q
+
+from courses.cache import bump_catalog
+from courses.models import Course
+
+
+class Command(BaseCommand):
+    help = "Backfill or verify the stored lessons_count / total_duration_minutes on Course."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Only report courses whose stored stats drifted; exit non-zero if any did.",
+        )
+        parser.add_argument(
+            "--course",
+            type=int,
+            action="append",
+            dest="course_ids",
+            help="Limit to this course id (repeatable).",
+        )
+
+    def handle(self, *args, **options):
+        courses = Course.objects.all()
+        if options["course_ids"]:
+            courses = courses.filter(pk__in=options["course_ids"])
+
+        drifted = (
+            courses.with_actual_lesson_stats()
+            .filter(
+                ~Q(lessons_count=F("actual_lessons_count"))
+                | ~Q(total_duration_minutes=F("actual_total_duration"))
+            )
+            .order_by("pk")
+            .values_list(
+                "pk",
+                "lessons_count",
+                "actual_lessons_count",
+                "total_duration_minutes",
+                "actual_total_duration",
+            )
+        )
+
+        rows = list(drifted)
+        for pk, stored_count, count, stored_minutes, minutes in rows:
+            self.stdout.write(
+                f"course {pk}: lessons_count {stored_count} -> {count}, "
+                f"total_duration_minutes {stored_minutes} -> {minutes}"
+            )
+
+        if options["check"]:
+            if rows:
+                raise CommandError(f"{len(rows)} course(s) have stale lesson stats.")
+            self.stdout.write(self.style.SUCCESS("All course lesson stats are up to date."))
+            return
+
+        with transaction.atomic():
+            updated = courses.refresh_lesson_stats()
+            bump_catalog(*[row[0] for row in rows])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Recomputed lesson stats for {updated} course(s), {len(rows)} were stale."
+        ))
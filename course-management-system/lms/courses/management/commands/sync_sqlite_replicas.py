@@ -0,0 +1,42 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy the SQLite database into the DJANGO_DB_REPLICAS files, to try the read "
+        "replica routing locally. With --every, keep copying every N seconds: the time "
+        "in between is the replication lag."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--every", type=float, default=0, help="Seconds between copies; 0 copies once.")
+
+    def handle(self, *args, **options):
+        if connections[DEFAULT_DB_ALIAS].vendor != "sqlite":
+            raise CommandError("Only for DJANGO_DB_ENGINE=sqlite; use the database's own replication otherwise.")
+        if not settings.DB_REPLICAS:
+            raise CommandError("Set DJANGO_DB_REPLICAS to one or more replica database files.")
+
+        while True:
+            for alias in settings.DB_REPLICAS:
+                started = time.perf_counter()
+                self.copy(settings.DATABASES[DEFAULT_DB_ALIAS]["NAME"], settings.DATABASES[alias]["NAME"])
+                self.stdout.write(f"{alias}: copied in {(time.perf_counter() - started) * 1000:.0f} ms")
+            if not options["every"]:
+                return
+            time.sleep(options["every"])
+
+    def copy(self, source_name, target_name):
+        # The online backup API: a consistent snapshot, even while the app writes
+        source = sqlite3.connect(source_name)
+        target = sqlite3.connect(target_name, timeout=20)
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
@@ -0,0 +1,158 @@
+import hashlib
+import mimetypes
+import os
+import re
+import stat
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotAllowed
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_etags
+
+from .thumbnails import VARIANT_ROOT
+
+# MEDIA_URL for deployments without a web server of their own in front of
+# MEDIA_ROOT, or with one that should only serve files Django points it at.
+# Django answers the conditional part (ETag, Last-Modified, 304) and then
+# either hands the file to the front server (MEDIA_SENDFILE) or streams it
+# itself through FileResponse, which the WSGI server can turn into
+# sendfile(). Thumbnail variants have content-hashed paths and are cached
+# for a year; anything else is revalidated on each use.
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "public, no-cache"
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class _FileRange:
+    # `length` bytes of an open file from its current position. Has fileno(),
+    # so a WSGI server's sendfile() still applies (bounded by Content-Length).
+
+    def __init__(self, file, length):
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def is_immutable(path):
+    return path.startswith(f"{VARIANT_ROOT}/")
+
+
+def file_etag(path, st):
+    # Strong: a content-hashed path names its bytes; otherwise size and mtime
+    if is_immutable(path):
+        return f'"{hashlib.md5(path.encode(), usedforsecurity=False).hexdigest()}"'
+    return f'"{st.st_mtime_ns:x}-{st.st_size:x}"'
+
+
+def parse_range(header, size):
+    # (start, end) inclusive for a single satisfiable byte range, None to send
+    # the whole file (no header, several ranges, bad syntax, last byte before
+    # the first), or False if unsatisfiable (starts past the end, empty suffix)
+    match = RANGE_RE.match(header.replace(" ", ""))
+    if match is None or match.group(1) == match.group(2) == "":
+        return None
+    first, last = match.groups()
+    if first == "":
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    if last and int(last) < start:
+        return None  # invalid, so ignored (RFC 9110 14.1.1)
+    if start >= size:
+        return False
+    end = min(int(last), size - 1) if last else size - 1
+    return start, end
+
+
+def serve_media(request, path):
+    """
+    GET/HEAD a file under MEDIA_ROOT with strong ETags, Last-Modified,
+    single byte ranges and cache headers.
+    """
+    if request.method not in ("GET", "HEAD"):
+        return HttpResponseNotAllowed(["GET", "HEAD"])
+
+    try:
+        fullpath = safe_join(settings.MEDIA_ROOT, path)
+        st = os.stat(fullpath)
+    except (OSError, ValueError, SuspiciousFileOperation):
+        raise Http404("No such file.")
+    if not stat.S_ISREG(st.st_mode):
+        raise Http404("No such file.")
+
+    etag = file_etag(path, st)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": http_date(st.st_mtime),
+        "Cache-Control": IMMUTABLE if is_immutable(path) else REVALIDATE,
+    }
+    response = get_conditional_response(request, etag=etag, last_modified=int(st.st_mtime))
+    if response is not None:
+        # 304 (or 412), with the validators and cache policy
+        for name, value in headers.items():
+            response[name] = value
+        return response
+
+    content_type, encoding = mimetypes.guess_type(fullpath)
+    content_type = content_type if encoding is None else "application/octet-stream"
+    content_type = content_type or "application/octet-stream"
+
+    if settings.MEDIA_SENDFILE:
+        # The front server sends the bytes and handles Range itself
+        response = HttpResponse(content_type=content_type, headers=headers)
+        if settings.MEDIA_SENDFILE == "x-accel-redirect":
+            response["X-Accel-Redirect"] = settings.MEDIA_ACCEL_PREFIX + quote(path)
+        else:
+            response["X-Sendfile"] = fullpath
+        return response
+
+    headers["Accept-Ranges"] = "bytes"
+    byte_range = None
+    if "Range" in request.headers and if_range_matches(request, etag, st):
+        byte_range = parse_range(request.headers["Range"], st.st_size)
+    if byte_range is False:
+        return HttpResponse(status=416, headers={**headers, "Content-Range": f"bytes */{st.st_size}"})
+
+    start, end = byte_range or (0, st.st_size - 1)
+    length = end - start + 1
+    if request.method == "HEAD":
+        response = HttpResponse(content_type=content_type, headers=headers)
+    else:
+        file = open(fullpath, "rb")
+        file.seek(start)
+        response = FileResponse(_FileRange(file, length), content_type=content_type, headers=headers)
+    response["Content-Length"] = length
+    if byte_range:
+        response.status_code = 206
+        response["Content-Range"] = f"bytes {start}-{end}/{st.st_size}"
+    return response
+
+
+def if_range_matches(request, etag, st):
+    # Honour Range only while the client's copy is still the current one
+    if_range = request.headers.get("If-Range")
+    if if_range is None:
+        return True
+    if if_range.startswith(('"', "W/")):
+        return parse_etags(if_range) == [etag]
+    return if_range == http_date(st.st_mtime)
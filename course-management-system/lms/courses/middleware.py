@@ -0,0 +1,114 @@
+import logging
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.deprecation import MiddlewareMixin
+from rest_framework.permissions import SAFE_METHODS
+
+from . import instrumentation
+from .replicas import pin_to_primary
+
+logger = logging.getLogger("courses.access")
+timing_logger = logging.getLogger("courses.timing")
+
+
+class AccessContextStatsMiddleware(MiddlewareMixin):
+    """
+    Report how many course/lesson/enrollment queries the request-scoped
+    AccessContext saved. Logged at DEBUG on "courses.access"; with DEBUG on
+    the numbers are also sent back in an X-Access-Context header.
+    Sync and async capable, so it doesn't push async views onto a thread.
+    """
+
+    def process_response(self, request, response):
+        access = getattr(request, "access_context", None)
+        if access is None:
+            return response
+
+        logger.debug(
+            "%s %s: access lookups saved=%d queried=%d",
+            request.method, request.path, access.hits, access.misses,
+        )
+        if settings.DEBUG:
+            response["X-Access-Context"] = f"saved={access.hits}; queried={access.misses}"
+        return response
+
+
+class ReplicaPinMiddleware(MiddlewareMixin):
+    """
+    Keep a user's reads on the primary database for REPLICA_PIN_SECONDS after
+    a successful write of theirs (enrolling, completing a lesson, editing a
+    course), so they read their own writes while the replicas catch up.
+    Nothing to do without DJANGO_DB_REPLICAS.
+    """
+
+    def process_response(self, request, response):
+        if (
+            settings.DB_REPLICAS
+            and request.method not in SAFE_METHODS
+            and response.status_code < 400
+        ):
+            # DRF authenticates in the view and sets request.user on the Django request
+            user = getattr(request, "user", None)
+            if user is not None and user.is_authenticated:
+                pin_to_primary(user.pk)
+        return response
+
+
+class RequestTimingMiddleware(MiddlewareMixin):
+    """
+    Time each request (courses/instrumentation.py): query count and database
+    time, serializer time, view time and the total, sent back in a
+    Server-Timing header when SERVER_TIMING_HEADER is on. On "courses.timing",
+    logs requests over SLOW_REQUEST_MS and queries over SLOW_QUERY_MS with the
+    view and normalized SQL, and query shapes run NPLUSONE_THRESHOLD or more
+    times in one request (N+1). Goes first in MIDDLEWARE so the total covers
+    the other middleware.
+    """
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_TIMING:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+        instrumentation.install()
+
+    def process_request(self, request):
+        request.timings = instrumentation.start_request()
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view = getattr(view_func, "view_class", view_func)
+        request.timings.view = f"{view.__module__}.{view.__qualname__}"
+        request.timings.view_started = time.perf_counter()
+
+    def process_response(self, request, response):
+        timings = getattr(request, "timings", None)
+        if timings is None:
+            return response
+        instrumentation.end_request()
+
+        if timings.view_started is not None:
+            # The view, its rendering and the template response middleware
+            timings.view_ms = (time.perf_counter() - timings.view_started) * 1000
+        total_ms = timings.total_ms()
+        view = timings.view or request.path
+
+        for elapsed_ms, alias, sql in timings.slow_queries:
+            timing_logger.warning("Slow query in %s (%.1f ms on %s): %s", view, elapsed_ms, alias, sql)
+        for sql, count in timings.repeated():
+            timing_logger.warning("Query run %d times in %s, likely N+1: %s", count, view, sql)
+        if settings.SLOW_REQUEST_MS and total_ms >= settings.SLOW_REQUEST_MS:
+            timing_logger.warning(
+                "Slow request %s %s (%s): %.1f ms, %d queries in %.1f ms, serializer %.1f ms, view %.1f ms",
+                request.method, request.path, view, total_ms,
+                timings.queries, timings.db_ms, timings.serializer_ms, timings.view_ms,
+            )
+        else:
+            timing_logger.debug(
+                "%s %s (%s): %.1f ms, %d queries in %.1f ms",
+                request.method, request.path, view, total_ms, timings.queries, timings.db_ms,
+            )
+
+        if settings.SERVER_TIMING_HEADER:
+            response["Server-Timing"] = timings.server_timing(total_ms)
+        return response
@@ -0,0 +1,38 @@
+# Generated by Django 6.0.2 on 2026-10-17 10:00
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def backfill_lesson_stats(apps, schema_editor):
+    db = schema_editor.connection.alias
+    Course = apps.get_model("courses", "Course")
+    Lessons = apps.get_model("courses", "Lessons")
+
+    lessons = Lessons.objects.using(db).filter(course=OuterRef("pk")).order_by().values("course")
+    Course.objects.using(db).update(
+        lessons_count=Coalesce(Subquery(lessons.annotate(c=Count("id")).values("c")), 0),
+        total_duration_minutes=Coalesce(Subquery(lessons.annotate(s=Sum("duration")).values("s")), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0002_remove_lessonprogress_unique_lesson_progree_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='lessons_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='total_duration_minutes',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_lesson_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 6.0.2 on 2026-10-17 11:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_summaries(apps, schema_editor):
+    # One summary per existing enrollment, so reading progress never has to build one
+    db = schema_editor.connection.alias
+    Enrollment = apps.get_model('courses', 'Enrollment')
+    Lessons = apps.get_model('courses', 'Lessons')
+    LessonProgress = apps.get_model('courses', 'LessonProgress')
+    CourseProgressSummary = apps.get_model('courses', 'CourseProgressSummary')
+
+    totals = dict(
+        Lessons.objects.using(db).order_by().values('course_id').annotate(n=Count('id')).values_list('course_id', 'n')
+    )
+    completed = {
+        (student_id, course_id): n
+        for student_id, course_id, n in (
+            LessonProgress.objects.using(db).filter(completed=True).order_by()
+            .values('student_id', 'lesson__course_id')
+            .annotate(n=Count('id'))
+            .values_list('student_id', 'lesson__course_id', 'n')
+        )
+    }
+
+    batch = []
+    for enrollment_id, student_id, course_id in (
+        Enrollment.objects.using(db).values_list('id', 'student_id', 'course_id').iterator(chunk_size=1000)
+    ):
+        batch.append(CourseProgressSummary(
+            enrollment_id=enrollment_id,
+            student_id=student_id,
+            course_id=course_id,
+            completed_count=completed.get((student_id, course_id), 0),
+            total_lessons=totals.get(course_id, 0),
+        ))
+        if len(batch) >= 1000:
+            CourseProgressSummary.objects.using(db).bulk_create(batch)
+            batch = []
+    CourseProgressSummary.objects.using(db).bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0003_course_lesson_stats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseProgressSummary',
+            fields=[
+                ('enrollment', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='progress_summary', serialize=False, to='courses.enrollment')),
+                ('completed_count', models.PositiveIntegerField(default=0)),
+                ('total_lessons', models.PositiveIntegerField(default=0)),
+                ('last_completed_at', models.DateTimeField(blank=True, null=True)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='progresssummaries', to='courses.course')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='progresssummaries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('student', 'course'), name='unique_progress_summary')],
+            },
+        ),
+        migrations.RunPython(backfill_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.2 on 2026-10-17 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0004_courseprogresssummary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='thumbnail_hash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 6.0.2 on 2026-10-17 14:00
+
+from django.db import migrations
+
+# Raw tables (FTS5 / tsvector) the ORM has no model for; courses/search.py
+# reads and writes them. The DDL is written out here so later changes to that
+# module don't change this migration. Existing courses are indexed here too,
+# with one INSERT ... SELECT over courses_course and courses_lessons.
+
+CREATE = {
+    'sqlite': [
+        "CREATE VIRTUAL TABLE courses_course_fts USING fts5("
+        "title, description, lessons, "
+        "tokenize = 'unicode61 remove_diacritics 2', "
+        "prefix = '2 3'"
+        ")",
+    ],
+    'postgresql': [
+        "CREATE TABLE courses_course_search ("
+        "course_id bigint PRIMARY KEY REFERENCES courses_course (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+        "document tsvector NOT NULL)",
+        "CREATE INDEX courses_course_search_document_idx ON courses_course_search USING GIN (document)",
+    ],
+}
+
+FILL = {
+    'sqlite': [
+        "INSERT INTO courses_course_fts (rowid, title, description, lessons) "
+        "SELECT c.id, c.title, c.description, "
+        "(SELECT group_concat(l.title, ' ') FROM courses_lessons l WHERE l.course_id = c.id) "
+        "FROM courses_course c",
+    ],
+    'postgresql': [
+        "INSERT INTO courses_course_search (course_id, document) "
+        "SELECT c.id, "
+        "setweight(to_tsvector('simple', c.title), 'A') || "
+        "setweight(to_tsvector('simple', coalesce("
+        "(SELECT string_agg(l.title, ' ') FROM courses_lessons l WHERE l.course_id = c.id), '')), 'B') || "
+        "setweight(to_tsvector('simple', c.description), 'C') "
+        "FROM courses_course c",
+    ],
+}
+
+DROP = {
+    'sqlite': ["DROP TABLE IF EXISTS courses_course_fts"],
+    'postgresql': ["DROP TABLE IF EXISTS courses_course_search"],
+}
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for sql in CREATE.get(vendor, []) + FILL.get(vendor, []):
+        schema_editor.execute(sql)
+
+
+def drop_search_index(apps, schema_editor):
+    for sql in DROP.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0006_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
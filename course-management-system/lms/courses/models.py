@@ -1,17 +1,66 @@
 from django.db import models
+from django.db.models import Count, F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
 from django.conf import settings
 
 User = settings.AUTH_USER_MODEL
 
 
+class CourseQuerySet(models.QuerySet):
+    def bump_lesson_stats(self, lessons=0, minutes=0):
+        # Incremental update of the stored lesson stats, done in SQL so
+        # concurrent lesson writes don't overwrite each other.
+        # Clamped at 0 so a drifted row never violates the unsigned columns.
+        if not lessons and not minutes:
+            return 0
+        return self.update(
+            lessons_count=Greatest(F("lessons_count") + lessons, Value(0)),
+            total_duration_minutes=Greatest(F("total_duration_minutes") + minutes, Value(0)),
+        )
+
+    def with_actual_lesson_stats(self):
+        # Stats computed from the Lessons table, used to verify the stored columns
+        count, minutes = _actual_lesson_stats()
+        return self.annotate(actual_lessons_count=count, actual_total_duration=minutes)
+
+    def refresh_lesson_stats(self):
+        # Set-based recompute of the stored stats from the Lessons table
+        count, minutes = _actual_lesson_stats()
+        return self.update(lessons_count=count, total_duration_minutes=minutes)
+
+
+def _actual_lesson_stats(course_ref="pk"):
+    lessons = Lessons.objects.filter(course=OuterRef(course_ref)).order_by().values("course")
+    count = Coalesce(Subquery(lessons.annotate(c=Count("id")).values("c")), 0)
+    minutes = Coalesce(Subquery(lessons.annotate(s=Sum("duration")).values("s")), 0)
+    return count, minutes
+
+
 class Course(models.Model):
     title = models.CharField(max_length=200)
     description = models.TextField()
     thumbnail = models.ImageField(upload_to="thumbnails/", blank=True, null=True)
+    # sha256 of the thumbnail once its resized variants exist (courses/thumbnails.py)
+    thumbnail_hash = models.CharField(max_length=64, blank=True, default="")
     instructor = models.ForeignKey(User, on_delete=models.CASCADE, related_name="courses")
 
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Denormalized from Lessons, maintained by the Lessons signals (courses/signals.py).
+    # `python manage.py sync_course_stats` backfills/verifies them.
+    lessons_count = models.PositiveIntegerField(default=0)
+    total_duration_minutes = models.PositiveIntegerField(default=0)
+
+    objects = CourseQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Catalog pages and keyset cursors: ORDER BY -created_at, -id
+            models.Index(fields=["-created_at", "-id"], name="course_created_idx"),
+            # Instructor dashboard: WHERE instructor = ? ORDER BY -created_at, -id
+            models.Index(fields=["instructor", "-created_at", "-id"], name="course_instructor_created_idx"),
+        ]
+
     def __str__(self):
         return self.title
 
@@ -23,6 +72,10 @@ class Lessons(models.Model):
     duration = models.PositiveIntegerField()  # minutes
     order = models.PositiveIntegerField()
 
+    # (course_id, duration) as last loaded or saved, so a save adjusts the
+    # course's stored stats by the difference (courses/signals.py)
+    loaded_stats = None
+
     class Meta:
         ordering = ["order"]
         constraints = [
@@ -32,6 +85,14 @@ class Lessons(models.Model):
             )
         ]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        lesson = super().from_db(db, field_names, values)
+        loaded = dict(zip(field_names, values))
+        if "course_id" in loaded and "duration" in loaded:
+            lesson.loaded_stats = (loaded["course_id"], loaded["duration"])
+        return lesson
+
     def __str__(self):
         return f"{self.course.title} - {self.title}"
 
@@ -65,6 +126,100 @@ class LessonProgress(models.Model):
                 name="unique_lesson_progress",
             )
         ]
+        indexes = [
+            # Completed lessons per student (progress list and summary sync):
+            # only completed rows, and lesson_id is in the index so the
+            # join to Lessons never reads the progress table itself.
+            models.Index(
+                fields=["student", "lesson"],
+                condition=Q(completed=True),
+                name="progress_completed_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.student.username} - {self.lesson.title}"
+
+
+class CourseProgressSummaryQuerySet(models.QuerySet):
+    def bump(self, completed=0, total=0, last_completed_at=None):
+        # Incremental counter update in SQL, clamped at 0 like bump_lesson_stats()
+        changes = {}
+        if completed:
+            changes["completed_count"] = Greatest(F("completed_count") + completed, Value(0))
+        if total:
+            changes["total_lessons"] = Greatest(F("total_lessons") + total, Value(0))
+        if last_completed_at is not None:
+            changes["last_completed_at"] = last_completed_at
+        if not changes:
+            return 0
+        return self.update(**changes)
+
+    def refresh_counts(self):
+        # Set-based recompute of both counters, e.g. after lessons were bulk-deleted
+        completed = (
+            LessonProgress.objects.filter(
+                student=OuterRef("student"), lesson__course=OuterRef("course"), completed=True
+            )
+            .order_by().values("student").annotate(c=Count("id")).values("c")
+        )
+        count, _ = _actual_lesson_stats(course_ref="course")
+        return self.update(
+            completed_count=Coalesce(Subquery(completed), 0),
+            total_lessons=count,
+        )
+
+    def sync(self, enrollment):
+        # Recompute one student's summary from the source tables
+        completed = LessonProgress.objects.filter(
+            student_id=enrollment.student_id,
+            lesson__course_id=enrollment.course_id,
+            completed=True,
+        ).count()
+        total = Lessons.objects.filter(course_id=enrollment.course_id).count()
+
+        summary, _ = self.update_or_create(
+            enrollment=enrollment,
+            defaults={
+                "student_id": enrollment.student_id,
+                "course_id": enrollment.course_id,
+                "completed_count": completed,
+                "total_lessons": total,
+            },
+        )
+        return summary
+
+
+class CourseProgressSummary(models.Model):
+    """
+    Materialized per-student course progress, one row per enrollment.
+    Kept up to date by the completion and lesson write paths;
+    `python manage.py reconcile_progress` rebuilds it in bulk.
+    """
+    enrollment = models.OneToOneField(
+        Enrollment, on_delete=models.CASCADE, primary_key=True, related_name="progress_summary"
+    )
+    student = models.ForeignKey(User, on_delete=models.CASCADE, related_name="progresssummaries")
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name="progresssummaries")
+    completed_count = models.PositiveIntegerField(default=0)
+    total_lessons = models.PositiveIntegerField(default=0)
+    last_completed_at = models.DateTimeField(blank=True, null=True)
+
+    objects = CourseProgressSummaryQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["student", "course"],
+                name="unique_progress_summary",
+            )
+        ]
+
+    @property
+    def progress_percent(self):
+        if self.total_lessons == 0:
+            return 0
+        return round((self.completed_count / self.total_lessons) * 100, 2)
 
     def __str__(self):
-        return f"{self.student.username} - {self.lesson.title}"
\ No newline at end of file
+        return f"{self.student_id} - {self.course_id}: {self.completed_count}/{self.total_lessons}"
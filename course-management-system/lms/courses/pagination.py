@@ -0,0 +1,269 @@
+import base64
+import json
+import math
+from datetime import datetime
+
+from django.conf import settings
+from django.core.paginator import InvalidPage
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+# Largest id a cursor may carry: anything above doesn't fit a 64-bit integer
+# column, and SQLite raises on it rather than matching nothing
+MAX_CURSOR_ID = 2**63 - 1
+
+
+def cursor_id(value):
+    # The boundary row's id from a decoded cursor; a float, bool or string isn't one
+    if isinstance(value, bool) or not isinstance(value, int) or not 0 < value <= MAX_CURSOR_ID:
+        raise ValueError("invalid cursor id")
+    return value
+
+
+def keyset_filter(queryset, created_at, pk, reverse=False):
+    # Rows after the boundary in (-created_at, -id) order, or before it when
+    # walking backwards. The leading created_at bound gives the database a
+    # range to seek to on course_created_idx rather than an OR to test row by row.
+    if reverse:
+        return queryset.filter(
+            Q(created_at__gte=created_at),
+            Q(created_at__gt=created_at) | Q(id__gt=pk),
+        )
+    return queryset.filter(
+        Q(created_at__lte=created_at),
+        Q(created_at__lt=created_at) | Q(id__lt=pk),
+    )
+
+
+class CourseKeysetPagination(BasePagination):
+    """
+    Keyset (seek) pagination over (created_at, id), newest first.
+    No OFFSET and no COUNT(*): each page is a single indexed range scan.
+    The cursor is an opaque base64 token holding the boundary row's keys.
+    """
+    page_size = PageNumberPagination.page_size
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Invalid cursor."
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.set_page(list(self.get_page_queryset(queryset, request)))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        return self.set_page([obj async for obj in self.get_page_queryset(queryset, request)])
+
+    def read_request(self, request):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+
+        self.position = self.decode_cursor(request)
+        self.reverse = bool(self.position and self.position["reverse"])
+
+    def get_page_queryset(self, queryset, request):
+        self.read_request(request)
+
+        if self.position is not None:
+            queryset = keyset_filter(queryset, self.position["created_at"], self.position["id"], self.reverse)
+
+        if self.reverse:
+            queryset = queryset.order_by("created_at", "id")
+        else:
+            queryset = queryset.order_by("-created_at", "-id")
+
+        # One extra row tells us if there is another page in this direction
+        return queryset[:self.page_size + 1]
+
+    def set_page(self, rows):
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+
+        if self.reverse:
+            rows.reverse()
+            self.has_next = self.position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.position is not None
+
+        self.page = rows
+        return rows
+
+    def get_page_size(self, request):
+        raw = request.query_params.get(self.page_size_query_param)
+        if raw is None:
+            return self.page_size
+        try:
+            size = int(raw)
+        except ValueError:
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def encode_cursor(self, obj, reverse):
+        if isinstance(obj, dict):  # a .values() row (courses/rows.py)
+            created_at, pk = obj["created_at"], obj["id"]
+        else:
+            created_at, pk = obj.created_at, obj.id
+        payload = json.dumps(
+            {"c": created_at.isoformat(), "i": pk, "r": int(reverse)},
+            separators=(",", ":"),
+        )
+        return base64.urlsafe_b64encode(payload.encode("ascii")).decode("ascii")
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode("ascii")))
+            return {
+                "created_at": datetime.fromisoformat(payload["c"]),
+                "id": cursor_id(payload["i"]),
+                "reverse": bool(payload.get("r", 0)),
+            }
+        except (TypeError, ValueError, KeyError, OverflowError, UnicodeEncodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        cursor = self.encode_cursor(self.page[-1], reverse=False)
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        cursor = self.encode_cursor(self.page[0], reverse=True)
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+
+class SearchKeysetPagination(CourseKeysetPagination):
+    """
+    The same keyset pages and cursors over search hits (courses/search.py),
+    ordered by (score, id), best match first.
+    """
+
+    def paginate_hits(self, search, request):
+        # search(limit, after, reverse) -> [SearchHit], as search_courses() takes them
+        self.read_request(request)
+        after = None
+        if self.position is not None:
+            after = (self.position["score"], self.position["id"])
+        hits = search(limit=self.page_size + 1, after=after, reverse=self.reverse)
+        # Ranking stops at COURSE_SEARCH_MAX_CANDIDATES matches (the newest ones)
+        self.candidates_limited = bool(hits) and hits[0].candidates >= settings.COURSE_SEARCH_MAX_CANDIDATES
+        return self.set_page(hits)
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        response.data["candidates_limited"] = self.candidates_limited
+        return response
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema["properties"]["candidates_limited"] = {"type": "boolean"}
+        return response_schema
+
+    def encode_cursor(self, hit, reverse):
+        payload = json.dumps({"s": hit.score, "i": hit.id, "r": int(reverse)}, separators=(",", ":"))
+        return base64.urlsafe_b64encode(payload.encode("ascii")).decode("ascii")
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode("ascii")))
+            score = float(payload["s"])
+            if not math.isfinite(score):
+                raise ValueError("invalid cursor score")
+            return {
+                "score": score,
+                "id": cursor_id(payload["i"]),
+                "reverse": bool(payload.get("r", 0)),
+            }
+        except (TypeError, ValueError, KeyError, OverflowError, UnicodeEncodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+
+class AsyncPageNumberPagination(PageNumberPagination):
+    """
+    PageNumberPagination with an async entry point for async views: the same
+    pages and response, with the count and rows fetched by the async ORM.
+    """
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        paginator = self.django_paginator_class(queryset, page_size)
+        paginator.count = await queryset.acount()  # fills the cached_property, so page() doesn't query
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(page_number=page_number, message=str(exc)))
+        self.page.object_list = [obj async for obj in self.page.object_list]
+        return list(self.page)
+
+
+class CourseListPagination(AsyncPageNumberPagination):
+    """
+    Default page-number pagination, with keyset pagination as an opt-in:
+    ?pagination=cursor (or any request that already carries a ?cursor=).
+    """
+    mode_query_param = "pagination"
+    keyset_class = CourseKeysetPagination
+
+    def use_keyset(self, request):
+        return (
+            request.query_params.get(self.mode_query_param) == "cursor"
+            or self.keyset_class.cursor_query_param in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = self.keyset_class() if self.use_keyset(request) else None
+        if self.keyset is not None:
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        self.keyset = self.keyset_class() if self.use_keyset(request) else None
+        if self.keyset is not None:
+            return await self.keyset.apaginate_queryset(queryset, request, view)
+        return await super().apaginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -1,6 +1,5 @@
 from rest_framework.permissions import BasePermission, SAFE_METHODS
-from django.shortcuts import get_object_or_404
-from .models import Course
+from .access import get_access_context
 
 
 class IsInstructor(BasePermission):
@@ -71,5 +70,23 @@ class IsCourseOwnerInstructor(BasePermission):
         if not course_id:
             return False
         
-        course = get_object_or_404(Course, pk=course_id)
+        course = get_access_context(request).course(course_id)
+        return course.instructor_id == request.user.id
+
+
+class IsCourseOwner(BasePermission):
+    """
+    Only the instructor who owns the course in the URL, for reads as well
+    (e.g. course analytics).
+    """
+    message = "You are not Owner of this Course/Lesson."
+
+    def has_permission(self, request, view):
+        if not request.user or not request.user.is_authenticated:
+            return False
+
+        if getattr(request.user, "role", None) != "instructor":
+            return False
+
+        course = get_access_context(request).course(view.kwargs["course_id"])
         return course.instructor_id == request.user.id
@@ -0,0 +1,44 @@
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # optional: without it responses go through json.dumps as before
+    orjson = None
+
+ORJSON_OPTIONS = 0
+if orjson is not None:
+    # Datetimes, dataclasses and non-str dict keys are left to DRF's encoder /
+    # rules so they come out exactly as JSONRenderer writes them
+    ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS | orjson.OPT_NON_STR_KEYS
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer writing the same bytes through orjson when it is installed.
+    Anything orjson can't encode the same way (indented output for the
+    browsable API or `; indent=`, integers over 64 bits, types DRF's encoder
+    rejects) goes through JSONRenderer itself. Floats print the same between
+    1e-4 and 1e16; outside that orjson drops the exponent's sign and zero
+    padding (1e16, not 1e+16). NaN and infinities become null instead of
+    raising.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or data is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=self.encoder_class().default, option=ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # JSONRenderer escapes these so the output is also valid JavaScript
+        if b"\xe2\x80\xa8" in ret or b"\xe2\x80\xa9" in ret:
+            ret = ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+        return ret
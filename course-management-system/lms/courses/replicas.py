@@ -0,0 +1,119 @@
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework.permissions import SAFE_METHODS
+
+# Read replicas (DJANGO_DB_REPLICAS, see lms/settings.py). Nothing goes to a
+# replica unless a view asks for it: ReplicaReadMixin (and the async views)
+# point ORM reads at one for the rest of a GET request, through a context
+# variable the router reads. Two things send those reads back to the primary:
+#   - the user wrote something in the last REPLICA_PIN_SECONDS
+#     (ReplicaPinMiddleware), so they see their own enrollment/progress;
+#   - a catalog cache entry is about to be filled right after a catalog write
+#     (cache.py), so a lagging replica's rows are never cached for everyone.
+
+_read_alias = ContextVar("read_alias", default=None)
+
+
+def _cache():
+    return caches[settings.COURSE_CACHE_ALIAS]
+
+
+def _pin_key(user_id):
+    return f"replica:pin:user:{user_id}"
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        databases = {DEFAULT_DB_ALIAS, *settings.DB_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema from the primary
+        if db in settings.DB_REPLICAS:
+            return False
+        return None
+
+
+@contextmanager
+def reading_from(alias):
+    # Route ORM reads in this block to `alias` (None = the primary)
+    token = _read_alias.set(alias)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+def pin_to_primary(user_id):
+    # The user's reads skip the replicas until theirs have caught up
+    if settings.DB_REPLICAS and user_id is not None:
+        _cache().set(_pin_key(user_id), True, timeout=settings.REPLICA_PIN_SECONDS)
+
+
+def _pick(request, pinned):
+    if pinned or request.method not in SAFE_METHODS:
+        return None
+    return random.choice(settings.DB_REPLICAS)
+
+
+def read_alias_for(request):
+    # A replica for a read by someone without recent writes, else None (the primary)
+    if not settings.DB_REPLICAS:
+        return None
+    user_id = getattr(request.user, "pk", None)
+    return _pick(request, user_id is not None and _cache().get(_pin_key(user_id)))
+
+
+async def aread_alias_for(request):
+    if not settings.DB_REPLICAS:
+        return None
+    user_id = getattr(request.user, "pk", None)
+    return _pick(request, user_id is not None and await _cache().aget(_pin_key(user_id)))
+
+
+def written_recently(version_keys):
+    # Whether any of these catalog versions was bumped within REPLICA_PIN_SECONDS
+    return bool(settings.DB_REPLICAS) and bool(_cache().get_many([f"{key}:at" for key in version_keys]))
+
+
+async def awritten_recently(version_keys):
+    return bool(settings.DB_REPLICAS) and bool(await _cache().aget_many([f"{key}:at" for key in version_keys]))
+
+
+def mark_written(version_keys):
+    if settings.DB_REPLICAS:
+        _cache().set_many({f"{key}:at": time.time() for key in version_keys}, timeout=settings.REPLICA_PIN_SECONDS)
+
+
+class ReplicaReadMixin:
+    """
+    Serve this DRF view's safe-method requests from a read replica. The
+    choice is made after authentication, so a user with a recent write of
+    their own stays on the primary.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self._replica_token = _read_alias.set(read_alias_for(request))
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = getattr(self, "_replica_token", None)
+        if token is not None:
+            _read_alias.reset(token)
+            self._replica_token = None
+        return super().finalize_response(request, response, *args, **kwargs)
@@ -0,0 +1,188 @@
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework import ISO_8601, fields, relations
+from rest_framework.response import Response
+from rest_framework.serializers import BaseSerializer
+from rest_framework.settings import api_settings
+
+from .instrumentation import serializing
+
+# Read-only fast path for the high-volume list endpoints. Rows come straight
+# from .values() and are turned into response dicts through a field mapping
+# compiled once per serializer class and field selection, so there are no
+# model instances and no per-field get_attribute()/to_representation()
+# dispatch for plain columns. The output matches the serializer's own;
+# courses/tests.py diffs the two.
+
+PLAIN = "plain"  # the column value as the database returns it
+CONVERT = "convert"  # the serializer field's to_representation()
+DATETIME = "datetime"  # DateTimeField with its format and timezone looked up once
+FILE = "file"  # FileField/ImageField: storage URL
+METHOD = "method"  # SerializerMethodField, called with the row
+
+# Field classes whose to_representation() returns a column value unchanged
+PLAIN_FIELDS = (
+    fields.BooleanField,
+    fields.CharField,
+    fields.IntegerField,
+)
+
+
+
+class Row(dict):
+    # A values() row with attribute access, for SerializerMethodFields
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+
+class RowSerializer:
+    """
+    Serialize .values() rows the way `serializer_class` serializes instances.
+    Supports flat serializers only: model columns, dotted sources across
+    foreign keys, primary-key relations, files, and method fields whose
+    columns are listed in Meta.sparse_sources (the method gets a Row).
+    The serializer's own get_fields() picks the fields, so ?fields=/?omit=
+    apply as usual.
+    """
+
+    def __init__(self, serializer_class, context):
+        self.serializer = serializer_class(context=context)
+        self.context = context
+        self.mapping = self.compile()
+
+    def compile(self):
+        return compile_mapping(type(self.serializer), tuple(self.serializer.fields))
+
+    def columns(self):
+        return list(dict.fromkeys(column for _, _, columns in self.mapping for column in columns))
+
+    def values(self, queryset, keep=()):
+        # values() drops select_related/defer(): it selects exactly these columns
+        return queryset.values(*dict.fromkeys([*self.columns(), *keep]))
+
+    def converters(self):
+        # The mapping bound to this request: (name, kind, column(s), function)
+        request = self.context.get("request")
+        model = self.serializer.Meta.model
+        bound = []
+        for name, kind, columns in self.mapping:
+            field = self.serializer.fields[name]
+            if kind == METHOD:
+                bound.append((name, kind, columns, getattr(self.serializer, field.method_name)))
+            elif kind == FILE:
+                bound.append((name, kind, columns[0], file_url(model, field, request)))
+            elif kind == DATETIME:
+                bound.append((name, kind, columns[0], datetime_iso(field)))
+            elif kind == CONVERT:
+                bound.append((name, kind, columns[0], field.to_representation))
+            else:
+                bound.append((name, kind, columns[0], None))
+        return bound
+
+    def to_representation(self, rows):
+        with serializing():
+            converters = self.converters()
+            data = []
+            for row in rows:
+                item = {}
+                for name, kind, column, convert in converters:
+                    if kind == METHOD:
+                        item[name] = convert(Row(row))
+                        continue
+                    value = row[column]
+                    if value is None or convert is None:
+                        item[name] = value
+                    else:
+                        item[name] = convert(value)
+                data.append(item)
+            return data
+
+
+@lru_cache(maxsize=256)
+def compile_mapping(serializer_class, names):
+    # [(name, kind, columns)] per serializer class and field selection. Bounded:
+    # ?fields=/?omit= let clients pick any subset of the fields.
+    serializer_fields = serializer_class().fields  # no request: every field
+    return [(name, *compile_field(serializer_class, name, serializer_fields[name])) for name in names]
+
+
+def compile_field(serializer_class, name, field):
+    # (kind, columns) for one serializer field
+    if isinstance(field, fields.SerializerMethodField):
+        sources = getattr(serializer_class.Meta, "sparse_sources", {})
+        if name not in sources:
+            raise ImproperlyConfigured(f"{name}: list the columns it reads in Meta.sparse_sources.")
+        return METHOD, tuple(sources[name])
+
+    column = "__".join(field.source.split("."))
+    if isinstance(field, relations.PrimaryKeyRelatedField) and field.pk_field is None:
+        return PLAIN, (column,)
+    if isinstance(field, (BaseSerializer, relations.RelatedField, relations.ManyRelatedField)) or field.source == "*":
+        raise ImproperlyConfigured(f"{name}: {type(field).__name__} has no row representation.")
+    if isinstance(field, fields.FileField):
+        return FILE, (column,)
+    if isinstance(field, fields.DateTimeField):
+        return DATETIME, (column,)
+    if isinstance(field, PLAIN_FIELDS):
+        return PLAIN, (column,)
+    return CONVERT, (column,)
+
+
+def file_url(model, field, request):
+    # FileField.to_representation() for a stored file name instead of a FieldFile
+    storage = model._meta.get_field(field.source).storage
+    use_url = getattr(field, "use_url", api_settings.UPLOADED_FILES_USE_URL)
+
+    def convert(name):
+        if not name:
+            return None
+        if not use_url:
+            return name
+        url = storage.url(name)
+        return request.build_absolute_uri(url) if request is not None else url
+
+    return convert
+
+
+def datetime_iso(field):
+    # DateTimeField.to_representation() for aware datetimes in ISO 8601, without
+    # looking the format and current timezone up again for every row
+    output_format = getattr(field, "format", api_settings.DATETIME_FORMAT)
+    field_timezone = field.timezone if hasattr(field, "timezone") else field.default_timezone()
+    if output_format is None or output_format.lower() != ISO_8601 or field_timezone is None:
+        return field.to_representation
+
+    def convert(value):
+        if isinstance(value, str) or value.utcoffset() is None:
+            return field.to_representation(value)
+        value = value.astimezone(field_timezone).isoformat()
+        return value[:-6] + "Z" if value.endswith("+00:00") else value
+
+    return convert
+
+
+class ValuesListMixin:
+    """
+    list() for read-only ListAPIViews from .values() rows (RowSerializer)
+    instead of serializer instances. `row_keep` names extra columns the view
+    needs, e.g. keyset cursor keys; the pagination must accept dict rows.
+    FAST_READ_SERIALIZERS=false goes back to the serializer.
+    """
+    row_keep = ()
+
+    def list(self, request, *args, **kwargs):
+        if not settings.FAST_READ_SERIALIZERS:
+            return super().list(request, *args, **kwargs)
+
+        rows = RowSerializer(self.get_serializer_class(), self.get_serializer_context())
+        queryset = rows.values(self.filter_queryset(self.get_queryset()), keep=self.row_keep)
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(rows.to_representation(page))
+        return Response(rows.to_representation(queryset))
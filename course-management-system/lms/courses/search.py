@@ -0,0 +1,242 @@
+import logging
+import re
+import threading
+from collections import namedtuple
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+# Full-text search over courses. Each course has one row in an inverted index
+# holding its title, description and the titles of its lessons:
+#   SQLite      FTS5 virtual table courses_course_fts, rowid = course id
+#   PostgreSQL  courses_course_search(course_id, document tsvector) + GIN index
+# Both tables are created and filled by migration 0007 and kept in step by
+# courses/signals.py (bulk lesson paths call schedule_reindex() themselves). A
+# full rebuild is `manage.py rebuild_search_index`. Other databases have no
+# search: writes skip the index and the search endpoint answers 501.
+
+logger = logging.getLogger("courses.search")
+
+# `candidates` is how many matches were ranked, at most COURSE_SEARCH_MAX_CANDIDATES
+SearchHit = namedtuple("SearchHit", ["id", "score", "candidates"])
+
+MAX_TERMS = 8
+MIN_PREFIX = 2  # a one-character term matched as a prefix would pull in most of the vocabulary
+
+_pending = threading.local()
+_warned_vendors = set()
+
+
+def search_terms(text):
+    # Word characters only, so nothing the user types reaches MATCH/to_tsquery as syntax
+    return re.findall(r"\w+", text.lower())[:MAX_TERMS]
+
+
+class SQLiteBackend:
+    table = "courses_course_fts"
+    # bm25() column weights: title, description, lessons. Lower scores rank higher.
+    weights = "10.0, 1.0, 4.0"
+
+    def create(self, cursor):
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE {self.table} USING fts5("
+            "title, description, lessons, "
+            "tokenize = 'unicode61 remove_diacritics 2', "
+            "prefix = '2 3'"  # prefix indexes, so short "term*" lookups don't walk the vocabulary
+            ")"
+        )
+
+    def drop(self, cursor):
+        cursor.execute(f"DROP TABLE IF EXISTS {self.table}")
+
+    def delete_missing(self, cursor, ids_sql, ids):
+        cursor.execute(
+            f"DELETE FROM {self.table} WHERE rowid IN ({ids_sql}) "
+            "AND rowid NOT IN (SELECT id FROM courses_course)",
+            ids,
+        )
+
+    def upsert(self, cursor, where_sql, params):
+        # FTS5 honours OR REPLACE on the rowid
+        cursor.execute(
+            f"INSERT OR REPLACE INTO {self.table} (rowid, title, description, lessons) "
+            "SELECT c.id, c.title, c.description, "
+            "(SELECT group_concat(l.title, ' ') FROM courses_lessons l WHERE l.course_id = c.id) "
+            f"FROM courses_course c {where_sql}",
+            params,
+        )
+        return cursor.rowcount
+
+    def match(self, terms, max_candidates):
+        # bm25() is computed per returned row, so the LIMIT caps the ranking work
+        sql = (
+            f"SELECT rowid AS id, bm25({self.table}, {self.weights}) AS score "
+            f"FROM {self.table} WHERE {self.table} MATCH %s ORDER BY rowid DESC LIMIT %s"
+        )
+        query = " ".join(f'"{term}"*' if len(term) >= MIN_PREFIX else f'"{term}"' for term in terms)
+        return sql, [query, max_candidates]
+
+
+class PostgreSQLBackend:
+    table = "courses_course_search"
+    config = "simple"  # no stemming, same as FTS5's unicode61 tokenizer
+
+    def create(self, cursor):
+        cursor.execute(
+            f"CREATE TABLE {self.table} ("
+            "course_id bigint PRIMARY KEY REFERENCES courses_course (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+            "document tsvector NOT NULL)"
+        )
+        cursor.execute(f"CREATE INDEX {self.table}_document_idx ON {self.table} USING GIN (document)")
+
+    def drop(self, cursor):
+        cursor.execute(f"DROP TABLE IF EXISTS {self.table}")
+
+    def delete_missing(self, cursor, ids_sql, ids):
+        # Mostly done already by ON DELETE CASCADE; covers rows written before a delete
+        cursor.execute(
+            f"DELETE FROM {self.table} WHERE course_id IN ({ids_sql}) "
+            "AND course_id NOT IN (SELECT id FROM courses_course)",
+            ids,
+        )
+
+    def upsert(self, cursor, where_sql, params):
+        config = self.config
+        cursor.execute(
+            f"INSERT INTO {self.table} (course_id, document) "
+            f"SELECT c.id, "
+            f"setweight(to_tsvector('{config}', c.title), 'A') || "
+            f"setweight(to_tsvector('{config}', coalesce("
+            f"(SELECT string_agg(l.title, ' ') FROM courses_lessons l WHERE l.course_id = c.id), '')), 'B') || "
+            f"setweight(to_tsvector('{config}', c.description), 'C') "
+            f"FROM courses_course c {where_sql} "
+            "ON CONFLICT (course_id) DO UPDATE SET document = EXCLUDED.document",
+            params,
+        )
+        return cursor.rowcount
+
+    def match(self, terms, max_candidates):
+        # ts_rank_cd is higher-is-better; negate it so both backends sort ascending.
+        # Ranked outside the LIMITed subquery so only the candidates are scored.
+        sql = (
+            f"SELECT m.course_id AS id, -ts_rank_cd(m.document, m.q) AS score FROM ("
+            f"SELECT s.course_id, s.document, q FROM {self.table} s, to_tsquery('{self.config}', %s) q "
+            f"WHERE s.document @@ q ORDER BY s.course_id DESC LIMIT %s) m"
+        )
+        query = " & ".join(f"{term}:*" if len(term) >= MIN_PREFIX else term for term in terms)
+        return sql, [query, max_candidates]
+
+
+BACKENDS = {
+    "sqlite": SQLiteBackend,
+    "postgresql": PostgreSQLBackend,
+}
+
+
+class SearchUnavailable(APIException):
+    status_code = status.HTTP_501_NOT_IMPLEMENTED
+    default_detail = "Course search is not available on this database."
+    default_code = "search_unavailable"
+
+
+def get_backend(using=DEFAULT_DB_ALIAS):
+    conn = connections[using]
+    backend = BACKENDS.get(conn.vendor)
+    if backend is None:
+        raise SearchUnavailable(f"Course search is not available on {conn.vendor}.")
+    return backend()
+
+
+def reindex_courses(course_ids, using=DEFAULT_DB_ALIAS):
+    """
+    Rewrite the index rows of the given courses from the current data.
+    Ids of deleted courses just lose their rows.
+    """
+    course_ids = sorted({int(pk) for pk in course_ids if pk is not None})
+    if not course_ids:
+        return
+    backend = get_backend(using)
+    ids_sql = ", ".join(["%s"] * len(course_ids))
+    with connections[using].cursor() as cursor:
+        # One statement for the usual case; a second only when some course is gone
+        written = backend.upsert(cursor, f"WHERE c.id IN ({ids_sql})", course_ids)
+        if written < len(course_ids):
+            backend.delete_missing(cursor, ids_sql, course_ids)
+
+
+def rebuild_index(batch_size=5000, using=DEFAULT_DB_ALIAS):
+    # Every course, in id ranges so a big catalog isn't one huge statement
+    backend = get_backend(using)
+    with transaction.atomic(using), connections[using].cursor() as cursor:
+        cursor.execute(f"DELETE FROM {backend.table}")
+        cursor.execute("SELECT min(id), max(id) FROM courses_course")
+        low, high = cursor.fetchone()
+        if low is None:
+            return
+        for start in range(low, high + 1, batch_size):
+            backend.upsert(cursor, "WHERE c.id >= %s AND c.id < %s", [start, start + batch_size])
+
+
+def schedule_reindex(*course_ids):
+    """
+    Reindex these courses once the current transaction commits (right away
+    outside one). Ids collected over a transaction are reindexed together, so
+    a request touching many lessons of one course rewrites its row once.
+    Call it before bump_catalog() so the catalog version only moves once the
+    index already reflects the write.
+    """
+    vendor = connections[DEFAULT_DB_ALIAS].vendor
+    if vendor not in BACKENDS:
+        if vendor not in _warned_vendors:
+            _warned_vendors.add(vendor)
+            logger.warning("Course search is not available on %s; the search index is not kept up to date.", vendor)
+        return
+
+    pending = getattr(_pending, "ids", None)
+    if pending is None:
+        pending = _pending.ids = set()
+    pending.update(course_ids)
+    transaction.on_commit(_flush_pending)
+
+
+def _flush_pending():
+    # The first callback after a commit takes every pending id, the rest find none.
+    # Ids left over from a rolled-back transaction are reindexed too: harmless.
+    ids = getattr(_pending, "ids", None)
+    if ids:
+        _pending.ids = set()
+        reindex_courses(ids)
+
+
+def search_courses(text, limit, after=None, reverse=False, using=DEFAULT_DB_ALIAS):
+    """
+    Best matches for `text` as SearchHit(id, score), best first (lowest score).
+    Every term must match, each as a prefix (one-character terms exactly).
+    `after` is the (score, id) of the page boundary; with `reverse` the hits
+    before it come back, worst first. Only the newest
+    COURSE_SEARCH_MAX_CANDIDATES matches are ranked: when a hit's
+    `candidates` reaches that, older matches were left out.
+    """
+    terms = search_terms(text)
+    if not terms:
+        return []
+
+    backend = get_backend(using)
+    sql, params = backend.match(terms, settings.COURSE_SEARCH_MAX_CANDIDATES)
+    # Counted before the page boundary applies: the same for every page
+    sql = f"SELECT id, score, candidates FROM (SELECT id, score, count(*) OVER () AS candidates FROM ({sql}) hits) ranked"
+
+    if after is not None:
+        op = "<" if reverse else ">"
+        sql += f" WHERE (score {op} %s OR (score = %s AND id {op} %s))"
+        params += [after[0], after[0], after[1]]
+
+    direction = "DESC" if reverse else "ASC"
+    sql += f" ORDER BY score {direction}, id {direction} LIMIT %s"
+    params.append(limit)
+
+    with connections[using].cursor() as cursor:
+        cursor.execute(sql, params)
+        return [SearchHit(*row) for row in cursor.fetchall()]
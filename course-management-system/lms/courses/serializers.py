@@ -1,9 +1,113 @@
+from collections import Counter
+
 from rest_framework import serializers
-from django.shortcuts import get_object_or_404
+from rest_framework.permissions import SAFE_METHODS
 from . import models
+from .access import get_access_context
+from .completions import is_pending, pending_lessons
+from .instrumentation import TimedSerializerMixin
+from .thumbnails import variant_urls
+
+
+def _param_names(request, param):
+    return [name.strip() for value in request.query_params.getlist(param) for name in value.split(",") if name.strip()]
+
+
+def sparse_fieldset(request, path=""):
+    """
+    (selected, omitted) field names for the serializer at `path` ("" for the
+    top level, "lessons" for the lessons nested in a course) from
+    ?fields=id,title,lessons.title and ?omit=description,lessons.video_url.
+    `selected` is None when ?fields= doesn't narrow this level.
+    """
+    prefix = f"{path}." if path else ""
+
+    def here(names):
+        return [name[len(prefix):] for name in names if name.startswith(prefix)]
+
+    fields = here(_param_names(request, "fields"))
+    omit = here(_param_names(request, "omit"))
+    selected = {name.split(".")[0] for name in fields} if fields else None
+    omitted = {name for name in omit if "." not in name}
+    return selected, omitted
+
+
+class SparseFieldsMixin:
+    """
+    Sparse fieldsets for GET responses: ?fields= keeps only the listed
+    fields, ?omit= drops fields; nested serializers take dotted names.
+    Views narrow their SQL to match with `sparse_plan()`.
+
+    Meta.sparse_sources maps a field to the model fields it reads when that
+    isn't simply its source (method fields, or several columns).
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get("request")
+        if request is None or request.method not in SAFE_METHODS:
+            return fields
+
+        path = self.sparse_path()
+        selected, omitted = sparse_fieldset(request, path)
+        for param, names in (("fields", selected or set()), ("omit", omitted)):
+            unknown = sorted(names.difference(fields))
+            if unknown:
+                prefix = f"{path}." if path else ""
+                raise serializers.ValidationError(
+                    {param: f"Unknown field(s): {', '.join(prefix + name for name in unknown)}"}
+                )
+
+        for name in list(fields):
+            if (selected is not None and name not in selected) or name in omitted:
+                del fields[name]
+        return fields
 
+    def sparse_path(self):
+        names = []
+        node = self
+        while node.parent is not None:
+            if node.field_name:  # a list's child is bound with an empty name
+                names.append(node.field_name)
+            node = node.parent
+        return ".".join(reversed(names))
 
-class LessonSerializers(serializers.ModelSerializer):
+    @classmethod
+    def sparse_plan(cls, request, path="", keep=()):
+        """
+        (deferred, traversed) for the requested fields, or None without
+        ?fields=/?omit=: the model columns none of them read, for
+        queryset.defer(), and the relations their dotted sources follow
+        (a select_related() outside that set is a wasted join).
+        `keep` lists columns the view itself needs (e.g. a cursor key).
+        """
+        selected, omitted = sparse_fieldset(request, path)
+        if selected is None and not omitted:
+            return None
+
+        sources = getattr(cls.Meta, "sparse_sources", {})
+        needed = set(keep)
+        traversed = set()
+        for name, field in cls().fields.items():
+            if (selected is not None and name not in selected) or name in omitted:
+                continue
+            if name in sources:
+                needed.update(sources[name])
+            elif field.source != "*":
+                head, _, rest = field.source.partition(".")
+                needed.add(head)
+                if rest:
+                    traversed.add(head)
+
+        deferred = [
+            field.name
+            for field in cls.Meta.model._meta.concrete_fields
+            if not field.primary_key and not field.is_relation and field.name not in needed
+        ]
+        return deferred, traversed
+
+
+class LessonSerializers(TimedSerializerMixin, SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = models.Lessons
         fields = '__all__'
@@ -25,7 +129,7 @@ class LessonSerializers(serializers.ModelSerializer):
             # fetch the course from URL
             course_id = self.context["view"].kwargs.get("course_id")
             if course_id is not None:
-                course = get_object_or_404(models.Course, pk=course_id)
+                course = get_access_context(self.context["request"]).course(course_id)
 
         if course is None or order is None:
             return attrs
@@ -43,20 +147,88 @@ class LessonSerializers(serializers.ModelSerializer):
         return attrs
 
 
-class CourseSerializer(serializers.ModelSerializer):
+class BulkLessonItemSerializer(serializers.ModelSerializer):
+    # Present: update that lesson. Absent: create a new one.
+    # The item's position in the list becomes its order.
+    id = serializers.IntegerField(required=False, min_value=1)
+
+    class Meta:
+        model = models.Lessons
+        fields = ["id", "title", "video_url", "duration"]
+        extra_kwargs = {
+            "title": {"required": False},
+            "video_url": {"required": False},
+            "duration": {"required": False},
+        }
+
+    def validate(self, attrs):
+        if "id" not in attrs:
+            missing = [f for f in ("title", "video_url", "duration") if f not in attrs]
+            if missing:
+                raise serializers.ValidationError({f: "This field is required for new lessons." for f in missing})
+        return attrs
+
+
+class BulkLessonSyncSerializer(serializers.Serializer):
+    lessons = BulkLessonItemSerializer(many=True, allow_empty=True, max_length=1000)
+
+    def validate(self, attrs):
+        # Reuse for the whole list: one fetch of the course's current lessons.
+        # The view gets them back in attrs["existing"] so it doesn't refetch.
+        course_id = self.context["view"].kwargs.get("course_id")
+        existing = {
+            lesson.id: lesson
+            for lesson in models.Lessons.objects.filter(course_id=course_id)
+        }
+
+        ids = [item["id"] for item in attrs["lessons"] if "id" in item]
+        duplicates = sorted(i for i, n in Counter(ids).items() if n > 1)
+        if duplicates:
+            raise serializers.ValidationError({"lessons": f"Lessons listed more than once: {duplicates}"})
+
+        unknown = sorted(set(ids).difference(existing))
+        if unknown:
+            raise serializers.ValidationError({"lessons": f"Lessons not in this course: {unknown}"})
+
+        attrs["existing"] = existing
+        return attrs
+
+
+class ThumbnailVariantsMixin(serializers.Serializer):
+    # Resized WebP/JPEG thumbnails, or null until the background build finishes
+    thumbnail_variants = serializers.SerializerMethodField()
+
+    def get_thumbnail_variants(self, obj):
+        if not obj.thumbnail or not obj.thumbnail_hash:
+            return None
+
+        request = self.context.get("request")
+        variants = variant_urls(obj.thumbnail_hash)
+        if request is not None:
+            for variant in variants.values():
+                for key, value in variant.items():
+                    if isinstance(value, str):
+                        variant[key] = request.build_absolute_uri(value)
+        return variants
+
+
+class CourseSerializer(TimedSerializerMixin, SparseFieldsMixin, ThumbnailVariantsMixin, serializers.ModelSerializer):
     instructor_name = serializers.CharField(
         source="instructor.username",
         read_only=True
     )
-    lessons_count = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = models.Course
-        fields = ["id", "title", "description", "thumbnail", "instructor", "instructor_name", "lessons_count", "created_at"]
-        read_only_fields = ["instructor", "created_at"]
+        fields = [
+            "id", "title", "description", "thumbnail", "thumbnail_variants", "instructor", "instructor_name",
+            "lessons_count", "total_duration_minutes", "created_at",
+        ]
+        read_only_fields = ["instructor", "lessons_count", "total_duration_minutes", "created_at"]
+        sparse_sources = {"thumbnail_variants": ["thumbnail", "thumbnail_hash"]}
 
 
-class CourseDetailSerializer(serializers.ModelSerializer):
+class CourseDetailSerializer(TimedSerializerMixin, SparseFieldsMixin, ThumbnailVariantsMixin, serializers.ModelSerializer):
     instructor_name = serializers.CharField(
         source="instructor.username",
         read_only=True
@@ -65,10 +237,14 @@ class CourseDetailSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = models.Course
-        fields = ["id", "title", "description", "thumbnail", "instructor", "instructor_name", "created_at", "lessons"]
+        fields = [
+            "id", "title", "description", "thumbnail", "thumbnail_variants", "instructor", "instructor_name",
+            "lessons_count", "total_duration_minutes", "created_at", "lessons",
+        ]
+        sparse_sources = {"thumbnail_variants": ["thumbnail", "thumbnail_hash"]}
 
 
-class EnrollmentSerializer(serializers.ModelSerializer):
+class EnrollmentSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = models.Enrollment
         fields = '__all__'
@@ -77,16 +253,15 @@ class EnrollmentSerializer(serializers.ModelSerializer):
     def validate(self, attrs):
         # this method runs after field validation but before saving
         # final check before creating enrollment to prevent duplication
-        student = self.context['request'].user
         course_id = self.context['view'].kwargs.get('pk')
 
-        if models.Enrollment.objects.filter(student=student, course=course_id).exists():
+        if get_access_context(self.context['request']).is_enrolled(course_id):
             raise serializers.ValidationError({"detail": "You're already enrolled in this course!"})
 
         return attrs
 
 
-class LessonProgressSerializer(serializers.ModelSerializer):
+class LessonProgressSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = models.LessonProgress
         fields = '__all__'
@@ -97,12 +272,13 @@ class LessonProgressSerializer(serializers.ModelSerializer):
         # final check before Mark lesson as complete to prevent not enrolled course lesson as marked
         request = self.context["request"]
         user = request.user
+        access = get_access_context(request)
 
         lesson_id = self.context["view"].kwargs.get("lesson_id")
-        lesson = get_object_or_404(models.Lessons, pk=lesson_id)
+        lesson = access.lesson(lesson_id)
 
         # Must be enrolled in the lesson's course
-        if not models.Enrollment.objects.filter(student=user, course=lesson.course).exists():
+        if not access.is_enrolled(lesson.course_id):
             raise serializers.ValidationError({"detail": "You're not enrolled in this course."})
 
         previous_lesson = (
@@ -110,11 +286,72 @@ class LessonProgressSerializer(serializers.ModelSerializer):
             .order_by("-order")
             .first()
         )
-        if previous_lesson and not models.LessonProgress.objects.filter(
-            student=user,
-            lesson=previous_lesson,
-            completed=True,
-        ).exists():
+        if (
+            previous_lesson
+            and not models.LessonProgress.objects.filter(
+                student=user,
+                lesson=previous_lesson,
+                completed=True,
+            ).exists()
+            and not is_pending(user.pk, previous_lesson.pk)  # completed, not written yet
+        ):
             raise serializers.ValidationError({"detail": "Complete the previous lesson first."})
 
         return attrs
+
+
+class BulkLessonProgressSerializer(serializers.Serializer):
+    lessons = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=500,
+    )
+
+    def validate(self, attrs):
+        # Same rules as LessonProgressSerializer, checked for the whole batch in memory
+        # against one fetch of the course lessons and one of the student's progress.
+        user = self.context["request"].user
+        course_id = self.context["view"].kwargs.get("course_id")
+
+        access = get_access_context(self.context["request"])
+        if not access.is_enrolled(course_id):
+            access.course(course_id)  # 404 for a missing course
+            raise serializers.ValidationError({"detail": "You're not enrolled in this course."})
+
+        ordered_ids = list(
+            models.Lessons.objects.filter(course_id=course_id)
+            .order_by("order")
+            .values_list("id", flat=True)
+        )
+        requested = set(attrs["lessons"])
+        unknown = sorted(requested.difference(ordered_ids))
+        if unknown:
+            raise serializers.ValidationError({"lessons": f"Lessons not in this course: {unknown}"})
+
+        completed = set(
+            models.LessonProgress.objects.filter(
+                student=user,
+                lesson__course_id=course_id,
+                completed=True,
+            ).values_list("lesson_id", flat=True)
+        )
+        completed.update(pending_lessons(user.pk, [lesson_id for lesson_id in ordered_ids if lesson_id not in completed]))
+
+        # Walk the course in order; every requested lesson needs its predecessor
+        # either already completed or completed earlier in this batch.
+        new_ids = []
+        previous_id = None
+        for lesson_id in ordered_ids:
+            if lesson_id in requested and lesson_id not in completed:
+                if previous_id is not None and previous_id not in completed:
+                    raise serializers.ValidationError({
+                        "detail": "Complete the previous lesson first.",
+                        "lesson": lesson_id,
+                    })
+                completed.add(lesson_id)
+                new_ids.append(lesson_id)
+            previous_id = lesson_id
+
+        attrs["new_lessons"] = new_ids
+        attrs["already_completed"] = sorted(requested.difference(new_ids))
+        return attrs
@@ -0,0 +1,145 @@
+import weakref
+
+from django.conf import settings
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .access import enrollment_cache
+from .cache import bump_analytics, bump_catalog
+from .completions import record_completions
+from .models import Course, CourseProgressSummary, Enrollment, LessonProgress, Lessons
+from .search import schedule_reindex
+
+SEARCHED_COURSE_FIELDS = {"title", "description"}
+
+
+# Row-level writes from any path (API, admin, shell) invalidate the catalog cache
+# and refresh the course's search index row. Bulk paths (queryset.update,
+# bulk_create) don't send these and call schedule_reindex()/bump_catalog() themselves.
+
+@receiver([post_save, post_delete], sender=Course)
+def invalidate_course(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or SEARCHED_COURSE_FIELDS.intersection(update_fields):
+        schedule_reindex(instance.pk)
+    bump_catalog(instance.pk)
+
+
+@receiver(pre_save, sender=settings.AUTH_USER_MODEL)
+def note_username_change(sender, instance, update_fields=None, **kwargs):
+    # Course payloads embed the instructor's username (instructor_name)
+    if instance.pk is None or (update_fields is not None and "username" not in update_fields):
+        return
+    stored = sender.objects.filter(pk=instance.pk).values_list("username", flat=True).first()
+    instance._username_changed = stored is not None and stored != instance.username
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def invalidate_instructor_courses(sender, instance, **kwargs):
+    if not instance.__dict__.pop("_username_changed", False):
+        return
+    course_ids = list(Course.objects.filter(instructor=instance).values_list("pk", flat=True))
+    if course_ids:
+        bump_catalog(*course_ids)
+
+
+def deleted_directly(origin, model):
+    # Whether a delete started from `model` rows, not a cascade from their parent
+    origin_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return origin_model is model
+
+
+@receiver([post_save, post_delete], sender=Lessons)
+def invalidate_lesson(sender, instance, **kwargs):
+    schedule_reindex(instance.course_id)
+    bump_catalog(instance.course_id)
+
+
+@receiver([post_save, post_delete], sender=Enrollment)
+def invalidate_enrollments(sender, instance, **kwargs):
+    # Mostly matters for deletions (e.g. from the admin): new enrollments are
+    # always re-checked against the database before access is denied.
+    enrollment_cache.invalidate(instance.student_id)
+    bump_analytics(instance.course_id)
+
+
+# The stored lesson stats (Course.lessons_count, total_duration_minutes) and
+# the summaries' total_lessons follow every row-level lesson write. Bulk paths
+# (bulk_create, bulk_update) recompute them with refresh_lesson_stats() /
+# refresh_counts() themselves.
+
+# Courses already recounted for a queryset delete, so each is recounted once
+_recounted = weakref.WeakKeyDictionary()
+
+
+@receiver(post_save, sender=Lessons)
+def count_saved_lesson(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and not {"course", "course_id", "duration"}.intersection(update_fields):
+        return
+    course = Course.objects.filter(pk=instance.course_id)
+    loaded = instance.loaded_stats
+    instance.loaded_stats = (instance.course_id, instance.duration)
+
+    if created:
+        course.bump_lesson_stats(lessons=1, minutes=instance.duration)
+        CourseProgressSummary.objects.filter(course_id=instance.course_id).bump(total=1)
+    elif loaded is None:  # not loaded from the database, or with those fields deferred
+        course.refresh_lesson_stats()
+    elif loaded[0] == instance.course_id:
+        course.bump_lesson_stats(minutes=instance.duration - loaded[1])
+    else:  # moved to another course
+        course_ids = [loaded[0], instance.course_id]
+        Course.objects.filter(pk__in=course_ids).refresh_lesson_stats()
+        CourseProgressSummary.objects.filter(course_id__in=course_ids).refresh_counts()
+
+
+@receiver(post_delete, sender=Lessons)
+def recount_deleted_lessons(sender, instance, origin=None, **kwargs):
+    # Sent once every lesson row of the delete (and their progress rows) is
+    # gone, so one recount per course covers all the lessons it removes.
+    # Lessons deleted along with their course take the summaries with them.
+    if not deleted_directly(origin, Lessons):
+        return
+    if isinstance(origin, QuerySet):
+        courses = _recounted.setdefault(origin, set())
+        if instance.course_id in courses:
+            return
+        courses.add(instance.course_id)
+    Course.objects.filter(pk=instance.course_id).refresh_lesson_stats()
+    CourseProgressSummary.objects.filter(course_id=instance.course_id).refresh_counts()
+
+
+# Every enrollment has a CourseProgressSummary, however it was created, and
+# row-level progress writes keep its completed_count. Bulk paths (the bulk
+# completion endpoint, the write-behind flush) call record_completions().
+
+@receiver(post_save, sender=Enrollment)
+def sync_progress_summary(sender, instance, **kwargs):
+    CourseProgressSummary.objects.sync(instance)
+
+
+@receiver(post_delete, sender=Enrollment)
+def delete_progress_summary(sender, instance, **kwargs):
+    # Usually gone already with the enrollment (on_delete=CASCADE)
+    CourseProgressSummary.objects.filter(enrollment_id=instance.pk).delete()
+
+
+@receiver(post_save, sender=LessonProgress)
+def count_saved_progress(sender, instance, created, update_fields=None, **kwargs):
+    course_id = instance.lesson.course_id
+    if created:
+        if instance.completed:
+            record_completions(instance.student_id, course_id, 1)
+    elif update_fields is None or "completed" in update_fields:
+        CourseProgressSummary.objects.filter(student_id=instance.student_id, course_id=course_id).refresh_counts()
+        bump_analytics(course_id)
+
+
+@receiver(post_delete, sender=LessonProgress)
+def uncount_deleted_progress(sender, instance, origin=None, **kwargs):
+    # Progress deleted with its lesson is recounted by recount_deleted_lessons()
+    if not deleted_directly(origin, LessonProgress) or not instance.completed:
+        return
+    course_id = instance.lesson.course_id
+    CourseProgressSummary.objects.filter(student_id=instance.student_id, course_id=course_id).refresh_counts()
+    bump_analytics(course_id)
@@ -0,0 +1,914 @@
+import base64
+import datetime
+import decimal
+import importlib
+import json
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import caches
+from django.db import connection
+from django.http import Http404
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+
+from users.models import User
+
+from . import completions
+from .access import AccessContext, EnrollmentSetCache, enrollment_cache, get_access_context
+from .analytics import daily_enrollments
+from .async_views import AsyncCourseProgressApiView
+from .media import parse_range, serve_media
+from .models import Course, CourseProgressSummary, Enrollment, LessonProgress, Lessons
+from .renderers import FastJSONRenderer
+
+# Payloads FastJSONRenderer must write exactly as JSONRenderer does
+RENDERER_CASES = {
+    "unicode": {"title": "Café ünïcode ✓ 🎓", "quote": 'say "hi" \\ / \n\t'},
+    "line separators": {"text": "a\u2028b\u2029c"},
+    "int keys": {1: "one", 2: ["two"]},
+    "datetimes": {
+        "utc": datetime.datetime(2026, 1, 2, 3, 4, 5, 678901, tzinfo=datetime.timezone.utc),
+        "naive": datetime.datetime(2026, 1, 2, 3, 4, 5),
+        "date": datetime.date(2026, 1, 2),
+        "time": datetime.time(3, 4, 5),
+    },
+    "decimal": {"price": decimal.Decimal("19.99")},
+    "numbers": {"int": 2**63 - 1, "big": 2**70, "float": 33.33, "zero": 0.0, "bools": [True, False, None]},
+    "nested": [{"a": [], "b": {}, "c": [[1, 2], (3, 4)]}],
+}
+
+
+class FastJSONRendererTests(TestCase):
+    def test_same_bytes_as_json_renderer(self):
+        for name, data in RENDERER_CASES.items():
+            with self.subTest(name):
+                self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_indented(self):
+        media_type = "application/json; indent=4"
+        data = RENDERER_CASES["nested"]
+        self.assertEqual(FastJSONRenderer().render(data, media_type), JSONRenderer().render(data, media_type))
+
+
+class FastReadSerializerTests(TestCase):
+    """
+    The .values() row path (courses/rows.py, FAST_READ_SERIALIZERS) against
+    the DRF serializers: the same request must give the same bytes.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        instructor = User.objects.create(username="instructor", role=User.Role.INSTRUCTOR)
+        cls.student = User.objects.create(username="student", role=User.Role.STUDENT)
+
+        start = datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone.utc)
+        cls.courses = []
+        for i in range(25):
+            course = Course.objects.create(title=f"Course {i}", description=f"About course {i}", instructor=instructor)
+            # Distinct timestamps, some with microseconds, for cursor pages
+            Course.objects.filter(pk=course.pk).update(created_at=start + datetime.timedelta(hours=i, microseconds=i * 7))
+            cls.courses.append(course)
+            Lessons.objects.bulk_create([
+                Lessons(course=course, title=f"Lesson {n}", video_url=f"https://videos.example.com/{i}/{n}", duration=n + 1, order=n)
+                for n in range(12)
+            ])
+        for course in cls.courses[::3]:
+            Enrollment.objects.create(student=cls.student, course=course)
+
+        # Awkward values: non-ASCII, JS line separators, a thumbnail with built variants
+        cls.odd = cls.courses[-1]
+        Course.objects.filter(pk=cls.odd.pk).update(
+            title="Ünïcode ✓ \u2028 \"quoted\" 🎓",
+            description="Line one\nLine two\u2029",
+            thumbnail="thumbnails/odd name.png",
+            thumbnail_hash="ab" * 32,
+        )
+        Lessons.objects.filter(course=cls.odd).update(
+            title="Leçon \u2028 <b>", video_url="https://videos.example.com/ü?a=1&b=2"
+        )
+
+    def setUp(self):
+        self.anon = APIClient()
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+
+    def get(self, client, url, fast):
+        caches[settings.COURSE_CACHE_ALIAS].clear()
+        enrollment_cache.clear()
+        with override_settings(FAST_READ_SERIALIZERS=fast):
+            return client.get(url)
+
+    def assertSameBytes(self, client, url):
+        drf = self.get(client, url, fast=False)
+        fast = self.get(client, url, fast=True)
+        self.assertEqual(drf.status_code, 200)
+        self.assertEqual(fast.status_code, 200)
+        # The DRF response through JSONRenderer is the reference output
+        self.assertEqual(drf.content, JSONRenderer().render(drf.data))
+        self.assertEqual(fast.content, drf.content)
+
+    def test_course_list(self):
+        cursor = self.anon.get("/api/courses/?pagination=cursor").data["next"]
+        for url in [
+            "/api/courses/",
+            "/api/courses/?page=3",
+            "/api/courses/?pagination=cursor&page_size=50",
+            cursor,
+            "/api/courses/?fields=title,thumbnail_variants",
+            "/api/courses/?omit=description,instructor_name",
+        ]:
+            with self.subTest(url):
+                self.assertSameBytes(self.anon, url)
+
+    def test_lesson_list(self):
+        for url in [
+            f"/api/courses/{self.courses[0].pk}/lessons/?page=2",
+            f"/api/courses/{self.odd.pk}/lessons/",
+            f"/api/courses/{self.odd.pk}/lessons/?fields=id,title,course",
+        ]:
+            with self.subTest(url):
+                self.assertSameBytes(self.anon, url)
+
+    def test_enrolled_courses(self):
+        for url in [
+            "/api/myenrollments/",
+            "/api/myenrollments/?fields=id,title,created_at",
+        ]:
+            with self.subTest(url):
+                self.assertSameBytes(self.client, url)
+
+
+def encode_cursor(payload):
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+class KeysetCursorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        instructor = User.objects.create(username="instructor", role=User.Role.INSTRUCTOR)
+        Course.objects.create(title="Course", description="About", instructor=instructor)
+
+    def test_bad_cursors_are_not_found(self):
+        for name, cursor in {
+            "not base64": "%%%",
+            "not json": base64.urlsafe_b64encode(b"{").decode(),
+            "infinite id": base64.urlsafe_b64encode(b'{"c":"2020-01-01","i":1e999}').decode(),
+            "float id": encode_cursor({"c": "2020-01-01", "i": 1.5}),
+            "string id": encode_cursor({"c": "2020-01-01", "i": "1"}),
+            "id past 64 bits": encode_cursor({"c": "2020-01-01", "i": 2**64}),
+            "bad date": encode_cursor({"c": "yesterday", "i": 1}),
+            "list": encode_cursor([1, 2]),
+        }.items():
+            with self.subTest(name):
+                response = self.client.get("/api/courses/", {"cursor": cursor})
+                self.assertEqual(response.status_code, 404)
+
+    def test_largest_id_is_a_valid_cursor(self):
+        cursor = encode_cursor({"c": "2999-01-01T00:00:00+00:00", "i": 2**63 - 1})
+        response = self.client.get("/api/courses/", {"cursor": cursor})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["results"]), 1)
+
+
+class LessonStatsTests(TestCase):
+    """
+    Course.lessons_count / total_duration_minutes and the summaries'
+    total_lessons / completed_count follow lesson writes from any path.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.instructor = User.objects.create(username="instructor", role=User.Role.INSTRUCTOR)
+        cls.student = User.objects.create(username="student", role=User.Role.STUDENT)
+        cls.course = Course.objects.create(title="Course", description="About", instructor=cls.instructor)
+        cls.lessons = [cls.add_lesson(order, duration=10) for order in (1, 2)]
+        cls.enrollment = Enrollment.objects.create(student=cls.student, course=cls.course)
+        LessonProgress.objects.create(student=cls.student, lesson=cls.lessons[0], completed=True)
+        CourseProgressSummary.objects.sync(cls.enrollment)
+
+    @classmethod
+    def add_lesson(cls, order, duration):
+        return Lessons.objects.create(
+            course=cls.course, title=f"Lesson {order}", video_url="https://videos.example.com/1", duration=duration, order=order
+        )
+
+    def assertStats(self, lessons, minutes, completed):
+        course = Course.objects.get(pk=self.course.pk)
+        summary = CourseProgressSummary.objects.get(enrollment=self.enrollment)
+        self.assertEqual(
+            (course.lessons_count, course.total_duration_minutes, summary.total_lessons, summary.completed_count),
+            (lessons, minutes, lessons, completed),
+        )
+
+    def test_orm_writes(self):
+        self.assertStats(lessons=2, minutes=20, completed=1)
+
+        lesson = self.add_lesson(3, duration=5)
+        self.assertStats(lessons=3, minutes=25, completed=1)
+
+        lesson.duration = 15
+        lesson.save()
+        self.assertStats(lessons=3, minutes=35, completed=1)
+
+        lesson.delete()
+        self.assertStats(lessons=2, minutes=20, completed=1)
+
+        # The completed lesson leaves the student's count too
+        Lessons.objects.filter(pk=self.lessons[0].pk).delete()
+        self.assertStats(lessons=1, minutes=10, completed=0)
+
+    def test_api_writes_count_once(self):
+        client = APIClient()
+        client.force_authenticate(self.instructor)
+
+        response = client.post(
+            f"/api/courses/{self.course.pk}/lessons/create",
+            {"title": "Lesson 3", "video_url": "https://videos.example.com/3", "duration": 7, "order": 3},
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertStats(lessons=3, minutes=27, completed=1)
+
+        url = f"/api/courses/{self.course.pk}/lessons/{response.data['id']}/manage/"
+        self.assertEqual(client.patch(url, {"duration": 9}).status_code, 200)
+        self.assertStats(lessons=3, minutes=29, completed=1)
+
+        self.assertEqual(client.delete(url).status_code, 204)
+        self.assertStats(lessons=2, minutes=20, completed=1)
+
+        url = f"/api/courses/{self.course.pk}/lessons/{self.lessons[0].pk}/manage/"
+        self.assertEqual(client.delete(url).status_code, 204)
+        self.assertStats(lessons=1, minutes=10, completed=0)
+
+    def test_queryset_delete_and_move(self):
+        other = Course.objects.create(title="Other", description="About", instructor=self.instructor)
+        extra = [self.add_lesson(order, duration=5) for order in (3, 4, 5)]
+
+        Lessons.objects.filter(pk__in=[extra[0].pk, extra[1].pk, self.lessons[0].pk]).delete()
+        self.assertStats(lessons=2, minutes=15, completed=0)
+
+        lesson = Lessons.objects.get(pk=extra[2].pk)
+        lesson.course = other
+        lesson.save()
+        self.assertStats(lessons=1, minutes=10, completed=0)
+        other.refresh_from_db()
+        self.assertEqual((other.lessons_count, other.total_duration_minutes), (1, 5))
+
+    def test_course_delete(self):
+        self.course.delete()
+        self.assertFalse(Lessons.objects.exists())
+        self.assertFalse(CourseProgressSummary.objects.exists())
+
+
+class ProgressSummaryTests(TestCase):
+    """
+    The progress endpoints read CourseProgressSummary, which must follow
+    enrollments and completions from any path, not just the API views.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        instructor = User.objects.create(username="instructor", role=User.Role.INSTRUCTOR)
+        cls.student = User.objects.create(username="student", role=User.Role.STUDENT)
+        cls.course = Course.objects.create(title="Course", description="About", instructor=instructor)
+        cls.lessons = Lessons.objects.bulk_create([
+            Lessons(course=cls.course, title=f"Lesson {n}", video_url="https://videos.example.com/1", duration=10, order=n)
+            for n in range(1, 5)
+        ])
+        Course.objects.refresh_lesson_stats()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+        enrollment_cache.clear()
+
+    def progress(self):
+        response = self.client.get(f"/api/courses/{self.course.pk}/progress/")
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def aprogress(self):
+        request = APIRequestFactory().get(f"/api/courses/{self.course.pk}/progress/")
+        force_authenticate(request, self.student)
+        response = async_to_sync(AsyncCourseProgressApiView.as_view())(request, course_id=self.course.pk)
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.content)
+
+    def test_orm_enrollment_and_progress(self):
+        self.assertIn("not enrolled", self.progress()["detail"])
+
+        enrollment = Enrollment.objects.create(student=self.student, course=self.course)
+        self.assertEqual((self.progress()["completed_lessons"], self.progress()["total_lessons"]), (0, 4))
+
+        progress = LessonProgress.objects.create(student=self.student, lesson=self.lessons[0], completed=True)
+        LessonProgress.objects.create(student=self.student, lesson=self.lessons[1], completed=False)
+        self.assertEqual(self.progress()["completed_lessons"], 1)
+        self.assertEqual(self.progress()["progress_percent"], 25.0)
+
+        progress.completed = False
+        progress.save()
+        self.assertEqual(self.progress()["completed_lessons"], 0)
+        progress.completed = True
+        progress.save(update_fields=["completed"])
+        self.assertEqual(self.progress()["completed_lessons"], 1)
+
+        progress.delete()
+        self.assertEqual(self.progress()["completed_lessons"], 0)
+
+        enrollment.delete()
+        self.assertFalse(CourseProgressSummary.objects.exists())
+        self.assertIn("not enrolled", self.progress()["detail"])
+
+    def test_api_completion_counts_once(self):
+        Enrollment.objects.create(student=self.student, course=self.course)
+        response = self.client.post(f"/api/courses/{self.course.pk}/lessons/{self.lessons[0].pk}/completed/")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.progress()["completed_lessons"], 1)
+
+    def test_bulk_inserted_enrollment(self):
+        # bulk_create sends no signals: the first read builds the missing summary
+        Enrollment.objects.bulk_create([Enrollment(student=self.student, course=self.course)])
+        LessonProgress.objects.bulk_create([
+            LessonProgress(student=self.student, lesson=lesson, completed=True) for lesson in self.lessons[:3]
+        ])
+        self.assertEqual(self.aprogress()["completed_lessons"], 3)
+        CourseProgressSummary.objects.all().delete()
+        self.assertEqual(self.progress()["completed_lessons"], 3)
+        self.assertEqual(CourseProgressSummary.objects.count(), 1)
+
+
+class CourseDetailProgressTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.instructor = User.objects.create(username="instructor", role=User.Role.INSTRUCTOR)
+        cls.student = User.objects.create(username="student", role=User.Role.STUDENT)
+        cls.course = Course.objects.create(title="Course", description="About", instructor=cls.instructor)
+        cls.lessons = [
+            Lessons.objects.create(
+                course=cls.course, title=f"Lesson {order}", video_url="https://videos.example.com/1", duration=10, order=order
+            )
+            for order in (1, 2)
+        ]
+        Enrollment.objects.create(student=cls.student, course=cls.course)
+        LessonProgress.objects.create(student=cls.student, lesson=cls.lessons[0], completed=True)
+
+    def setUp(self):
+        caches[settings.COURSE_CACHE_ALIAS].clear()
+        self.url = f"/api/courses/{self.course.pk}/"
+
+    def test_public_detail_is_revalidated_by_etag(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response["Cache-Control"], "no-cache")
+        self.assertNotIn("progress", response.json())
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 304)
+
+    def test_progress_detail_is_private_without_etag(self):
+        public = self.client.get(self.url)
+        client = APIClient()
+        client.force_authenticate(self.student)
+
+        # The public ETag must not turn a per-student response into a 304
+        response = client.get(self.url, {"include": "progress"}, HTTP_IF_NONE_MATCH=public["ETag"])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Cache-Control"], "private, no-cache")
+        self.assertFalse(response.has_header("ETag"))
+        self.assertEqual(response.json()["progress"]["completed_lessons"], 1)
+        self.assertEqual([lesson["completed"] for lesson in response.json()["lessons"]], [True, False])
+
+    def test_progress_does_not_leak_into_the_shared_entry(self):
+        client = APIClient()
+        client.force_authenticate(self.student)
+        client.get(self.url, {"include": "progress"})
+
+        anonymous = self.client.get(self.url, {"include": "progress"})
+        self.assertIsNone(anonymous.json()["progress"])
+        public = self.client.get(self.url).json()
+        self.assertNotIn("progress", public)
+        self.assertNotIn("completed", public["lessons"][0])
+
+
+class CatalogInvalidationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.instructor = User.objects.create(username="instructor", role=User.Role.INSTRUCTOR)
+        cls.course = Course.objects.create(title="Course", description="About", instructor=cls.instructor)
+
+    def setUp(self):
+        caches[settings.COURSE_CACHE_ALIAS].clear()
+
+    def test_instructor_rename(self):
+        for url in ["/api/courses/", f"/api/courses/{self.course.pk}/"]:
+            with self.subTest(url):
+                before = self.client.get(url)
+                with self.captureOnCommitCallbacks(execute=True):
+                    self.instructor.username = f"renamed-{url}"
+                    self.instructor.save()
+                after = self.client.get(url, HTTP_IF_NONE_MATCH=before["ETag"])
+                self.assertEqual(after.status_code, 200)
+                self.assertNotEqual(after["ETag"], before["ETag"])
+                self.assertIn(f"renamed-{url}", after.content.decode())
+
+    def test_other_user_saves_keep_the_cache(self):
+        before = self.client.get("/api/courses/")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.instructor.first_name = "Ada"
+            self.instructor.save()
+            self.instructor.save(update_fields=["last_login"])
+        self.assertEqual(self.client.get("/api/courses/", HTTP_IF_NONE_MATCH=before["ETag"]).status_code, 304)
+
+
+class CourseAnalyticsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.instructor = User.objects.create(username="instructor", role=User.Role.INSTRUCTOR)
+        cls.course = Course.objects.create(title="Course", description="About", instructor=cls.instructor)
+
+    def setUp(self):
+        caches[settings.COURSE_CACHE_ALIAS].clear()
+
+    def enroll(self, name, enrolled_at):
+        student = User.objects.create(username=name, role=User.Role.STUDENT)
+        enrollment = Enrollment.objects.create(student=student, course=self.course)
+        # auto_now_add ignores a value passed to create()
+        Enrollment.objects.filter(pk=enrollment.pk).update(enrolled_at=enrolled_at)
+
+    def test_daily_enrollments_are_zero_filled(self):
+        now = timezone.now()
+        for name, days_ago in [("today", 0), ("today-2", 0), ("three-days", 3), ("too-old", 5)]:
+            self.enroll(name, now - datetime.timedelta(days=days_ago))
+
+        client = APIClient()
+        client.force_authenticate(self.instructor)
+        response = client.get(f"/api/instructor/courses/{self.course.pk}/analytics/", {"days": 5})
+
+        self.assertEqual(response.status_code, 200)
+        today = timezone.localdate()
+        self.assertEqual(response.json()["daily_enrollments"], [
+            {"date": (today - datetime.timedelta(days=n)).isoformat(), "count": count}
+            for n, count in [(4, 0), (3, 1), (2, 0), (1, 0), (0, 2)]
+        ])
+        self.assertEqual(response.json()["enrollments"]["total"], 4)
+
+    @override_settings(TIME_ZONE="America/New_York")
+    def test_days_follow_time_zone(self):
+        # 03:30 UTC on the 10th is still the 9th in New York
+        self.enroll("late", datetime.datetime(2026, 3, 10, 3, 30, tzinfo=datetime.timezone.utc))
+        series = daily_enrollments(self.course.pk, 2, today=datetime.date(2026, 3, 10))
+        self.assertEqual(series, [{"date": "2026-03-09", "count": 1}, {"date": "2026-03-10", "count": 0}])
+
+
+class CourseSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.instructor = User.objects.create(username="instructor", role=User.Role.INSTRUCTOR)
+        cls.course = Course.objects.create(title="Python Introduction", description="About", instructor=cls.instructor)
+        Lessons.objects.create(
+            course=cls.course, title="Decorators", video_url="https://videos.example.com/1", duration=10, order=1
+        )
+
+    def setUp(self):
+        caches[settings.COURSE_CACHE_ALIAS].clear()
+
+    def search(self, q):
+        return self.client.get("/api/courses/search/", {"q": q})
+
+    def test_migration_indexes_existing_courses(self):
+        # The reindex scheduled on commit never ran for setUpTestData, so only the migration's fill finds the course
+        migration = importlib.import_module("courses.migrations.0007_course_search_index")
+        with connection.cursor() as cursor:
+            schema_editor = SimpleNamespace(connection=connection, execute=cursor.execute)
+            migration.drop_search_index(None, schema_editor)
+            migration.create_search_index(None, schema_editor)
+        for q in ["pyth intro", "decorat"]:
+            with self.subTest(q):
+                self.assertEqual([hit["id"] for hit in self.search(q).json()["results"]], [self.course.pk])
+
+    def test_unsupported_database(self):
+        with mock.patch.dict("courses.search.BACKENDS", clear=True):
+            response = self.search("python")
+        self.assertEqual(response.status_code, 501)
+        self.assertEqual(response.json()["detail"], f"Course search is not available on {connection.vendor}.")
+
+
+class BulkCompletionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        instructor = User.objects.create(username="instructor", role=User.Role.INSTRUCTOR)
+        cls.student = User.objects.create(username="student", role=User.Role.STUDENT)
+        cls.course = Course.objects.create(title="Course", description="About", instructor=instructor)
+        cls.lessons = [
+            Lessons.objects.create(course=cls.course, title=f"Lesson {n}", video_url="https://videos.example.com/1", duration=10, order=n)
+            for n in (10, 20, 30, 40)
+        ]
+        Enrollment.objects.create(student=cls.student, course=cls.course)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+        self.url = f"/api/courses/{self.course.pk}/progress/bulk/"
+
+    def post(self, *lessons):
+        return self.client.post(self.url, {"lessons": [self.lessons[n].pk for n in lessons]}, format="json")
+
+    def completed(self):
+        return set(
+            LessonProgress.objects.filter(student=self.student, completed=True).values_list("lesson_id", flat=True)
+        )
+
+    def test_out_of_order_is_rejected(self):
+        for name, lessons, blocked in [
+            ("first lesson skipped", (1, 2), 1),
+            ("gap in the batch", (0, 2), 2),
+        ]:
+            with self.subTest(name):
+                response = self.post(*lessons)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.data["detail"], ["Complete the previous lesson first."])
+                self.assertEqual(response.data["lesson"], [str(self.lessons[blocked].pk)])
+                self.assertEqual(self.completed(), set())
+
+    def test_batch_in_any_order(self):
+        response = self.post(2, 0, 1)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["completed_lessons"], [self.lessons[n].pk for n in (0, 1, 2)])
+        self.assertEqual(CourseProgressSummary.objects.get(student=self.student).completed_count, 3)
+
+        # Replays skip what's done; the next lesson follows the stored progress
+        response = self.post(1, 2, 3)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["completed_lessons"], [self.lessons[3].pk])
+        self.assertEqual(response.data["already_completed"], sorted(self.lessons[n].pk for n in (1, 2)))
+        self.assertEqual(self.post(0).status_code, 200)
+        self.assertEqual(CourseProgressSummary.objects.get(student=self.student).completed_count, 4)
+
+    def test_stale_incomplete_row_is_flipped(self):
+        LessonProgress.objects.create(student=self.student, lesson=self.lessons[0], completed=False)
+        self.assertEqual(self.post(0).status_code, 201)
+        self.assertEqual(self.completed(), {self.lessons[0].pk})
+        self.assertEqual(CourseProgressSummary.objects.get(student=self.student).completed_count, 1)
+
+    def test_invalid_batches(self):
+        other = Course.objects.create(title="Other", description="About", instructor=self.course.instructor)
+        stranger = Lessons.objects.create(course=other, title="Elsewhere", video_url="https://videos.example.com/2", duration=5, order=1)
+
+        response = self.client.post(self.url, {"lessons": [stranger.pk]}, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("not in this course", str(response.data["lessons"]))
+
+        response = self.client.post(f"/api/courses/{other.pk}/progress/bulk/", {"lessons": [stranger.pk]}, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("not enrolled", str(response.data["detail"]))
+        self.assertEqual(self.completed(), set())
+
+
+class CompletionWriteBehindTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        instructor = User.objects.create(username="instructor", role=User.Role.INSTRUCTOR)
+        cls.student = User.objects.create(username="student", role=User.Role.STUDENT)
+        cls.course = Course.objects.create(title="Course", description="About", instructor=instructor)
+        cls.lessons = [
+            Lessons.objects.create(course=cls.course, title=f"Lesson {n}", video_url="https://videos.example.com/1", duration=10, order=n)
+            for n in (1, 2, 3)
+        ]
+        cls.enrollment = Enrollment.objects.create(student=cls.student, course=cls.course)
+
+    def setUp(self):
+        caches[settings.COURSE_CACHE_ALIAS].clear()
+        journal_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(journal_dir.cleanup)
+        self.journal_dir = Path(journal_dir.name)
+
+    def buffer(self, **options):
+        # Never started: the tests flush by hand
+        buffer = completions.CompletionBuffer(self.journal_dir, flush_ms=0, flush_rows=500, fsync=False, **options)
+        self.addCleanup(lambda: [segment.file.close() for segment in buffer.segments])
+        return buffer
+
+    def row(self, n):
+        return (self.student.pk, self.lessons[n].pk, self.course.pk)
+
+    def completed(self):
+        return set(
+            LessonProgress.objects.filter(student=self.student, completed=True).values_list("lesson_id", flat=True)
+        )
+
+    def test_replay_after_crash(self):
+        # What a killed process leaves: an unlocked journal with a torn last line
+        lines = [json.dumps(self.row(n)) for n in (0, 1, 0)] + ['[%d, %d' % self.row(2)[:2]]
+        (self.journal_dir / f"123-abc{completions.JOURNAL_SUFFIX}").write_text("\n".join(lines))
+
+        with self.assertLogs("courses.completions", "WARNING"):
+            self.assertEqual(completions.replay_journals(self.journal_dir, batch_size=1), (1, 2))
+        self.assertEqual(self.completed(), {self.lessons[0].pk, self.lessons[1].pk})
+        self.assertEqual(CourseProgressSummary.objects.get(enrollment=self.enrollment).completed_count, 2)
+        self.assertEqual(list(self.journal_dir.iterdir()), [])
+        self.assertEqual(completions.replay_journals(self.journal_dir, batch_size=1), (0, 0))
+
+    def test_replay_skips_live_journals(self):
+        buffer = self.buffer()
+        buffer.add(*self.row(0))
+        self.assertEqual(completions.replay_journals(self.journal_dir, batch_size=500), (0, 0))
+        self.assertTrue(buffer.drain())
+        self.assertEqual(self.completed(), {self.lessons[0].pk})
+        self.assertEqual(list(self.journal_dir.iterdir()), [])
+
+    @override_settings(COMPLETION_WRITE_BEHIND=True)
+    def test_pending_markers(self):
+        buffer = self.buffer()
+        with mock.patch.object(completions, "_buffer", buffer):
+            buffer.add(*self.row(0))
+            ids = [lesson.pk for lesson in self.lessons]
+            self.assertEqual(completions.pending_lessons(self.student.pk, ids), {self.lessons[0].pk})
+
+            # Another process's buffer is only visible through its cache marker
+            buffer.pending.clear()
+            self.assertTrue(completions.is_pending(self.student.pk, self.lessons[0].pk))
+
+            # The next lesson counts its pending predecessor as done
+            client = APIClient()
+            client.force_authenticate(self.student)
+            response = client.post(f"/api/courses/{self.course.pk}/lessons/{self.lessons[1].pk}/completed/")
+            self.assertEqual(response.status_code, 202)
+
+            self.assertTrue(buffer.drain())
+            self.assertEqual(completions.pending_lessons(self.student.pk, ids), set())
+        self.assertEqual(self.completed(), {self.lessons[0].pk, self.lessons[1].pk})
+
+    @override_settings(COMPLETION_WRITE_BEHIND=True)
+    def test_failing_batch_is_dead_lettered(self):
+        buffer = self.buffer(max_retries=1)
+        buffer.add(*self.row(0))
+        with mock.patch.object(completions, "store_completions", side_effect=RuntimeError("bad row")):
+            for attempt in (1, 2):
+                with self.subTest(attempt=attempt), self.assertLogs("courses.completions", "ERROR"):
+                    self.assertFalse(buffer.flush(*buffer.take(wait=False)))
+
+        # Given up on: nothing pending, the journal kept aside, later rows flush as usual
+        self.assertEqual(buffer.snapshot()["dead_lettered"], 1)
+        self.assertEqual(completions.pending_lessons(self.student.pk, [self.lessons[0].pk]), set())
+        dead_letter_dir = self.journal_dir / completions.DEAD_LETTER_DIR
+        self.assertEqual(len(list(dead_letter_dir.glob(f"*{completions.JOURNAL_SUFFIX}"))), 1)
+        self.assertEqual(completions.replay_journals(self.journal_dir, batch_size=500), (0, 0))
+        buffer.add(*self.row(1))
+        self.assertTrue(buffer.drain())
+
+        with self.assertLogs("courses.completions", "WARNING"):
+            self.assertEqual(completions.replay_journals(dead_letter_dir, batch_size=500), (1, 1))
+        self.assertEqual(self.completed(), {self.lessons[0].pk, self.lessons[1].pk})
+
+
+class BulkLessonSyncTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.instructor = User.objects.create(username="instructor", role=User.Role.INSTRUCTOR)
+        cls.student = User.objects.create(username="student", role=User.Role.STUDENT)
+        cls.course = Course.objects.create(title="Course", description="About", instructor=cls.instructor)
+        cls.lessons = [
+            Lessons.objects.create(course=cls.course, title=f"Lesson {n}", video_url="https://videos.example.com/1", duration=n, order=n)
+            for n in (1, 2, 3, 4)
+        ]
+        Enrollment.objects.create(student=cls.student, course=cls.course)
+        for lesson in cls.lessons[:2]:
+            LessonProgress.objects.create(student=cls.student, lesson=lesson, completed=True)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.instructor)
+        self.url = f"/api/courses/{self.course.pk}/lessons/bulk/"
+
+    def test_reorder_create_and_delete(self):
+        first, second, third, fourth = self.lessons
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.put(self.url, {"lessons": [
+                {"id": fourth.pk, "duration": 40},
+                {"title": "New", "video_url": "https://videos.example.com/new", "duration": 7},
+                {"id": second.pk},
+                {"id": third.pk, "title": "Renamed"},
+            ]}, format="json")  # the first lesson is left out
+        self.assertEqual(response.status_code, 200)
+
+        lessons = list(Lessons.objects.filter(course=self.course).order_by("order").values_list("id", "title", "order"))
+        self.assertEqual([(pk, title, order) for pk, title, order in lessons if pk != lessons[1][0]], [
+            (fourth.pk, "Lesson 4", 1), (second.pk, "Lesson 2", 3), (third.pk, "Renamed", 4),
+        ])
+        self.assertEqual(lessons[1][1:], ("New", 2))
+        self.assertEqual([lesson["id"] for lesson in response.data["lessons"]], [pk for pk, _, _ in lessons])
+        self.assertFalse(Lessons.objects.filter(pk=first.pk).exists())
+
+        # Stats follow: 40 + 7 + 2 + 3 minutes, and the deleted lesson leaves the student's count
+        course = Course.objects.get(pk=self.course.pk)
+        self.assertEqual((course.lessons_count, course.total_duration_minutes), (4, 52))
+        summary = CourseProgressSummary.objects.get(student=self.student)
+        self.assertEqual((summary.total_lessons, summary.completed_count), (4, 1))
+
+        # The cached lesson list shows the new order
+        response = APIClient().get(f"/api/courses/{self.course.pk}/lessons/")
+        self.assertEqual([lesson["id"] for lesson in response.data["results"]], [pk for pk, _, _ in lessons])
+
+    def test_swap_does_not_trip_unique_order(self):
+        ids = [lesson.pk for lesson in reversed(self.lessons)]
+        response = self.client.put(self.url, {"lessons": [{"id": pk} for pk in ids]}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(Lessons.objects.filter(course=self.course).values_list("id", flat=True)), ids)
+        course = Course.objects.get(pk=self.course.pk)
+        self.assertEqual((course.lessons_count, course.total_duration_minutes), (4, 10))
+
+    def test_invalid_lists_change_nothing(self):
+        other = Course.objects.create(title="Other", description="About", instructor=self.instructor)
+        stranger = Lessons.objects.create(course=other, title="Elsewhere", video_url="https://videos.example.com/2", duration=5, order=1)
+        for name, items in [
+            ("duplicate id", [{"id": self.lessons[0].pk}, {"id": self.lessons[0].pk}]),
+            ("other course's lesson", [{"id": stranger.pk}]),
+            ("new lesson without a duration", [{"title": "New", "video_url": "https://videos.example.com/new"}]),
+        ]:
+            with self.subTest(name):
+                response = self.client.put(self.url, {"lessons": items}, format="json")
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(Lessons.objects.filter(course=self.course).count(), 4)
+
+        student = APIClient()
+        student.force_authenticate(self.student)
+        self.assertEqual(student.put(self.url, {"lessons": []}, format="json").status_code, 403)
+
+
+class AccessContextTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.instructor = User.objects.create(username="instructor", role=User.Role.INSTRUCTOR)
+        cls.student = User.objects.create(username="student", role=User.Role.STUDENT)
+        cls.course = Course.objects.create(title="Course", description="About", instructor=cls.instructor)
+        cls.lesson = Lessons.objects.create(course=cls.course, title="Lesson", video_url="https://videos.example.com/1", duration=10, order=1)
+
+    def test_each_lookup_queries_once(self):
+        access = AccessContext(self.student)
+        with self.assertNumQueries(2):
+            self.assertEqual(access.lesson(self.lesson.pk), self.lesson)
+            self.assertEqual(access.lesson(str(self.lesson.pk)), self.lesson)
+            self.assertEqual(access.course(self.course.pk), self.course)  # came with the lesson
+            self.assertFalse(access.is_enrolled(self.course.pk))
+            self.assertFalse(access.is_enrolled(self.course.pk))
+        self.assertEqual((access.hits, access.misses), (3, 2))
+
+        access.record_enrollment(self.course.pk)
+        with self.assertNumQueries(0):
+            self.assertTrue(access.is_enrolled(self.course.pk))
+
+    def test_missing_rows_are_not_found(self):
+        access = AccessContext(self.student)
+        for lookup in (access.course, access.lesson):
+            with self.subTest(lookup.__name__), self.assertRaises(Http404):
+                lookup(0)
+
+    def test_anonymous_is_never_enrolled(self):
+        access = AccessContext(AnonymousUser())
+        with self.assertNumQueries(0):
+            self.assertFalse(access.is_enrolled(self.course.pk))
+            self.assertFalse(access.has_lesson_access(self.course.pk))
+
+    def test_shared_across_a_request(self):
+        http_request = RequestFactory().get("/")
+        http_request.user = self.student
+        request = Request(http_request)
+        self.assertIs(get_access_context(request), get_access_context(http_request))
+
+    def test_enroll_then_complete(self):
+        # Enrolment check, lesson and course lookups shared between the
+        # permission, serializer and view of each request
+        client = APIClient()
+        client.force_authenticate(self.student)
+        url = f"/api/courses/{self.course.pk}/lessons/{self.lesson.pk}/completed/"
+        response = client.post(url)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("not enrolled", str(response.data["detail"]))
+        self.assertEqual(client.post(f"/api/courses/{self.course.pk}/enrollment/").status_code, 201)
+        self.assertEqual(client.post(url).status_code, 201)
+        response = client.post(url)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("Already Completed", str(response.data["detail"]))
+
+
+class EnrollmentSetCacheTests(TestCase):
+    """
+    The per-process enrolled-course sets behind lesson access checks: only
+    ever used to grant access, dropped on enrollment changes in this
+    process, and bounded by the TTL for changes made in other processes.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        instructor = User.objects.create(username="instructor", role=User.Role.INSTRUCTOR)
+        cls.student = User.objects.create(username="student", role=User.Role.STUDENT)
+        cls.courses = [
+            Course.objects.create(title=f"Course {n}", description="About", instructor=instructor) for n in range(2)
+        ]
+        cls.lessons = [
+            Lessons.objects.create(course=course, title="Lesson", video_url="https://videos.example.com/1", duration=10, order=1)
+            for course in cls.courses
+        ]
+
+    def setUp(self):
+        enrollment_cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.student)
+        self.now = 1000.0
+
+    def lesson_status(self, n):
+        return self.client.get(f"/api/lessons/{self.lessons[n].pk}").status_code
+
+    def clock(self):
+        return mock.patch("courses.access.time", SimpleNamespace(monotonic=lambda: self.now))
+
+    def test_lru_and_ttl(self):
+        cache = EnrollmentSetCache(maxsize=2, ttl=60)
+        with self.clock():
+            cache.set(1, [10])
+            cache.set(2, [20])
+            self.assertEqual(cache.get(1), {10})  # now the most recent
+            cache.set(3, [30])
+            self.assertIsNone(cache.get(2))
+            self.assertEqual(cache.get(3), {30})
+
+            self.now += 61
+            self.assertIsNone(cache.get(1))
+            cache.invalidate(3)
+            self.assertIsNone(cache.get(3))
+
+    def test_unenrolment_revokes_access(self):
+        enrollment = Enrollment.objects.create(student=self.student, course=self.courses[0])
+        self.assertEqual(self.lesson_status(0), 200)
+        self.assertEqual(enrollment_cache.get(self.student.pk), {self.courses[0].pk})
+
+        enrollment.delete()
+        self.assertIsNone(enrollment_cache.get(self.student.pk))
+        self.assertEqual(self.lesson_status(0), 403)
+
+    def test_enrolment_is_seen_through_a_cached_set(self):
+        Enrollment.objects.create(student=self.student, course=self.courses[0])
+        self.assertEqual(self.lesson_status(0), 200)
+
+        # Made elsewhere: this process's cached set doesn't have it yet
+        Enrollment.objects.bulk_create([Enrollment(student=self.student, course=self.courses[1])])
+        self.assertEqual(enrollment_cache.get(self.student.pk), {self.courses[0].pk})
+        self.assertEqual(self.lesson_status(1), 200)
+        self.assertEqual(enrollment_cache.get(self.student.pk), {course.pk for course in self.courses})
+
+    def test_stale_set_from_another_process_expires(self):
+        with self.clock():
+            enrollment = Enrollment.objects.create(student=self.student, course=self.courses[0])
+            self.assertEqual(self.lesson_status(0), 200)
+
+            # Un-enrolled through another process, whose signal doesn't reach
+            # this cache: the set cached here keeps granting access until the TTL runs out
+            stale = enrollment_cache.get(self.student.pk)
+            enrollment.delete()
+            enrollment_cache.set(self.student.pk, stale)
+            self.now += settings.ENROLLMENT_CACHE_TTL - 1
+            self.assertEqual(self.lesson_status(0), 200)
+
+            self.now += 2
+            self.assertEqual(self.lesson_status(0), 403)
+
+
+class MediaRangeTests(TestCase):
+    def test_parse_range(self):
+        for header, expected in [
+            ("bytes=2-4", (2, 4)),
+            ("bytes=2-", (2, 9)),
+            ("bytes=-3", (7, 9)),
+            ("bytes=5-50", (5, 9)),
+            ("bytes=5-3", None),  # invalid, ignored
+            ("bytes=0-1,4-5", None),
+            ("items=0-1", None),
+            ("bytes=10-", False),
+            ("bytes=12-3", None),
+            ("bytes=-0", False),
+        ]:
+            with self.subTest(header):
+                self.assertEqual(parse_range(header, 10), expected)
+
+    def test_responses(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        Path(media_root.name, "notes.txt").write_bytes(b"0123456789")
+
+        for header, status, body in [
+            ("bytes=2-4", 206, b"234"),
+            ("bytes=5-3", 200, b"0123456789"),
+            ("bytes=10-", 416, b""),
+        ]:
+            with self.subTest(header), override_settings(MEDIA_ROOT=media_root.name, MEDIA_SENDFILE=""):
+                response = serve_media(RequestFactory().get("/media/notes.txt", HTTP_RANGE=header), "notes.txt")
+                self.assertEqual(response.status_code, status)
+                content = b"".join(response.streaming_content) if response.streaming else response.content
+                response.close()
+                self.assertEqual(content, body)
@@ -0,0 +1,134 @@
+import hashlib
+import io
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from PIL import Image, ImageOps, features
+
+from .cache import bump_catalog
+from .models import Course
+
+logger = logging.getLogger("courses.thumbnails")
+
+# Fixed 16:9 sizes the catalog renders; clients pick the smallest that fits.
+VARIANT_SIZES = {
+    "small": (320, 180),
+    "medium": (640, 360),
+    "large": (1280, 720),
+}
+VARIANT_FORMATS = {
+    "webp": ("WEBP", {"quality": 80, "method": 4}),
+    "jpeg": ("JPEG", {"quality": 82, "optimize": True, "progressive": True}),
+}
+VARIANT_ROOT = "thumbnails/variants"
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def variant_formats():
+    return [fmt for fmt in VARIANT_FORMATS if fmt != "webp" or features.check("webp")]
+
+
+def variant_path(digest, size, fmt):
+    # Content-addressed: the same upload always maps to the same files,
+    # so a repeat upload (or the same image on two courses) is generated once.
+    return f"{VARIANT_ROOT}/{digest[:2]}/{digest}/{size}.{fmt}"
+
+
+def variant_urls(digest):
+    return {
+        size: {
+            "width": width,
+            "height": height,
+            **{fmt: default_storage.url(variant_path(digest, size, fmt)) for fmt in variant_formats()},
+        }
+        for size, (width, height) in VARIANT_SIZES.items()
+    }
+
+
+def build_variants(course_id, name):
+    """
+    Generate every missing variant of the stored image `name` and point the
+    course at them. No-op if the course has since been given another image.
+    """
+    digest = hashlib.sha256()
+    with default_storage.open(name, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    digest = digest.hexdigest()
+
+    formats = variant_formats()
+    missing = [
+        (size, fmt)
+        for size in VARIANT_SIZES
+        for fmt in formats
+        if not default_storage.exists(variant_path(digest, size, fmt))
+    ]
+
+    if missing:
+        with default_storage.open(name, "rb") as f:
+            source = ImageOps.exif_transpose(Image.open(f))
+            source = source.convert("RGB")
+
+        for size, fmt in missing:
+            image = ImageOps.fit(source, VARIANT_SIZES[size], Image.Resampling.LANCZOS)
+            pil_format, options = VARIANT_FORMATS[fmt]
+            buffer = io.BytesIO()
+            image.save(buffer, pil_format, **options)
+            default_storage.save(variant_path(digest, size, fmt), ContentFile(buffer.getvalue()))
+
+    updated = Course.objects.filter(pk=course_id, thumbnail=name).update(thumbnail_hash=digest)
+    if updated:
+        bump_catalog(course_id)
+    return digest
+
+
+def _build_logged(course_id, name):
+    try:
+        build_variants(course_id, name)
+    except Exception:
+        logger.exception("Building thumbnail variants failed for course %s (%s)", course_id, name)
+
+
+def _run(course_id, name):
+    try:
+        _build_logged(course_id, name)
+    finally:
+        # Worker threads don't go through the request cycle that closes connections
+        connections.close_all()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.THUMBNAIL_WORKERS,
+                thread_name_prefix="thumbnails",
+            )
+        return _executor
+
+
+def schedule_variants(course):
+    """
+    Queue variant generation for the course's current thumbnail once the
+    surrounding transaction commits. THUMBNAIL_WORKERS = 0 builds inline.
+    """
+    if not course.thumbnail:
+        return
+
+    course_id, name = course.pk, course.thumbnail.name
+
+    def submit():
+        if settings.THUMBNAIL_WORKERS > 0:
+            _get_executor().submit(_run, course_id, name)
+        else:
+            _build_logged(course_id, name)
+
+    transaction.on_commit(submit)
@@ -1,14 +1,26 @@
+from django.conf import settings
 from django.urls import path
+
+from .async_views import (
+    AsyncCourseListView,
+    AsyncCourseDetailView,
+    AsyncLessonListByCourseView,
+    AsyncCourseProgressApiView,
+    AsyncListLessonProgressPerCourseApiView,
+)
 from .views import (
     CourseListView,
+    CourseSearchView,
     CourseDetailView,
     CreateCourseView,
     CourseUpdateDeletView,
     InstructorCourseListApiView,
+    CourseAnalyticsApiView,
 
     LessonListByCourseView,
     LessonCreateApiView,
     LessonUpdateDeleteApiView,
+    BulkLessonSyncApiView,
     CourseLessonDetailApiView,
     LessonDetailApiView,
 
@@ -16,23 +28,33 @@ from .views import (
     MyEnrolledCoursesApiView,
 
     MarkLessonCompletedApiView,
+    BulkMarkLessonsCompletedApiView,
     CourseProgressApiView,
     ListLessonPogressPerCourseApiView,
     )
 
+
+def read_view(sync_view, async_view):
+    # Read-heavy endpoints switch to their async variant for ASGI deployments
+    return (async_view if settings.ASYNC_READ_VIEWS else sync_view).as_view()
+
+
 urlpatterns = [
 
     # URLs for Course
-    path("courses/", CourseListView.as_view()),
-    path("courses/<int:pk>/", CourseDetailView.as_view()),
+    path("courses/", read_view(CourseListView, AsyncCourseListView)),
+    path("courses/search/", CourseSearchView.as_view()),
+    path("courses/<int:pk>/", read_view(CourseDetailView, AsyncCourseDetailView)),
     path("courses/create/", CreateCourseView.as_view()),
     path("courses/<int:pk>/manage/", CourseUpdateDeletView.as_view()),
     path("instructor/courses/", InstructorCourseListApiView.as_view()),
+    path("instructor/courses/<int:course_id>/analytics/", CourseAnalyticsApiView.as_view()),
 
     # URLs for Lessons
-    path("courses/<int:course_id>/lessons/", LessonListByCourseView.as_view()),
+    path("courses/<int:course_id>/lessons/", read_view(LessonListByCourseView, AsyncLessonListByCourseView)),
     path("courses/<int:course_id>/lessons/create", LessonCreateApiView.as_view()),
     path("courses/<int:course_id>/lessons/<int:lesson_id>/manage/", LessonUpdateDeleteApiView.as_view()),
+    path("courses/<int:course_id>/lessons/bulk/", BulkLessonSyncApiView.as_view()),
     path("lessons/<int:lesson_id>", LessonDetailApiView.as_view()),
     path("courses/<int:course_id>/lessons/<int:lesson_id>/", CourseLessonDetailApiView.as_view()),
 
@@ -42,6 +64,9 @@ urlpatterns = [
 
     # Lessson Completion
     path("courses/<int:course_id>/lessons/<int:lesson_id>/completed/", MarkLessonCompletedApiView.as_view()),
-    path("courses/<int:course_id>/progress/", CourseProgressApiView.as_view()),
-    path("courses/<int:course_id>/progress/list/", ListLessonPogressPerCourseApiView.as_view()),
+    path("courses/<int:course_id>/progress/", read_view(CourseProgressApiView, AsyncCourseProgressApiView)),
+    path("courses/<int:course_id>/progress/list/", read_view(
+        ListLessonPogressPerCourseApiView, AsyncListLessonProgressPerCourseApiView
+    )),
+    path("courses/<int:course_id>/progress/bulk/", BulkMarkLessonsCompletedApiView.as_view()),
 ]
\ No newline at end of file
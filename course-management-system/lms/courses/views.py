@@ -1,19 +1,25 @@
+from django.conf import settings
+from django.http import Http404
 from django.shortcuts import get_object_or_404
-from django.db import IntegrityError
-from django.db.models import Count
+from django.db import IntegrityError, transaction
+from django.db.models import F, Prefetch
 
-from rest_framework import generics, permissions, serializers
+from rest_framework import generics, permissions, serializers, status
 from rest_framework.views import APIView, Response
-from rest_framework.exceptions import PermissionDenied
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.utils.urls import remove_query_param
 
-from .models import Course, Lessons, Enrollment, LessonProgress
+from .models import Course, Enrollment, Lessons, LessonProgress, CourseProgressSummary
 
 from .serializers import (
     CourseSerializer,
     CourseDetailSerializer,
     LessonSerializers,
+    BulkLessonSyncSerializer,
     EnrollmentSerializer,
-    LessonProgressSerializer
+    LessonProgressSerializer,
+    BulkLessonProgressSerializer,
+    sparse_fieldset,
     )
 
 from .permissions import (
@@ -21,12 +27,24 @@ from .permissions import (
     IsStudent,
     IsOwnerInstructorOrReadOnly,
     IsCourseOwnerInstructor,
+    IsCourseOwner,
 )
 
+from .access import enrollment_cache, get_access_context
+from .pagination import CourseListPagination, SearchKeysetPagination
+from .cache import AnalyticsCacheMixin, CatalogCacheMixin, bump_catalog
+from .completions import buffer_stats, get_buffer, record_completions
+from .replicas import ReplicaReadMixin
+from .rows import ValuesListMixin
+from .analytics import DEFAULT_DAYS, MAX_DAYS, course_analytics
+from .search import schedule_reindex, search_courses, search_terms
+from .thumbnails import schedule_variants
 
-def ensure_lesson_detail_access(user, lesson):
+
+def ensure_lesson_detail_access(request, lesson):
+    user = request.user
     if getattr(user, "role", None) == "student":
-        if Enrollment.objects.filter(student=user, course=lesson.course).exists():
+        if get_access_context(request).has_lesson_access(lesson.course_id):
             return
         raise PermissionDenied("You are not enrolled in this course.")
 
@@ -36,46 +54,188 @@ def ensure_lesson_detail_access(user, lesson):
     raise PermissionDenied("You do not have access to this lesson.")
 
 
-class CourseListView(generics.ListAPIView):
+def sparse(queryset, request, serializer_class, path="", keep=()):
+    # Skip loading the columns (and joins) a ?fields= / ?omit= selection leaves out
+    plan = serializer_class.sparse_plan(request, path, keep)
+    if plan is None:
+        return queryset
+
+    deferred, traversed = plan
+    queryset = queryset.defer(*deferred)
+    joined = queryset.query.select_related
+    if isinstance(joined, dict) and not traversed.issuperset(joined):
+        queryset = queryset.select_related(None)
+        if traversed.intersection(joined):  # select_related() with no names joins everything
+            queryset = queryset.select_related(*traversed.intersection(joined))
+    return queryset
+
+
+def detail_queryset(queryset, request):
+    # Course detail narrowed to the requested fields, with its lessons
+    # prefetched the same way (only when they're in the response at all).
+    queryset = sparse(queryset, request, CourseDetailSerializer)
+    selected, omitted = sparse_fieldset(request)
+    if (selected is None or "lessons" in selected) and "lessons" not in omitted:
+        lessons = sparse(Lessons.objects.all(), request, LessonSerializers, path="lessons")
+        queryset = queryset.prefetch_related(Prefetch("lessons", queryset=lessons))
+    return queryset
+
+
+def wants_progress(request):
+    return request.query_params.get("include") == "progress"
+
+
+def public_detail_uri(request):
+    # The course detail URL without ?include=, the key of its shared cache entry
+    return remove_query_param(request.build_absolute_uri(), "include")
+
+
+def with_progress(course_data, completed_ids):
+    """
+    Course detail payload plus a `completed` flag on each lesson and the
+    student's totals under `progress`. `completed_ids` is None when the
+    caller is not an enrolled student; `progress` is then null.
+    """
+    if completed_ids is None:
+        return {**course_data, "progress": None}
+
+    if any("id" not in lesson for lesson in course_data.get("lessons", [{}])):
+        raise ValidationError({"fields": "include=progress needs lessons and lessons.id in the response."})
+
+    lessons = [{**lesson, "completed": lesson["id"] in completed_ids} for lesson in course_data["lessons"]]
+    done = sum(lesson["completed"] for lesson in lessons)
+    return {
+        **course_data,
+        "lessons": lessons,
+        "progress": {
+            "completed_lessons": done,
+            "total_lessons": len(lessons),
+            "progress_percent": round(done / len(lessons) * 100, 2) if lessons else 0,
+        },
+    }
+
+
+class CourseListView(ReplicaReadMixin, CatalogCacheMixin, ValuesListMixin, generics.ListAPIView):
     permission_classes = [permissions.AllowAny]
     serializer_class = CourseSerializer
+    pagination_class = CourseListPagination  # ?pagination=cursor for keyset pages
+    row_keep = ["id", "created_at"]  # keyset cursor keys
 
     queryset = (
         Course.objects
         .select_related("instructor")
-        .annotate(lessons_count=Count("lessons"))
-        .order_by("-created_at")
+        .order_by("-created_at", "-id")
     )
 
+    def get_queryset(self):
+        # created_at stays loaded: keyset cursors are built from it
+        return sparse(super().get_queryset(), self.request, CourseSerializer, keep=["created_at"])
+
+
+class CourseSearchView(CatalogCacheMixin, generics.ListAPIView):
+    permission_classes = [permissions.AllowAny]
+    serializer_class = CourseSerializer
+    pagination_class = SearchKeysetPagination
+
+    # GET /courses/search/?q=pyth intro  -> ranked, every word matched as a prefix
+    def list(self, request, *args, **kwargs):
+        query = request.query_params.get("q", "")
+        if not search_terms(query):
+            raise ValidationError({"q": "Enter at least one word to search for."})
+
+        paginator = self.paginator
+        hits = paginator.paginate_hits(
+            lambda **page: search_courses(query, **page), request
+        )
+        courses = sparse(
+            Course.objects.select_related("instructor"), request, CourseSerializer
+        ).in_bulk([hit.id for hit in hits])
+        page = [courses[hit.id] for hit in hits if hit.id in courses]
+
+        serializer = self.get_serializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
 
 class InstructorCourseListApiView(generics.ListAPIView):
     permission_classes = [permissions.IsAuthenticated, IsInstructor]
     serializer_class = CourseSerializer
+    pagination_class = CourseListPagination
 
     def get_queryset(self):
         user = self.request.user
 
-        return (
+        queryset = (
             Course.objects
             .filter(instructor=user)  
             .select_related("instructor")
-            .annotate(lessons_count=Count("lessons"))
-            .order_by("-created_at")
+            .order_by("-created_at", "-id")
         )
+        return sparse(queryset, self.request, CourseSerializer, keep=["created_at"])
+
+
+class CourseAnalyticsApiView(AnalyticsCacheMixin, generics.RetrieveAPIView):
+    permission_classes = [permissions.IsAuthenticated, IsCourseOwner]
+
+    # GET /instructor/courses/:courseId/analytics/?days=30
+    # Enrollment totals, per-lesson completion funnel and daily enrollments
+    def retrieve(self, request, course_id):
+        return Response(course_analytics(course_id, days=self.get_days()))
+
+    def get_days(self):
+        try:
+            days = int(self.request.query_params.get("days", DEFAULT_DAYS))
+        except ValueError:
+            raise ValidationError({"days": "Must be a whole number of days."})
+        if not 1 <= days <= MAX_DAYS:
+            raise ValidationError({"days": f"Must be between 1 and {MAX_DAYS}."})
+        return days
 
 
-class CourseDetailView(generics.RetrieveAPIView):
+class CourseDetailView(ReplicaReadMixin, CatalogCacheMixin, generics.RetrieveAPIView):
     permission_classes = [permissions.AllowAny]
+    catalog_scope = "course"
     queryset = Course.objects.select_related("instructor").all().order_by("-created_at")
     serializer_class = CourseDetailSerializer
 
+    def get_queryset(self):
+        return detail_queryset(super().get_queryset(), self.request)
+
+    # GET /courses/:id/?include=progress  -> the same payload plus the caller's progress
+    def get(self, request, *args, **kwargs):
+        if not wants_progress(request):
+            return super().get(request, *args, **kwargs)
+
+        # The public part comes from the shared catalog cache entry; the
+        # progress is per caller, so this response gets no ETag.
+        fingerprint = self.get_catalog_fingerprint(request, uri=public_detail_uri(request))
+        response = self.get_catalog_response(fingerprint, request, *args, **kwargs)
+        if response.status_code != status.HTTP_200_OK:
+            return response
+
+        completed = self.get_completed_lessons(request, kwargs["pk"])
+        response = Response(with_progress(response.data, completed))
+        response["Cache-Control"] = "private, no-cache"
+        return response
+
+    def get_completed_lessons(self, request, course_id):
+        if getattr(request.user, "role", None) != "student":
+            return None
+        if not get_access_context(request).is_enrolled(course_id):
+            return None
+        return set(
+            LessonProgress.objects.filter(
+                student=request.user, lesson__course_id=course_id, completed=True
+            ).values_list("lesson_id", flat=True)
+        )
+
 
 class CreateCourseView(generics.CreateAPIView):
     permission_classes = [permissions.IsAuthenticated, IsInstructor]
     serializer_class = CourseSerializer
 
     def perform_create(self, serializer):
-        serializer.save(instructor=self.request.user)
+        course = serializer.save(instructor=self.request.user)
+        schedule_variants(course)
 
 
 class CourseUpdateDeletView(generics.RetrieveUpdateDestroyAPIView):
@@ -83,14 +243,25 @@ class CourseUpdateDeletView(generics.RetrieveUpdateDestroyAPIView):
     queryset = Course.objects.select_related("instructor").all()
     serializer_class = CourseSerializer
 
+    def perform_update(self, serializer):
+        if "thumbnail" not in serializer.validated_data:
+            serializer.save()
+            return
+
+        # New image: stop serving the old variants until the new ones are built
+        course = serializer.save(thumbnail_hash="")
+        schedule_variants(course)
+
 
-class LessonListByCourseView(generics.ListAPIView):
+class LessonListByCourseView(ReplicaReadMixin, CatalogCacheMixin, ValuesListMixin, generics.ListAPIView):
     permission_classes = [permissions.AllowAny]
+    catalog_scope = "course"
+    catalog_course_kwarg = "course_id"
     serializer_class = LessonSerializers
 
     def get_queryset(self):
         course_id = self.kwargs["course_id"]
-        return Lessons.objects.filter(course_id=course_id).order_by("order")
+        return sparse(Lessons.objects.filter(course_id=course_id).order_by("order"), self.request, LessonSerializers)
     
 
 class CourseLessonDetailApiView(generics.ListAPIView):
@@ -99,12 +270,10 @@ class CourseLessonDetailApiView(generics.ListAPIView):
 
     # url: courses/course_id/lessons/lesson_id
     def get_queryset(self):
-        lesson = get_object_or_404(
-            Lessons.objects.select_related("course"),
-            course_id=self.kwargs["course_id"],
-            id=self.kwargs["lesson_id"],
-        )
-        ensure_lesson_detail_access(self.request.user, lesson)
+        lesson = get_access_context(self.request).lesson(self.kwargs["lesson_id"])
+        if lesson.course_id != self.kwargs["course_id"]:
+            raise Http404
+        ensure_lesson_detail_access(self.request, lesson)
 
         return Lessons.objects.filter(id=lesson.id)
 
@@ -114,11 +283,8 @@ class LessonDetailApiView(generics.ListAPIView):
     serializer_class = LessonSerializers
 
     def get_queryset(self):
-        lesson = get_object_or_404(
-            Lessons.objects.select_related("course"),
-            id=self.kwargs["lesson_id"],
-        )
-        ensure_lesson_detail_access(self.request.user, lesson)
+        lesson = get_access_context(self.request).lesson(self.kwargs["lesson_id"])
+        ensure_lesson_detail_access(self.request, lesson)
 
         return Lessons.objects.filter(id=lesson.id)
 
@@ -128,9 +294,10 @@ class LessonCreateApiView(generics.CreateAPIView):
     serializer_class = LessonSerializers
 
     def perform_create(self, serializer):
-        course = get_object_or_404(Course, pk=self.kwargs["course_id"])
+        course = get_access_context(self.request).course(self.kwargs["course_id"])
         try:
-            serializer.save(course=course)
+            with transaction.atomic():
+                serializer.save(course=course)
         except IntegrityError:
             raise serializers.ValidationError({"order": "This order is already used in this course."})
 
@@ -148,48 +315,205 @@ class LessonUpdateDeleteApiView(generics.RetrieveUpdateDestroyAPIView):
         self.check_object_permissions(self.request, obj)
         return obj
 
+    # Lesson stats and progress summaries follow through the Lessons signals (courses/signals.py)
+    def perform_update(self, serializer):
+        try:
+            with transaction.atomic():
+                serializer.save()
+        except IntegrityError:
+            raise serializers.ValidationError({"order": "This order is already used in this course."})
+
+
+class BulkLessonSyncApiView(APIView):
+    permission_classes = [permissions.IsAuthenticated, IsCourseOwnerInstructor]
+
+    def put(self, request, course_id):
+
+        # PUT /courses/:courseId/lessons/bulk/  {"lessons": [{"id": 3}, {"title": ...}, ...]}
+        # The list is the full new lesson list: listed ids are updated, items without
+        # an id are created, lessons left out are deleted and positions become the order.
+
+        serializer = BulkLessonSyncSerializer(
+            data=request.data,
+            context={"request": request, "view": self},
+        )
+        serializer.is_valid(raise_exception=True)
+        items = serializer.validated_data["lessons"]
+        existing = serializer.validated_data["existing"]
+
+        kept_ids = {item["id"] for item in items if "id" in item}
+        removed_ids = [pk for pk in existing if pk not in kept_ids]
+
+        to_update = []
+        to_create = []
+        minutes = 0  # change in the course's total duration from updates and creates
+        for position, item in enumerate(items, start=1):
+            fields = {k: v for k, v in item.items() if k != "id"}
+            if "id" in item:
+                lesson = existing[item["id"]]
+                minutes += fields.get("duration", lesson.duration) - lesson.duration
+                for field, value in fields.items():
+                    setattr(lesson, field, value)
+                lesson.order = position
+                to_update.append(lesson)
+            else:
+                to_create.append(Lessons(course_id=course_id, order=position, **fields))
+                minutes += fields["duration"]
+
+        with transaction.atomic():
+            lessons = Lessons.objects.filter(course_id=course_id)
+            if removed_ids:
+                # Row-level delete: the Lessons signals uncount these lessons
+                lessons.filter(id__in=removed_ids).delete()
+
+            if to_update:
+                # Park kept rows above every old and new position first, so the
+                # renumbering never trips unique_course_order half-way through.
+                offset = max(max(lesson.order for lesson in existing.values()), len(items)) + 1
+                lessons.filter(id__in=kept_ids).update(order=F("order") + offset)
+                Lessons.objects.bulk_update(
+                    to_update, ["title", "video_url", "duration", "order"], batch_size=500
+                )
+
+            Lessons.objects.bulk_create(to_create, batch_size=500)
+
+            # bulk_update / bulk_create send no signals
+            Course.objects.filter(pk=course_id).bump_lesson_stats(lessons=len(to_create), minutes=minutes)
+            CourseProgressSummary.objects.filter(course_id=course_id).bump(total=len(to_create))
+            schedule_reindex(course_id)
+            bump_catalog(course_id)
+
+        lessons = LessonSerializers(
+            Lessons.objects.filter(course_id=course_id).order_by("order"), many=True
+        )
+        return Response({"lessons": lessons.data})
+
 
 class EnrollCourseAPiView(generics.CreateAPIView):
     permission_classes = [permissions.IsAuthenticated, IsStudent]
     serializer_class = EnrollmentSerializer
 
     def perform_create(self, serializer):
-        course = get_object_or_404(Course, pk=self.kwargs['pk'])
+        access = get_access_context(self.request)
+        course = access.course(self.kwargs['pk'])
         try:
-            serializer.save(student=self.request.user, course=course)
+            with transaction.atomic():
+                serializer.save(student=self.request.user, course=course)  # summary: courses/signals.py
+                user_id = self.request.user.pk
+                transaction.on_commit(lambda: enrollment_cache.invalidate(user_id))
+            access.record_enrollment(course.id)
         except IntegrityError:
             raise serializers.ValidationError({"detail": "You're already enrolled in this course!"})
 
 
-class MyEnrolledCoursesApiView(generics.ListAPIView):
+class MyEnrolledCoursesApiView(ReplicaReadMixin, ValuesListMixin, generics.ListAPIView):
     permission_classes = [permissions.IsAuthenticated, IsStudent]
     serializer_class = CourseSerializer
 
     def get_queryset(self):
         user = self.request.user
-        return Course.objects.filter(enrollmentcourses__student=user).order_by('-created_at')
+        return (
+            Course.objects
+            .filter(enrollmentcourses__student=user)
+            .select_related("instructor")
+            .order_by('-created_at')
+        )
 
 
 class MarkLessonCompletedApiView(generics.CreateAPIView):
     permission_classes = [permissions.IsAuthenticated, IsStudent]
     serializer_class = LessonProgressSerializer
 
-    def perform_create(self, serializer):
+    def create(self, request, *args, **kwargs):
+        if not settings.COMPLETION_WRITE_BEHIND:
+            return super().create(request, *args, **kwargs)
+
+        # Validated now, written by the completion buffer within COMPLETION_FLUSH_MS
+        buffer = get_buffer()
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        lesson = self.get_lesson()
+        already_completed = LessonProgress.objects.filter(
+            student=request.user, lesson=lesson, completed=True
+        ).exists()
+        if already_completed or not buffer.add(request.user.pk, lesson.pk, lesson.course_id):
+            raise serializers.ValidationError({"detail": "Lesson Already Completed!"})
+
+        # The 201 body's shape; the id is null until the row is written
+        progress = LessonProgress(student_id=request.user.pk, lesson_id=lesson.pk, completed=True)
+        response = Response(self.get_serializer(progress).data, status=status.HTTP_202_ACCEPTED)
+        if settings.DEBUG:
+            stats = buffer_stats()
+            response["X-Completion-Buffer"] = (
+                f"depth={stats['depth']}; flushes={stats['flushes']}; last-flush-ms={stats['last_flush_ms']:.1f}"
+            )
+        return response
+
+    def get_lesson(self):
         course_id = self.kwargs['course_id']
         lesson_id = self.kwargs['lesson_id']
 
+        access = get_access_context(self.request)
+
         # Fetch lesson and ensure it belongs to the course
-        lesson = get_object_or_404(Lessons, id=lesson_id, course_id=course_id)
+        lesson = access.lesson(lesson_id)
+        if lesson.course_id != course_id:
+            raise Http404
 
         # Ensure student is enrolled in that course
-        if not Enrollment.objects.filter(student=self.request.user, course_id=course_id).exists():
+        if not access.is_enrolled(course_id):
             raise PermissionDenied("You are not enrolled in this course.")
+        return lesson
+
+    def perform_create(self, serializer):
+        lesson = self.get_lesson()
         try:
-            serializer.save(student=self.request.user, lesson=lesson, completed=True)
+            with transaction.atomic():
+                # The LessonProgress signal counts it in the student's summary
+                serializer.save(student=self.request.user, lesson=lesson, completed=True)
         except IntegrityError:
             raise serializers.ValidationError({"detail": "Lesson Already Completed!"})
 
 
+class BulkMarkLessonsCompletedApiView(APIView):
+    permission_classes = [permissions.IsAuthenticated, IsStudent]
+
+    def post(self, request, course_id):
+
+        # POST /courses/:courseId/progress/bulk/  {"lessons": [4, 5, 6]}
+        # Lessons that are already completed are skipped, so clients can replay safely.
+
+        serializer = BulkLessonProgressSerializer(
+            data=request.data,
+            context={"request": request, "view": self},
+        )
+        serializer.is_valid(raise_exception=True)
+        new_lessons = serializer.validated_data["new_lessons"]
+
+        if new_lessons:
+            rows = [
+                LessonProgress(student=request.user, lesson_id=lesson_id, completed=True)
+                for lesson_id in new_lessons
+            ]
+            with transaction.atomic():
+                # Upsert: a stale completed=False row for the same lesson gets flipped
+                LessonProgress.objects.bulk_create(
+                    rows,
+                    update_conflicts=True,
+                    unique_fields=["student", "lesson"],
+                    update_fields=["completed"],
+                )
+                record_completions(request.user, course_id, len(new_lessons))
+
+        return Response(
+            {
+                "completed_lessons": new_lessons,
+                "already_completed": serializer.validated_data["already_completed"],
+            },
+            status=status.HTTP_201_CREATED if new_lessons else status.HTTP_200_OK,
+        )
+
+
 class ListLessonPogressPerCourseApiView(APIView):
     permission_classes = [permissions.IsAuthenticated, IsStudent]
 
@@ -198,10 +522,11 @@ class ListLessonPogressPerCourseApiView(APIView):
         # GET /courses/:courseId/progress/  -> { completed_lessons: [1,2,3] } 
 
         user = request.user
-        course = get_object_or_404(Course, pk=course_id)
+        access = get_access_context(request)
+        course = access.course(course_id)
 
         # Must be enrolled
-        if not Enrollment.objects.filter(student=user, course=course).exists():
+        if not access.is_enrolled(course.id):
             raise PermissionDenied("You are not enrolled in this course!")
         
         # Progress rows for this student, for lessons in this course,that are completed
@@ -225,32 +550,21 @@ class CourseProgressApiView(APIView):
         if request.user.role != 'student':
             return Response({"detail": "Only students can view their progress."})
 
-        # get the course
-        course = get_object_or_404(Course, pk=course_id)
-
-        # Check if student is enrolled to the course
-        enrolled = Enrollment.objects.filter(
-            student=request.user,
-            course=course
-        ).exists()
-        if not enrolled:
-            return Response({"detail": "You're not enrolled to this course. Enroll First to see Progress!"})
-
-        # Count all course lessons
-        total = course.lessons.count()
-
-        # Count completed lessons
-        completed = LessonProgress.objects.filter(
-            student=request.user,
-            lesson__course=course,
-            completed=True
-        ).count()
+        # One lookup on the materialized summary covers the enrollment check and both counts
+        summary = CourseProgressSummary.objects.filter(student=request.user, course_id=course_id).first()
 
-        percent = 0 if total == 0 else round((completed/total) * 100, 2)
+        if summary is None:
+            # Every enrollment gets a summary (migration 0004, the Enrollment
+            # signal), except ones bulk-inserted: build it for those
+            course = get_object_or_404(Course, pk=course_id)
+            enrollment = Enrollment.objects.filter(student=request.user, course=course).first()
+            if enrollment is None:
+                return Response({"detail": "You're not enrolled to this course. Enroll First to see Progress!"})
+            summary = CourseProgressSummary.objects.sync(enrollment)
 
         return Response({
-            "course_id": course.id,
-            "total_lessons": total,
-            "completed_lessons": completed,
-            "progress_percent": percent,
+            "course_id": summary.course_id,
+            "total_lessons": summary.total_lessons,
+            "completed_lessons": summary.completed_count,
+            "progress_percent": summary.progress_percent,
         })
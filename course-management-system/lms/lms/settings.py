@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/6.0/ref/settings/
 
 import os
 from datetime import timedelta
+from importlib.util import find_spec
 from pathlib import Path
 
 from django.core.exceptions import ImproperlyConfigured
@@ -27,6 +28,11 @@ def _env_bool(name, default=False):
     return value.strip().lower() in {"1", "true", "yes", "on"}
 
 
+def _env_int(name, default=None):
+    value = os.environ.get(name, "").strip()
+    return int(value) if value else default
+
+
 def _env_list(name, default=""):
     raw_value = os.environ.get(name, default)
     return [item.strip().rstrip("/") for item in raw_value.split(",") if item.strip()]
@@ -67,6 +73,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'courses.middleware.RequestTimingMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -75,6 +82,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'courses.middleware.AccessContextStatsMiddleware',
+    'courses.middleware.ReplicaPinMiddleware',
 ]
 
 ROOT_URLCONF = 'lms.urls'
@@ -118,17 +127,25 @@ WSGI_APPLICATION = 'lms.wsgi.application'
 # DRF + JWT config
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "users.authentication.ClaimsJWTAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": (
         "rest_framework.permissions.IsAuthenticated",
     ),
+    "DEFAULT_RENDERER_CLASSES": (
+        "courses.renderers.FastJSONRenderer",  # orjson when installed, same bytes
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 10,
 }
 
 # Longer access token lifetime
 SIMPLE_JWT = {
+    # Access tokens carry the user's username and role, and requests trust
+    # them without loading the user row (users/authentication.py). A role
+    # change, rename or deactivation takes effect at the next refresh, which
+    # reads the row again: up to ACCESS_TOKEN_LIFETIME after the change.
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=30),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=7),
     "ROTATE_REFRESH_TOKENS": True,
@@ -136,6 +153,10 @@ SIMPLE_JWT = {
     "AUTH_HEADER_TYPES": ("Bearer",),
 }
 
+# Refresh tokens this process has revoked (rotation, logout), checked in
+# memory before a refresh instead of querying the blacklist (users/tokens.py)
+REVOKED_TOKEN_CACHE_SIZE = int(os.environ.get("REVOKED_TOKEN_CACHE_SIZE", "100000"))
+
 # Cookie-based refresh token settings
 # Cross-site cookies require SameSite=None and Secure=true in modern browsers.
 JWT_REFRESH_COOKIE_NAME = os.environ.get("JWT_REFRESH_COOKIE_NAME", "refresh_token")
@@ -175,16 +196,155 @@ if SESSION_COOKIE_SAMESITE not in {"Lax", "Strict", "None"}:
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
 
-DATABASES = {
+# DJANGO_DB_ENGINE picks the profile: "sqlite" (default) or "postgres".
+
+DB_ENGINE = os.environ.get("DJANGO_DB_ENGINE", "sqlite").strip().lower()
+
+if DB_ENGINE == "sqlite":
+    # WAL lets readers run alongside the single writer, IMMEDIATE transactions
+    # take the write lock up front (no deadlock-prone lock upgrades), and the
+    # busy timeout makes writers queue instead of failing with "database is locked".
+    # The pragmas run on every new connection. SQLITE_TUNING=false gives stock SQLite.
+    _sqlite_options = {}
+    if _env_bool("SQLITE_TUNING", True):
+        _sqlite_options = {
+            "timeout": int(os.environ.get("SQLITE_BUSY_TIMEOUT", "20")),  # seconds
+            "transaction_mode": "IMMEDIATE",
+            "init_command": ";".join([
+                "PRAGMA journal_mode=WAL",
+                "PRAGMA synchronous=NORMAL",
+                f"PRAGMA mmap_size={int(os.environ.get('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)))}",
+                "PRAGMA cache_size=-32000",  # KiB
+                "PRAGMA temp_store=MEMORY",
+            ]),
+        }
+
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get("DJANGO_DB_NAME") or BASE_DIR / 'db.sqlite3',
+            'OPTIONS': _sqlite_options,
+        }
+    }
+
+elif DB_ENGINE == "postgres":
+    # Either Django's persistent connections (DJANGO_DB_CONN_MAX_AGE seconds,
+    # health-checked before reuse) or, with DJANGO_DB_POOL=true, a psycopg pool.
+    _pg_options = {}
+    _conn_max_age = int(os.environ.get("DJANGO_DB_CONN_MAX_AGE", "60"))
+    if _env_bool("DJANGO_DB_POOL", False):
+        _pg_options["pool"] = {
+            "min_size": int(os.environ.get("DJANGO_DB_POOL_MIN_SIZE", "2")),
+            "max_size": int(os.environ.get("DJANGO_DB_POOL_MAX_SIZE", "10")),
+            "timeout": int(os.environ.get("DJANGO_DB_POOL_TIMEOUT", "10")),
+        }
+        _conn_max_age = 0  # the pool owns connection lifetime
+
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get("DJANGO_DB_NAME", "lms"),
+            'USER': os.environ.get("DJANGO_DB_USER", "lms"),
+            'PASSWORD': os.environ.get("DJANGO_DB_PASSWORD", ""),
+            'HOST': os.environ.get("DJANGO_DB_HOST", "127.0.0.1"),
+            'PORT': os.environ.get("DJANGO_DB_PORT", "5432"),
+            'CONN_MAX_AGE': _conn_max_age,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': _pg_options,
+        }
+    }
+
+else:
+    raise ImproperlyConfigured("DJANGO_DB_ENGINE must be one of: sqlite, postgres.")
+
+# Read replicas for the catalog and enrolled-course reads (courses/replicas.py):
+# DJANGO_DB_REPLICAS is a comma-separated list of replica database files
+# (sqlite) or host[:port] (postgres), each otherwise configured like default.
+# After a user's own write, their reads stay on the primary for
+# REPLICA_PIN_SECONDS; keep it above the replicas' usual lag.
+DB_REPLICAS = []
+for _number, _replica in enumerate(_env_list("DJANGO_DB_REPLICAS"), start=1):
+    _replica_db = {**DATABASES["default"], "TEST": {"MIRROR": "default"}}
+    if DB_ENGINE == "sqlite":
+        _replica_db["NAME"] = _replica
+    else:
+        _replica_db["HOST"], _, _port = _replica.partition(":")
+        _replica_db["PORT"] = _port or _replica_db["PORT"]
+    DATABASES[f"replica_{_number}"] = _replica_db
+    DB_REPLICAS.append(f"replica_{_number}")
+
+DATABASE_ROUTERS = ["courses.replicas.ReplicaRouter"] if DB_REPLICAS else []
+REPLICA_PIN_SECONDS = int(os.environ.get("REPLICA_PIN_SECONDS", "5"))
+
+# Cache
+# Local memory by default; point DJANGO_CACHE_BACKEND/LOCATION at a shared
+# backend (e.g. Redis or Memcached) when running several workers.
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': os.environ.get("DJANGO_CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        'LOCATION': os.environ.get("DJANGO_CACHE_LOCATION", "lms-default"),
     }
 }
 
+# Versioned response cache for the public course catalog (courses/cache.py)
+COURSE_CACHE_ALIAS = os.environ.get("COURSE_CACHE_ALIAS", "default")
+COURSE_CACHE_TIMEOUT = int(os.environ.get("COURSE_CACHE_TIMEOUT", "300"))
+
+# Per-process LRU of each student's enrolled course ids, used for lesson access checks.
+# Enrollment signals clear it in the process that wrote; a student un-enrolled
+# by another process keeps lesson access there for up to ENROLLMENT_CACHE_TTL seconds.
+ENROLLMENT_CACHE_SIZE = int(os.environ.get("ENROLLMENT_CACHE_SIZE", "10000"))
+ENROLLMENT_CACHE_TTL = int(os.environ.get("ENROLLMENT_CACHE_TTL", "60"))
+
+# Course search (courses/search.py): a query matching more courses than this
+# ranks only the newest this many of them, which bounds its cost
+COURSE_SEARCH_MAX_CANDIDATES = int(os.environ.get("COURSE_SEARCH_MAX_CANDIDATES", "5000"))
+
 # custom Auth User
 AUTH_USER_MODEL = "users.User"
 
+# Password hashing (users/hashers.py). PASSWORD_HASHER is what new passwords
+# are hashed with: "scrypt" (default), "argon2" (needs argon2-cffi) or "pbkdf2".
+# Hashes from the other two, or made with other cost settings, still verify
+# and are redone with the current choice at the user's next login.
+# Cost settings left unset use Django's defaults for the installed version
+# (scrypt N=2^14 r=8 p=1, argon2id 100 MiB / 2 passes / 8 lanes, PBKDF2-SHA256
+# 1M iterations in 5.2). Lowering one below a stored hash's parameters
+# downgrades that hash at the user's next login.
+_PASSWORD_HASHERS = {
+    "scrypt": "users.hashers.ScryptPasswordHasher",
+    "argon2": "users.hashers.Argon2PasswordHasher",
+    "pbkdf2": "users.hashers.PBKDF2PasswordHasher",
+}
+PASSWORD_HASHER = os.environ.get("PASSWORD_HASHER", "scrypt").strip().lower()
+
+if PASSWORD_HASHER not in _PASSWORD_HASHERS:
+    raise ImproperlyConfigured(f"PASSWORD_HASHER must be one of: {', '.join(_PASSWORD_HASHERS)}.")
+
+if PASSWORD_HASHER == "argon2" and find_spec("argon2") is None:
+    raise ImproperlyConfigured("PASSWORD_HASHER=argon2 needs the argon2-cffi package.")
+
+PASSWORD_HASHERS = [
+    _PASSWORD_HASHERS[PASSWORD_HASHER],
+    *(path for name, path in _PASSWORD_HASHERS.items() if name != PASSWORD_HASHER),
+    "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+    "django.contrib.auth.hashers.BCryptSHA256PasswordHasher",
+]
+
+SCRYPT_WORK_FACTOR = _env_int("SCRYPT_WORK_FACTOR")
+SCRYPT_BLOCK_SIZE = _env_int("SCRYPT_BLOCK_SIZE")
+SCRYPT_PARALLELISM = _env_int("SCRYPT_PARALLELISM")
+ARGON2_TIME_COST = _env_int("ARGON2_TIME_COST")
+ARGON2_MEMORY_COST = _env_int("ARGON2_MEMORY_COST")  # KiB
+ARGON2_PARALLELISM = _env_int("ARGON2_PARALLELISM")
+PBKDF2_ITERATIONS = _env_int("PBKDF2_ITERATIONS")
+
+# At most this many password hashes run at once per process (login and
+# registration); the next one waits up to PASSWORD_HASH_WAIT seconds, then
+# gets a 503 with Retry-After, so a sign-in rush can't take every worker thread
+PASSWORD_HASH_CONCURRENCY = int(os.environ.get("PASSWORD_HASH_CONCURRENCY", str(os.cpu_count() or 2)))
+PASSWORD_HASH_WAIT = float(os.environ.get("PASSWORD_HASH_WAIT", "5"))
+
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
 
@@ -224,3 +384,70 @@ STATIC_URL = 'static/'
 # Media
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
+
+# MEDIA_URL is served by courses/media.py with DEBUG on, or with
+# DJANGO_SERVE_MEDIA=true; otherwise the front web server maps it straight to
+# MEDIA_ROOT. DJANGO_MEDIA_SENDFILE hands the file transfer to that server:
+# "x-accel-redirect" (nginx, with an internal location at
+# DJANGO_MEDIA_ACCEL_PREFIX aliasing MEDIA_ROOT) or "x-sendfile" (Apache
+# mod_xsendfile, lighttpd). Empty streams from Django.
+SERVE_MEDIA = _env_bool("DJANGO_SERVE_MEDIA", DEBUG)
+MEDIA_SENDFILE = os.environ.get("DJANGO_MEDIA_SENDFILE", "").strip().lower()
+MEDIA_ACCEL_PREFIX = os.environ.get("DJANGO_MEDIA_ACCEL_PREFIX", "/internal-media/")
+
+if MEDIA_SENDFILE not in {"", "x-accel-redirect", "x-sendfile"}:
+    raise ImproperlyConfigured("DJANGO_MEDIA_SENDFILE must be empty, x-accel-redirect or x-sendfile.")
+
+# Background threads resizing course thumbnails (courses/thumbnails.py); 0 = inline
+THUMBNAIL_WORKERS = int(os.environ.get("THUMBNAIL_WORKERS", "2"))
+
+# Serve the read-heavy course and progress endpoints from async views
+# (courses/async_views.py). Only worth it under ASGI (lms/asgi.py); under
+# WSGI every async view is run through a throwaway event loop.
+ASYNC_READ_VIEWS = _env_bool("DJANGO_ASYNC_READ_VIEWS", False)
+
+# Under ASGI Django runs every sync view on one shared thread, so a login
+# spending its time in the password hasher would hold up all of them. With
+# this on, the login and register views run in a thread of their own.
+# Defaults to DJANGO_ASYNC_READ_VIEWS: both mean an ASGI deployment.
+OFFLOAD_PASSWORD_VIEWS = _env_bool("DJANGO_OFFLOAD_PASSWORD_VIEWS", ASYNC_READ_VIEWS)
+
+# Write-behind for lesson completions (courses/completions.py): the endpoint
+# answers 202 once the completion is in a local journal file, and a
+# background thread writes them in one transaction every COMPLETION_FLUSH_MS
+# or COMPLETION_FLUSH_ROWS rows. Journals left by a crash are replayed by
+# that thread when it starts; COMPLETION_JOURNAL_FSYNC=false survives a
+# process crash but not a machine crash. A batch still failing after
+# COMPLETION_FLUSH_RETRIES retries (about 30s of backoff at the default) is
+# moved to dead-letter/ in the journal directory and logged as an error;
+# `manage.py replay_completions --dead-letter` writes it once fixed. The
+# journal directory must be on local disk, one per host. With several
+# worker processes, use a shared cache (DJANGO_CACHE_BACKEND): that is how
+# one worker sees completions another hasn't written yet.
+COMPLETION_WRITE_BEHIND = _env_bool("DJANGO_COMPLETION_WRITE_BEHIND", False)
+COMPLETION_FLUSH_MS = int(os.environ.get("COMPLETION_FLUSH_MS", "50"))
+COMPLETION_FLUSH_ROWS = int(os.environ.get("COMPLETION_FLUSH_ROWS", "500"))
+COMPLETION_JOURNAL_DIR = os.environ.get("COMPLETION_JOURNAL_DIR") or BASE_DIR / "completion-journal"
+COMPLETION_JOURNAL_FSYNC = _env_bool("COMPLETION_JOURNAL_FSYNC", True)
+COMPLETION_FLUSH_RETRIES = int(os.environ.get("COMPLETION_FLUSH_RETRIES", "5"))
+# Log the buffer's depth and flush times on "courses.completions" (INFO) at
+# most this often while completions come in; 0 = never
+COMPLETION_STATS_SECONDS = int(os.environ.get("COMPLETION_STATS_SECONDS", "60"))
+
+# Build the course list, enrolled courses and lesson list responses from
+# .values() rows instead of serializer instances (courses/rows.py)
+FAST_READ_SERIALIZERS = _env_bool("DJANGO_FAST_READ_SERIALIZERS", True)
+
+# Per-request timings (courses/instrumentation.py): query count, database,
+# serializer and view time. Logged on "courses.timing": requests slower than
+# SLOW_REQUEST_MS, queries slower than SLOW_QUERY_MS and query shapes run
+# NPLUSONE_THRESHOLD or more times in one request (0 turns a check off).
+# SERVER_TIMING_HEADER sends the numbers back in a Server-Timing header,
+# shown in the browser's network panel; it exposes them to every client.
+# Off by default outside DEBUG: the middleware wraps every query, so
+# production opts in with DJANGO_REQUEST_TIMING=true.
+REQUEST_TIMING = _env_bool("DJANGO_REQUEST_TIMING", DEBUG)
+SERVER_TIMING_HEADER = _env_bool("DJANGO_SERVER_TIMING_HEADER", DEBUG)
+SLOW_REQUEST_MS = int(os.environ.get("SLOW_REQUEST_MS", "500"))
+SLOW_QUERY_MS = int(os.environ.get("SLOW_QUERY_MS", "100"))
+NPLUSONE_THRESHOLD = int(os.environ.get("NPLUSONE_THRESHOLD", "10"))
@@ -0,0 +1,61 @@
+from asgiref.sync import sync_to_async
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication without the per-request user row fetch.
+
+    Access tokens issued by CookieTokenObtainPairView carry `username` and
+    `role` claims. From those we build a real User instance whose other fields
+    are deferred, exactly like a `.only("id", "username", "role")` result:
+    permissions and FK assignments work without a query, and a view that
+    touches e.g. `email` loads it on first access.
+
+    Tokens without the claims (issued before this change) take the normal
+    database path. `is_active` is not checked per request, but the refresh
+    view reads the claims and `is_active` from the user row each time, so a
+    deactivated user or a changed role takes effect within one access token
+    lifetime.
+    """
+    claim_fields = ("username", "role")
+
+    def get_user(self, validated_token):
+        user = self.get_user_from_claims(validated_token)
+        if user is None:
+            return super().get_user(validated_token)
+        return user
+
+    def get_user_from_claims(self, validated_token):
+        # None when the token can't be trusted on its own and the row must be loaded
+        if api_settings.CHECK_REVOKE_TOKEN or not all(
+            claim in validated_token for claim in self.claim_fields
+        ):
+            return None
+
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if user_id is None:
+            return None  # the database path raises InvalidToken
+
+        # Claims are JSON (simplejwt stores the id as a string), so coerce like the DB would
+        id_field = self.user_model._meta.get_field(api_settings.USER_ID_FIELD)
+        field_names = [id_field.attname, *self.claim_fields]
+        values = [id_field.to_python(user_id), *(validated_token[claim] for claim in self.claim_fields)]
+        return self.user_model.from_db(self.user_model.objects.db, field_names, values)
+
+    async def aauthenticate(self, request):
+        # For async views: a claims token is checked on the event loop, only
+        # tokens that need the user row go through a worker thread.
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+        user = self.get_user_from_claims(validated_token)
+        if user is None:
+            user = await sync_to_async(super().get_user)(validated_token)
+        return user, validated_token
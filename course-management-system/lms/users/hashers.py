@@ -0,0 +1,90 @@
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth import hashers
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+# Django's hashers with their cost read from settings, or Django's own where
+# a setting is unset (PASSWORD_HASHER picks the preferred one, see
+# lms/settings.py). The algorithm names are Django's, so existing hashes keep
+# verifying, and must_update() compares the stored parameters with these: a
+# hash made with other settings (or by another of the three hashers) is redone
+# with the current ones at the user's next login.
+
+
+class Argon2PasswordHasher(hashers.Argon2PasswordHasher):
+    @property
+    def time_cost(self):
+        return settings.ARGON2_TIME_COST or super().time_cost
+
+    @property
+    def memory_cost(self):
+        return settings.ARGON2_MEMORY_COST or super().memory_cost
+
+    @property
+    def parallelism(self):
+        return settings.ARGON2_PARALLELISM or super().parallelism
+
+
+class ScryptPasswordHasher(hashers.ScryptPasswordHasher):
+    @property
+    def work_factor(self):
+        return settings.SCRYPT_WORK_FACTOR or super().work_factor
+
+    @property
+    def block_size(self):
+        return settings.SCRYPT_BLOCK_SIZE or super().block_size
+
+    @property
+    def parallelism(self):
+        return settings.SCRYPT_PARALLELISM or super().parallelism
+
+    @property
+    def maxmem(self):
+        # scrypt needs ~128 * r * N bytes; OpenSSL refuses anything over 32 MiB
+        # by default. Headroom, so hashes made with a larger N still verify.
+        return max(64 * 1024 * 1024, 4 * 128 * self.block_size * self.work_factor)
+
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    @property
+    def iterations(self):
+        return settings.PBKDF2_ITERATIONS or super().iterations
+
+
+class PasswordHashingBusy(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Too many sign-ins at once. Try again in a moment."
+    default_code = "password_hashing_busy"
+    wait = 1  # DRF's exception handler sends it as Retry-After
+
+
+_slots = None
+_slots_lock = threading.Lock()
+
+
+def _get_slots():
+    global _slots
+    with _slots_lock:
+        if _slots is None:
+            _slots = threading.BoundedSemaphore(settings.PASSWORD_HASH_CONCURRENCY)
+        return _slots
+
+
+@contextmanager
+def hashing_slot():
+    """
+    Hold one of the PASSWORD_HASH_CONCURRENCY per-process slots for password
+    hashing (login, registration). A sign-in rush then only ever occupies
+    that many threads and cores; the rest of the traffic keeps going. Waits
+    up to PASSWORD_HASH_WAIT seconds, then fails with a 503 + Retry-After.
+    """
+    slots = _get_slots()
+    if not slots.acquire(timeout=settings.PASSWORD_HASH_WAIT):
+        raise PasswordHashingBusy()
+    try:
+        yield
+    finally:
+        slots.release()
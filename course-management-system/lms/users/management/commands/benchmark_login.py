@@ -0,0 +1,183 @@
+import io
+import json
+import os
+import statistics
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from importlib.util import find_spec
+from wsgiref.util import setup_testing_defaults
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from django.utils.module_loading import import_string
+
+from courses.management.commands.benchmark_api import _percentile
+from courses.models import Course
+
+User = get_user_model()
+
+PASSWORD = "bench-login-password-1"
+HOST = "testserver"
+READ_INTERVAL = 0.02  # seconds
+ALGORITHMS = {"scrypt": "scrypt", "argon2": "argon2", "pbkdf2": "pbkdf2_sha256"}
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure login throughput of one worker process: concurrent POSTs to /api/auth/token/ "
+        "through Django's WSGI handler on --threads threads, per password hasher. A reader "
+        "thread requests the course list meanwhile, to show what the sign-in load does to "
+        "other traffic. With --rehash, users start with hashes from another hasher and "
+        "every login also rehashes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--hasher", action="append", choices=sorted(ALGORITHMS),
+            help="Hasher to measure; repeat to compare. Defaults to PASSWORD_HASHER.",
+        )
+        parser.add_argument("--logins", type=int, default=100, help="Logins per hasher.")
+        parser.add_argument("--threads", type=int, default=8, help="WSGI worker threads (gunicorn --threads).")
+        parser.add_argument("--rehash", action="store_true", help="Seed pbkdf2 hashes (scrypt for --hasher pbkdf2).")
+
+    def handle(self, *args, **options):
+        names = options["hasher"] or [settings.PASSWORD_HASHER]
+        if "argon2" in names and find_spec("argon2") is None:
+            raise CommandError("argon2 needs the argon2-cffi package.")
+
+        tmpdir = None
+        if connection.vendor == "sqlite":
+            # Worker threads each open their own connection, so it must be a file
+            tmpdir = tempfile.TemporaryDirectory()
+            connection.settings_dict["TEST"]["NAME"] = os.path.join(tmpdir.name, "benchmark.sqlite3")
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        results = {}
+        try:
+            for name in names:
+                with override_settings(PASSWORD_HASHERS=self.preferring(ALGORITHMS[name])):
+                    usernames = self.seed(name, options)
+                    connections.close_all()
+                    results[name] = self.run(usernames, options["threads"])
+                    results[name]["rehashed"] = self.count_rehashed(name, usernames)
+        finally:
+            connections.close_all()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+            if tmpdir is not None:
+                tmpdir.cleanup()
+
+        self.print_results(results, options)
+
+    def preferring(self, algorithm):
+        # PASSWORD_HASHERS with `algorithm` first, as PASSWORD_HASHER would order it
+        hashers = list(settings.PASSWORD_HASHERS)
+        first = [path for path in hashers if import_string(path).algorithm == algorithm]
+        return first + [path for path in hashers if path not in first]
+
+    def seed(self, name, options):
+        seeded_with = ALGORITHMS[name]
+        if options["rehash"]:
+            seeded_with = "scrypt" if name == "pbkdf2" else "pbkdf2_sha256"
+        password = make_password(PASSWORD, hasher=seeded_with)  # hash once, reuse for every user
+
+        User.objects.all().delete()
+        usernames = [f"bench_login_{name}_{i}" for i in range(options["logins"])]
+        User.objects.bulk_create(
+            [User(username=username, role=User.Role.STUDENT, password=password) for username in usernames],
+            batch_size=5000,
+        )
+        self.seed_reader_data()
+        return usernames
+
+    def seed_reader_data(self):
+        instructor = User.objects.create(username="bench_login_instructor", role=User.Role.INSTRUCTOR)
+        Course.objects.bulk_create(
+            [Course(title=f"Course {i}", description="x", instructor=instructor) for i in range(20)]
+        )
+
+    def count_rehashed(self, name, usernames):
+        prefix = f"{ALGORITHMS[name]}$"
+        return User.objects.filter(username__in=usernames, password__startswith=prefix).count()
+
+    def run(self, usernames, threads):
+        handler = WSGIHandler()
+
+        def call(method, path, body=b""):
+            environ = {
+                "REQUEST_METHOD": method,
+                "PATH_INFO": path,
+                "HTTP_HOST": HOST,
+                "CONTENT_TYPE": "application/json",
+                "CONTENT_LENGTH": str(len(body)),
+                "wsgi.input": io.BytesIO(body),
+            }
+            setup_testing_defaults(environ)
+            status = []
+            started = time.perf_counter()
+            response = handler(environ, lambda s, headers, exc_info=None: status.append(s))
+            try:
+                b"".join(response)
+            finally:
+                response.close()
+            return int(status[0].split()[0]), (time.perf_counter() - started) * 1000
+
+        def login(username):
+            body = json.dumps({"username": username, "password": PASSWORD}).encode()
+            return call("POST", "/api/auth/token/", body)
+
+        # Course list timings while the logins run, one request every READ_INTERVAL
+        reads = []
+        stop = threading.Event()
+
+        def reader():
+            while not stop.wait(READ_INTERVAL):
+                reads.append(call("GET", "/api/courses/")[1])
+            connections.close_all()
+
+        reader_thread = threading.Thread(target=reader, daemon=True)
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            reader_thread.start()
+            started = time.perf_counter()
+            outcomes = list(pool.map(login, usernames))
+            elapsed = time.perf_counter() - started
+            stop.set()
+            reader_thread.join()
+
+        timings = [ms for _, ms in outcomes]
+        return {
+            "logins": len(outcomes),
+            "per_second": len(outcomes) / elapsed,
+            "p50": statistics.median(timings),
+            "p95": _percentile(timings, 95),
+            "statuses": Counter(status for status, _ in outcomes),
+            "reads": len(reads),
+            "read_p95": _percentile(reads, 95) if reads else 0,
+        }
+
+    def print_results(self, results, options):
+        self.stdout.write(
+            f"{options['logins']} logins per hasher, {options['threads']} WSGI threads, "
+            f"PASSWORD_HASH_CONCURRENCY={settings.PASSWORD_HASH_CONCURRENCY}, {os.cpu_count()} CPU(s)"
+        )
+        self.stdout.write(
+            f"{'hasher':8} {'logins/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'rehashed':>9} "
+            f"{'reads':>6} {'read p95':>9}  statuses"
+        )
+        for name, row in results.items():
+            statuses = ", ".join(f"{code} x{n}" for code, n in sorted(row["statuses"].items()))
+            self.stdout.write(
+                f"{name:8} {row['per_second']:>9.1f} {row['p50']:>8.1f} {row['p95']:>8.1f} "
+                f"{row['rehashed'] if options['rehash'] else '-':>9} "
+                f"{row['reads']:>6} {row['read_p95']:>9.1f}  {statuses}"
+            )
+        self.stdout.write("reads = course list requests served during the logins, read p95 in ms.")
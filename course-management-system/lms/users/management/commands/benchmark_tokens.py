@@ -0,0 +1,137 @@
+import io
+import os
+import statistics
+import tempfile
+import time
+import uuid
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection, reset_queries
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from courses.management.commands.benchmark_api import _percentile
+from users.tokens import RevocableRefreshToken, revoked_tokens
+from users.views import CookieTokenRefreshSerializer
+
+User = get_user_model()
+
+SEED_BATCH = 10000
+MODES = {"stock": RefreshToken, "revocable": RevocableRefreshToken}
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed the token blacklist tables with --tokens historic refresh tokens (most of them "
+        "expired, half blacklisted), then time POST /api/auth/token/refresh/ with simplejwt's "
+        "stock blacklist checks and with users/tokens.py, before and after prune_tokens."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tokens", type=int, default=1_000_000, help="Historic tokens to seed.")
+        parser.add_argument("--expired", type=float, default=0.9, help="Share of them already expired.")
+        parser.add_argument("--refreshes", type=int, default=200, help="Refreshes timed per run.")
+
+    def handle(self, *args, **options):
+        tmpdir = None
+        if connection.vendor == "sqlite":
+            # A real file, so the tables' size shows like it would in production
+            tmpdir = tempfile.TemporaryDirectory()
+            connection.settings_dict["TEST"]["NAME"] = os.path.join(tmpdir.name, "tokens.sqlite3")
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        rows = []
+        try:
+            self.user = User.objects.create(username="bench_tokens", role=User.Role.STUDENT)
+            started = time.perf_counter()
+            self.seed(options["tokens"], options["expired"])
+            self.stdout.write(f"Seeded {options['tokens']} tokens in {time.perf_counter() - started:.1f}s.")
+
+            for mode in MODES:
+                rows.append((f"{mode}, {self.table_size()} rows", self.run(mode, options["refreshes"])))
+
+            out = io.StringIO()
+            call_command("prune_tokens", stdout=out)
+            self.stdout.write(out.getvalue().strip())
+
+            for mode in MODES:
+                rows.append((f"{mode}, {self.table_size()} rows", self.run(mode, options["refreshes"])))
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+            if tmpdir is not None:
+                tmpdir.cleanup()
+
+        self.print_results(rows)
+
+    def seed(self, count, expired_share):
+        now = timezone.now()
+        expired = int(count * expired_share)
+        for start in range(0, count, SEED_BATCH):
+            tokens = OutstandingToken.objects.bulk_create([
+                OutstandingToken(
+                    user=self.user,
+                    jti=uuid.uuid4().hex,
+                    token="historic",
+                    created_at=now,
+                    # Expired ones spread over the past 30 days, the rest live for another week
+                    expires_at=now - timedelta(minutes=1 + i % 43200) if i < expired else now + timedelta(days=7),
+                )
+                for i in range(start, min(start + SEED_BATCH, count))
+            ])
+            BlacklistedToken.objects.bulk_create([BlacklistedToken(token=token) for token in tokens[::2]])
+
+    def table_size(self):
+        return OutstandingToken.objects.count()
+
+    def run(self, mode, refreshes):
+        # A chain of rotations, each one presenting the token the previous one returned
+        CookieTokenRefreshSerializer.token_class = MODES[mode]
+        revoked_tokens.clear()
+        try:
+            client = APIClient()
+            refresh = str(RefreshToken.for_user(self.user))
+            first = refresh
+            reset_queries()  # the capture below only sees the last 9000 queries
+            with CaptureQueriesContext(connection) as captured:
+                response = client.post("/api/auth/token/refresh/", {"refresh": refresh}, format="json")
+            queries = len(captured)
+            refresh = response.cookies["refresh_token"].value
+
+            timings = []
+            for _ in range(refreshes):
+                started = time.perf_counter()
+                response = client.post("/api/auth/token/refresh/", {"refresh": refresh}, format="json")
+                timings.append((time.perf_counter() - started) * 1000)
+                refresh = response.cookies["refresh_token"].value
+
+            # The first token was rotated long ago: presenting it again must fail
+            reset_queries()
+            with CaptureQueriesContext(connection) as captured:
+                reused = client.post("/api/auth/token/refresh/", {"refresh": first}, format="json")
+        finally:
+            CookieTokenRefreshSerializer.token_class = RevocableRefreshToken
+
+        return {
+            "p50": statistics.median(timings),
+            "p95": _percentile(timings, 95),
+            "queries": queries,
+            "reuse": reused.status_code,
+            "reuse_queries": len(captured),
+        }
+
+    def print_results(self, rows):
+        self.stdout.write(f"{'run':32} {'p50 ms':>8} {'p95 ms':>8} {'queries':>8} {'reuse':>6} {'queries':>8}")
+        for name, row in rows:
+            self.stdout.write(
+                f"{name:32} {row['p50']:>8.2f} {row['p95']:>8.2f} {row['queries']:>8} "
+                f"{row['reuse']:>6} {row['reuse_queries']:>8}"
+            )
+        self.stdout.write("queries = per refresh; reuse = status (and queries) when a rotated token is presented again.")
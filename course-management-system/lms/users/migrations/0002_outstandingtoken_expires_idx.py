@@ -0,0 +1,45 @@
+# Generated by Django 6.0.2 on 2026-10-17 16:00
+
+from django.db import migrations, models
+
+INDEX_NAME = 'outstandingtoken_expires_idx'
+
+
+def _index(apps):
+    OutstandingToken = apps.get_model('token_blacklist', 'OutstandingToken')
+    return OutstandingToken, models.Index(fields=['expires_at'], name=INDEX_NAME)
+
+
+def _exists(schema_editor, model):
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        return INDEX_NAME in connection.introspection.get_constraints(cursor, model._meta.db_table)
+
+
+def add_expires_index(apps, schema_editor):
+    model, index = _index(apps)
+    if not _exists(schema_editor, model):
+        schema_editor.add_index(model, index)
+
+
+def remove_expires_index(apps, schema_editor):
+    model, index = _index(apps)
+    if _exists(schema_editor, model):
+        schema_editor.remove_index(model, index)
+
+
+class Migration(migrations.Migration):
+    # simplejwt's OutstandingToken has no index on expires_at, so every
+    # `prune_tokens` batch would scan the whole table. The model belongs to
+    # simplejwt, so its migrations don't know about this index: it is added
+    # out of band, through the schema editor (any database vendor), and only
+    # if missing, e.g. in case a later simplejwt release adds one of the same name.
+
+    dependencies = [
+        ('users', '0001_initial'),
+        ('token_blacklist', '0013_alter_blacklistedtoken_options_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_expires_index, remove_expires_index),
+    ]
@@ -2,6 +2,9 @@ from django.contrib.auth import get_user_model
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError as DjangoValidationError
 from rest_framework import serializers
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+
+from .hashers import hashing_slot
 
 User = get_user_model()
 
@@ -37,6 +40,27 @@ class RegisterSerializer(serializers.ModelSerializer):
             email=validated_data.get("email", ""),
             role=validated_data.get("role", User.Role.STUDENT),
         )
-        user.set_password(validated_data["password"])
+        with hashing_slot():
+            user.set_password(validated_data["password"])
         user.save()
         return user
+
+
+def set_user_claims(token, user):
+    # username and role travel in the token so ClaimsJWTAuthentication
+    # can authorize requests without loading the user row.
+    token["username"] = user.username
+    token["role"] = user.role
+
+
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        set_user_claims(token, user)
+        return token
+
+    def validate(self, attrs):
+        # authenticate() checks the password (and rehashes it if the hasher settings changed)
+        with hashing_slot():
+            return super().validate(attrs)
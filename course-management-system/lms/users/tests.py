@@ -0,0 +1,78 @@
+from asgiref.sync import async_to_sync
+from django.test import RequestFactory, TestCase
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .authentication import ClaimsJWTAuthentication
+from .models import User
+from .serializers import ClaimsTokenObtainPairSerializer
+from .tokens import RevocableRefreshToken
+
+
+class ClaimsJWTAuthenticationTests(TestCase):
+    """
+    Access tokens with username and role claims are trusted without loading
+    the user row; the refresh re-reads both, plus is_active, from the database.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username="student", role=User.Role.STUDENT)
+
+    def me(self, access, queries):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {access}")
+        with self.assertNumQueries(queries):
+            return client.get("/api/me/")
+
+    def refresh(self):
+        return ClaimsTokenObtainPairSerializer.get_token(self.user)
+
+    def test_claims_token_needs_no_query(self):
+        response = self.me(self.refresh().access_token, queries=0)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, {"id": self.user.pk, "username": "student", "role": "student"})
+
+    def test_claims_token_on_async_views(self):
+        access = self.refresh().access_token
+        request = RequestFactory().get("/", HTTP_AUTHORIZATION=f"Bearer {access}")
+        with self.assertNumQueries(0):
+            user, _ = async_to_sync(ClaimsJWTAuthentication().aauthenticate)(request)
+        self.assertEqual((user.pk, user.username, user.role), (self.user.pk, "student", "student"))
+
+    def test_token_without_claims_loads_the_user(self):
+        access = AccessToken.for_user(self.user)
+        response = self.me(access, queries=1)
+        self.assertEqual(response.data["role"], "student")
+
+        # The database path checks is_active on every request
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(self.me(access, queries=1).status_code, 401)
+
+    def test_role_change_applies_at_refresh(self):
+        refresh = self.refresh()
+        access = refresh.access_token
+        User.objects.filter(pk=self.user.pk).update(role=User.Role.INSTRUCTOR, username="renamed")
+
+        # Until the access token expires (SIMPLE_JWT["ACCESS_TOKEN_LIFETIME"]) its claims stand
+        self.assertEqual(self.me(access, queries=0).data["role"], "student")
+
+        response = APIClient().post("/api/auth/token/refresh/", {"refresh": str(refresh)})
+        self.assertEqual(response.status_code, 200)
+        new_access = AccessToken(response.data["access"])
+        self.assertEqual((new_access["username"], new_access["role"]), ("renamed", "instructor"))
+        self.assertEqual(self.me(new_access, queries=0).data["role"], "instructor")
+
+    def test_refresh_after_deactivation(self):
+        refresh = self.refresh()
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+
+        response = APIClient().post("/api/auth/token/refresh/", {"refresh": str(refresh)})
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.data["code"], "no_active_account")
+
+    def test_rotated_refresh_token_is_refused(self):
+        refresh = RevocableRefreshToken(str(self.refresh()))
+        client = APIClient()
+        self.assertEqual(client.post("/api/auth/token/refresh/", {"refresh": str(refresh)}).status_code, 200)
+        self.assertEqual(client.post("/api/auth/token/refresh/", {"refresh": str(refresh)}).status_code, 401)
@@ -0,0 +1,90 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+
+class RevokedTokenSet:
+    """
+    Process-local set of revoked refresh token ids (jti), each kept until the
+    token expires and at most `maxsize` of them. Only ever used to *reject*:
+    a jti missing here (revoked by another worker, or evicted) is caught by
+    the blacklist insert when the token is rotated.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, jti):
+        with self._lock:
+            expires_at = self._entries.get(jti)
+            if expires_at is None:
+                return False
+            if expires_at < time.time():
+                del self._entries[jti]  # expired tokens fail verification anyway
+                return False
+            return True
+
+    def add(self, jti, expires_at):
+        with self._lock:
+            self._entries[jti] = expires_at
+            self._entries.move_to_end(jti)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+revoked_tokens = RevokedTokenSet(maxsize=settings.REVOKED_TOKEN_CACHE_SIZE)
+
+
+class RevocableRefreshToken(RefreshToken):
+    """
+    RefreshToken with a cheaper blacklist. The check before use looks at
+    `revoked_tokens` instead of querying the blacklist tables. Revoking
+    inserts the BlacklistedToken row and fails if it is already there, so a
+    rotated token presented again is refused even when it was rotated in
+    another process. Outstanding rows are written by user id, without
+    loading the user.
+    """
+
+    def check_blacklist(self):
+        if self.payload[api_settings.JTI_CLAIM] in revoked_tokens:
+            raise TokenError(_("Token is blacklisted"))
+
+    def blacklist(self):
+        jti = self.payload[api_settings.JTI_CLAIM]
+        exp = self.payload["exp"]
+        token, _created = OutstandingToken.objects.get_or_create(jti=jti, defaults=self.outstanding_fields())
+        try:
+            with transaction.atomic():
+                blacklisted = BlacklistedToken.objects.create(token=token)
+        except IntegrityError:
+            revoked_tokens.add(jti, exp)
+            raise TokenError(_("Token is blacklisted"))
+        revoked_tokens.add(jti, exp)
+        return blacklisted
+
+    def outstand(self):
+        # Called for a token that was just given a fresh jti
+        return OutstandingToken.objects.create(jti=self.payload[api_settings.JTI_CLAIM], **self.outstanding_fields())
+
+    def outstanding_fields(self):
+        return {
+            "user_id": self.payload.get(api_settings.USER_ID_CLAIM),
+            "created_at": self.current_time,
+            "token": str(self),
+            "expires_at": datetime_from_epoch(self.payload["exp"]),
+        }
@@ -6,11 +6,12 @@ from .views import (
     RegisterView,
     MeView,
     LogoutApiView,
+    password_view,
 )
 
 urlpatterns = [
-    path("auth/register/", RegisterView.as_view()),  # Registration
-    path("auth/token/", CookieTokenObtainPairView.as_view()),  # Login
+    path("auth/register/", password_view(RegisterView)),  # Registration
+    path("auth/token/", password_view(CookieTokenObtainPairView)),  # Login
     path("auth/token/refresh/", CookieTokenRefreshView.as_view()),  # Refresh Token
     path("me/", MeView.as_view()),  # User data
     path("auth/logout/", LogoutApiView.as_view()),  # Logout 
@@ -1,14 +1,22 @@
+from functools import wraps
+
+from asgiref.sync import sync_to_async
 from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import close_old_connections
 
 from rest_framework import generics, permissions, serializers, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
 from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
-from rest_framework_simplejwt.tokens import RefreshToken
 
-from .serializers import RegisterSerializer
+from .serializers import ClaimsTokenObtainPairSerializer, RegisterSerializer, set_user_claims
+from .tokens import RevocableRefreshToken
+
+User = get_user_model()
 
 
 def _set_refresh_cookie(response, refresh_token):
@@ -34,8 +42,36 @@ def _clear_refresh_cookie(response):
     )
 
 
+def password_view(view_class):
+    """
+    as_view() for views that hash passwords. With OFFLOAD_PASSWORD_VIEWS
+    (ASGI) the view runs in a thread from asgiref's pool instead of the one
+    thread Django shares between all sync views, so logins hashing in
+    parallel don't queue every other request behind them.
+    """
+    view = view_class.as_view()
+    if not settings.OFFLOAD_PASSWORD_VIEWS:
+        return view
+
+    def run(request, *args, **kwargs):
+        # A pool thread isn't covered by the request signals that manage connections
+        close_old_connections()
+        try:
+            response = view(request, *args, **kwargs)
+            return response.render()
+        finally:
+            close_old_connections()
+
+    @wraps(view)  # keeps csrf_exempt
+    async def offloaded(request, *args, **kwargs):
+        return await sync_to_async(run, thread_sensitive=False)(request, *args, **kwargs)
+
+    return offloaded
+
+
 class CookieTokenRefreshSerializer(TokenRefreshSerializer):
     refresh = serializers.CharField(required=False)
+    token_class = RevocableRefreshToken
 
     def validate(self, attrs):
         refresh = attrs.get("refresh")
@@ -46,12 +82,35 @@ class CookieTokenRefreshSerializer(TokenRefreshSerializer):
         if not refresh:
             raise InvalidToken("No valid refresh token found.")
 
-        attrs["refresh"] = refresh
-        return super().validate(attrs)
+        refresh = self.token_class(refresh)
+
+        # TokenRefreshSerializer.validate(), except that the claims are read
+        # again from the user row: a role change or deactivation applies at
+        # the next refresh instead of riding along for the refresh lifetime.
+        user_id = refresh.payload.get(api_settings.USER_ID_CLAIM)
+        user = (
+            User.objects.filter(**{api_settings.USER_ID_FIELD: user_id}).only("id", "username", "role", "is_active").first()
+            if user_id is not None else None
+        )
+        if user is None or not api_settings.USER_AUTHENTICATION_RULE(user):
+            raise AuthenticationFailed(self.error_messages["no_active_account"], "no_active_account")
+        set_user_claims(refresh, user)
+
+        data = {"access": str(refresh.access_token)}
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION:
+                refresh.blacklist()
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            refresh.outstand()
+            data["refresh"] = str(refresh)
+        return data
 
 
 class CookieTokenObtainPairView(TokenObtainPairView):
     permission_classes = [permissions.AllowAny]
+    serializer_class = ClaimsTokenObtainPairSerializer
 
     def post(self, request, *args, **kwargs):
         response = super().post(request, *args, **kwargs)
@@ -94,7 +153,7 @@ class LogoutApiView(APIView):
 
         if refresh:
             try:
-                token = RefreshToken(refresh)
+                token = RevocableRefreshToken(refresh)
                 token.blacklist()
             except Exception:
                 # We still clear the cookie and return success.
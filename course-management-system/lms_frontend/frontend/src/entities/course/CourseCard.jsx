@@ -18,8 +18,18 @@ function getCourseThumbnailUrl(thumbnail) {
   }
 }
 
+function getCourseThumbnailSrcSet(variants) {
+  if (!variants || typeof variants !== "object") return "";
+
+  return Object.values(variants)
+    .filter((variant) => variant?.webp || variant?.jpeg)
+    .map((variant) => `${getCourseThumbnailUrl(variant.webp ?? variant.jpeg)} ${variant.width}w`)
+    .join(", ");
+}
+
 export default function CourseCard({ course }) {
-  const thumbnailUrl = getCourseThumbnailUrl(course?.thumbnail);
+  const thumbnailUrl = getCourseThumbnailUrl(course?.thumbnail_variants?.medium?.jpeg ?? course?.thumbnail);
+  const thumbnailSrcSet = getCourseThumbnailSrcSet(course?.thumbnail_variants);
   const courseId = course?.id;
 
   return (
@@ -28,6 +38,8 @@ export default function CourseCard({ course }) {
         {thumbnailUrl ? (
           <img
             src={thumbnailUrl}
+            srcSet={thumbnailSrcSet || undefined}
+            sizes="(min-width: 1024px) 33vw, (min-width: 640px) 50vw, 100vw"
             alt={course?.title ? `${course.title} thumbnail` : "Course thumbnail"}
             className="h-full w-full object-cover transition-transform duration-300 group-hover:scale-105"
             loading="lazy"
@@ -3,6 +3,7 @@ import { http } from "../../services/api/http";
 /**
  * - GET /courses/
  * - GET /courses/:id/
+ * - GET /courses/:id/?include=progress
  */
 export async function listCoursesApi() {
   const { data } = await http.get("/courses/");
@@ -16,7 +17,9 @@ export async function listCoursesByPageApi(page = 1) {
   return data;
 }
 
-export async function getCourseApi(courseId) {
-  const { data } = await http.get(`/courses/${courseId}/`);
+export async function getCourseApi(courseId, { includeProgress = false } = {}) {
+  const { data } = await http.get(`/courses/${courseId}/`, {
+    params: includeProgress ? { include: "progress" } : undefined,
+  });
   return data;
 }
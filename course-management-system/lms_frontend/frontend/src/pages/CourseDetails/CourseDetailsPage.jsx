@@ -6,10 +6,8 @@ import Button from "@/components/ui/button-loading";
 import { getCourseApi } from "../../entities/course/courseApi";
 import { listLessonsForCourseApi } from "../../entities/lesson/lessonApi";
 import { enrollInCourseApi } from "../../features/enroll/enrollApi";
-import { listMyEnrollmentsApi } from "../../features/enroll/enrollmentApi";
 import { useAuth } from "../../app/providers/AuthProvider";
 import ManageLessonsPanel from "../../features/instructor/ManageLessonsPanel";
-import { getCourseProgressApi } from "../../features/enroll/progressReadApi";
 import { toastShow } from "@/components/ui/toast-store";
 
 function Pill({ children }) {
@@ -67,7 +65,6 @@ export default function CourseDetailsPage() {
   const [isEnrolled, setIsEnrolled] = useState(false);
 
   const [completedSet, setCompletedSet] = useState(new Set());
-  const [progressLoading, setProgressLoading] = useState(false);
   const [lessonCreateRequestKey, setLessonCreateRequestKey] = useState(0);
   const [lessonEditRequest, setLessonEditRequest] = useState(null);
 
@@ -83,7 +80,9 @@ export default function CourseDetailsPage() {
     setLoading(true);
 
     try {
-      const c = await getCourseApi(courseId);
+      // Students get their completion flags and enrollment state in the same response
+      const withProgress = isAuthed && isStudent;
+      const c = await getCourseApi(courseId, { includeProgress: withProgress });
       setCourse(c);
 
       const inline = Array.isArray(c?.lessons) ? c.lessons : null;
@@ -96,50 +95,12 @@ export default function CourseDetailsPage() {
         setLessons(items);
       }
 
-      if (isAuthed && isStudent) {
-        setProgressLoading(true);
-        try {
-          const [progressResult, enrollmentsResult] = await Promise.allSettled([
-            getCourseProgressApi(courseId),
-            listMyEnrollmentsApi(),
-          ]);
-
-          if (progressResult.status === "fulfilled") {
-            const p = progressResult.value;
-            const ids = Array.isArray(p?.completed_lessons)
-              ? p.completed_lessons
-              : Array.isArray(p)
-                ? p.filter((x) => x.completed).map((x) => x.lesson)
-                : [];
-
-            setCompletedSet(new Set(ids.map(String)));
-          } else {
-            setCompletedSet(new Set());
-          }
-
-          if (enrollmentsResult.status === "fulfilled") {
-            const items = Array.isArray(enrollmentsResult.value)
-              ? enrollmentsResult.value
-              : enrollmentsResult.value?.results ?? [];
-
-            const alreadyEnrolled = items.some((item) => {
-              const enrolledCourseId = item?.course?.id ?? item?.course_id ?? item?.id;
-              return String(enrolledCourseId) === String(courseId);
-            });
-
-            setIsEnrolled(alreadyEnrolled);
-          } else {
-            setIsEnrolled(false);
-          }
-        } catch {
-          setCompletedSet(new Set());
-          setIsEnrolled(false);
-        } finally {
-          setProgressLoading(false);
-        }
+      if (withProgress && c?.progress) {
+        const ids = (inline ?? []).filter((lesson) => lesson.completed).map((lesson) => lesson.id);
+        setCompletedSet(new Set(ids.map(String)));
+        setIsEnrolled(true);
       } else {
         setCompletedSet(new Set());
-        setProgressLoading(false);
         setIsEnrolled(false);
       }
     } catch (e) {
@@ -326,8 +287,10 @@ export default function CourseDetailsPage() {
       <section className="grid gap-3">
         <div className="flex items-center justify-between gap-3">
           <h3 className="text-lg font-extrabold tracking-tight">Lessons</h3>
-          {isStudent && progressLoading && (
-            <span className="text-xs font-semibold text-muted-foreground">Loading progress...</span>
+          {isStudent && course.progress && (
+            <span className="text-xs font-semibold text-muted-foreground">
+              {course.progress.completed_lessons}/{course.progress.total_lessons} completed ({course.progress.progress_percent}%)
+            </span>
           )}
         </div>
 